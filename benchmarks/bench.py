@@ -0,0 +1,243 @@
+# End-to-end benchmarks for the synthesis path (SSML -> HTTP -> file -> history)
+# against the local mock in mock_tts.py.
+#
+#   python benchmarks/bench.py                          # all workloads
+#   python benchmarks/bench.py single long --latency 0.2
+#   python benchmarks/bench.py --save                   # also write baselines/<commit>.json
+#   python benchmarks/bench.py --compare baselines/abc1234.json
+#   python benchmarks/bench.py --engine fake            # offline engine, no mock server
+#
+# The mock runs in its own process and every workload in a fresh one, so the
+# numbers don't share a GIL with the server and peak RSS is per workload.
+import os
+import sys
+import json
+import random
+import shutil
+import tempfile
+import platform
+import argparse
+import subprocess
+import time
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:     # Windows
+    resource = None
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+BASELINE_DIR = os.path.join(BENCH_DIR, "baselines")
+WORKLOADS = ("single", "batch", "cached", "long")
+
+WORDS = ("नमस्ते", "आज", "मौसम", "बहुत", "अच्छा", "है", "hello", "world", "the", "quick", "report",
+         "audio", "सुबह", "शाम", "बाजार", "किताब", "weather", "today", "station", "train")
+
+def make_text(rng, chars):
+    # deterministic filler made of short sentences, roughly chars long
+    out = []
+    size = 0
+    while size < chars:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 14)))
+        sentence += rng.choice(("।", ".", "?", "!")) + " "
+        out.append(sentence)
+        size += len(sentence)
+    return "".join(out).strip()
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+# ------------------------------
+# Workloads (run inside a child process)
+# ------------------------------
+def run_workload(name, url, args):
+    work_dir = tempfile.mkdtemp(prefix="tts_bench_")
+    # DB, outputs and cache of this run all live in work_dir
+    os.environ["TEXT2AUDIO_HOME"] = work_dir
+    sys.path.insert(0, REPO_DIR)
+    import text2audio as tts
+    from text2audio import config, net, metrics
+
+    tts.init_db()
+    tts.save_settings("bench-key", "local", url + "/cognitiveservices/v1", config.AUDIO_OUTPUT_DIR)
+    settings = tts.load_settings()
+    out = config.AUDIO_OUTPUT_DIR
+    os.makedirs(out, exist_ok=True)
+    voice = list(tts.VOICES)[0]
+    style = tts.STYLES[0]
+    rng = random.Random(args.seed)
+
+    def path_for(i, tag=""):
+        return os.path.join(out, f"{name}{tag}_{i:05d}{tts.FILE_EXT}")
+
+    if name == "long":
+        texts = [make_text(rng, args.long_chars) for _ in range(args.long)]
+    elif name == "batch":
+        texts = [make_text(rng, args.chars) for _ in range(args.batch)]
+    else:
+        texts = [make_text(rng, args.chars) for _ in range(args.count)]
+
+    if name == "cached":
+        # warm the cache first; only the second pass is measured
+        for i, text in enumerate(texts):
+            tts.synthesize_text(text, voice, style, path_for(i, "_warm"), settings)
+
+    latencies = []
+    errors = []
+    tts.METRICS.add_hook(lambda stage, seconds, info: stage == "total" and (
+        latencies.append(seconds) if info["ok"] else errors.append(seconds)))
+    requests_before = net.http_stats()["requests"]
+    started = time.perf_counter()
+    if name == "batch":
+        items = [{"text": t, "voice_key": voice, "style": style} for t in texts]
+        tts.run_batch(items, workers=args.workers, out_folder=out, log=lambda *a: None)
+    else:
+        for i, text in enumerate(texts):
+            try:
+                tts.synthesize_text(text, voice, style, path_for(i), settings)
+            except tts.TTSError:
+                pass
+    elapsed = time.perf_counter() - started
+    metrics.flush_metrics()
+
+    latencies.sort()
+    ms = lambda v: round(v * 1000, 2) if v is not None else None
+    result = {
+        "items": len(texts),
+        "errors": len(errors),
+        "chars": sum(len(t) for t in texts),
+        "seconds": round(elapsed, 3),
+        "items_per_sec": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "chars_per_sec": round(sum(len(t) for t in texts) / elapsed) if elapsed else 0,
+        "p50_ms": ms(metrics.percentile(latencies, 0.5)),
+        "p95_ms": ms(metrics.percentile(latencies, 0.95)),
+        "p99_ms": ms(metrics.percentile(latencies, 0.99)),
+        "max_ms": ms(latencies[-1] if latencies else None),
+        "http_requests": net.http_stats()["requests"] - requests_before,
+        "peak_rss_mb": round(peak_rss_mb(), 1) if resource else None,
+    }
+    shutil.rmtree(work_dir, ignore_errors=True)
+    return result
+
+# ------------------------------
+# Harness
+# ------------------------------
+def start_mock(args):
+    cmd = [sys.executable, os.path.join(BENCH_DIR, "mock_tts.py"), "--port", "0",
+           "--latency", str(args.latency), "--jitter", str(args.jitter),
+           "--bytes-per-char", str(args.bytes_per_char), "--payload-bytes", str(args.payload_bytes),
+           "--error-rate", str(args.error_rate), "--throttle-rate", str(args.throttle_rate),
+           "--retry-after", str(args.retry_after), "--rpm", str(args.rpm), "--seed", str(args.seed)]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline().strip()
+    if not line.startswith("listening "):
+        proc.kill()
+        raise RuntimeError(f"mock server did not start: {line!r}")
+    return proc, line.split(" ", 1)[1]
+
+def child_args(args):
+    return ["--chars", str(args.chars), "--count", str(args.count), "--batch", str(args.batch),
+            "--workers", str(args.workers), "--long", str(args.long), "--long-chars", str(args.long_chars),
+            "--seed", str(args.seed)]
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def print_table(results, baseline=None):
+    cols = ("items", "errors", "items_per_sec", "chars_per_sec", "p50_ms", "p95_ms", "p99_ms", "peak_rss_mb")
+    print(f"{'workload':10s}" + "".join(f"{c:>15s}" for c in cols))
+    for name, r in results.items():
+        print(f"{name:10s}" + "".join(f"{str(r.get(c)):>15s}" for c in cols))
+        base = (baseline or {}).get(name)
+        if base:
+            deltas = []
+            for c in ("items_per_sec", "p95_ms", "peak_rss_mb"):
+                if base.get(c) and r.get(c) is not None:
+                    deltas.append(f"{c} {100.0 * (r[c] - base[c]) / base[c]:+.1f}%")
+            print(f"{'':10s}  vs baseline: " + ", ".join(deltas))
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Benchmark the synthesis path against a local mock server.")
+    parser.add_argument("workloads", nargs="*", metavar="WORKLOAD",
+                        help=f"any of {', '.join(WORKLOADS)} (default: all)")
+    parser.add_argument("--chars", type=int, default=200, help="characters per short text")
+    parser.add_argument("--count", type=int, default=50, help="texts in the single and cached workloads")
+    parser.add_argument("--batch", type=int, default=200, help="texts in the batch workload")
+    parser.add_argument("--workers", type=int, default=8, help="batch workers")
+    parser.add_argument("--long", type=int, default=5, help="texts in the long workload")
+    parser.add_argument("--long-chars", type=int, default=12000, help="characters per long text")
+    parser.add_argument("--save", nargs="?", const="", metavar="NAME",
+                        help="save results to baselines/NAME.json (default: current commit)")
+    parser.add_argument("--compare", metavar="FILE", help="baseline JSON to compare against")
+    parser.add_argument("--engine", choices=("rest", "fake"), default="rest",
+                        help="synthesis engine; rest runs against the mock server, fake renders offline "
+                             "and uses --latency as its delay (default rest)")
+    parser.add_argument("--run-workload", help=argparse.SUPPRESS)
+    parser.add_argument("--url", help=argparse.SUPPRESS)
+    sys.path.insert(0, BENCH_DIR)
+    from mock_tts import add_arguments
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    unknown = set(args.workloads) - set(WORKLOADS)
+    if unknown:
+        parser.error(f"unknown workload(s): {', '.join(sorted(unknown))}")
+    args.workloads = args.workloads or list(WORKLOADS)
+
+    if args.run_workload:
+        print(json.dumps(run_workload(args.run_workload, args.url, args)))
+        return 0
+
+    # the engine reaches the workload processes through the environment
+    env = dict(os.environ, TEXT2AUDIO_ENGINE=args.engine, TEXT2AUDIO_FAKE_LATENCY=str(args.latency))
+    mock, url = start_mock(args) if args.engine == "rest" else (None, "http://127.0.0.1:9")
+    results = {}
+    try:
+        for name in args.workloads:
+            out = subprocess.run([sys.executable, os.path.abspath(__file__), "--run-workload", name,
+                                  "--url", url] + child_args(args),
+                                 capture_output=True, text=True, env=env)
+            if out.returncode:
+                print(f"{name} failed:\n{out.stderr}", file=sys.stderr)
+                continue
+            results[name] = json.loads(out.stdout.strip().splitlines()[-1])
+    finally:
+        if mock:
+            mock.kill()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+    print_table(results, baseline)
+
+    if args.save is not None:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        commit = git_commit()
+        path = os.path.join(BASELINE_DIR, (args.save or commit) + ".json")
+        record = {
+            "commit": commit,
+            "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "engine": args.engine,
+            "mock": {k: getattr(args, k) for k in ("latency", "jitter", "bytes_per_char", "payload_bytes",
+                                                   "error_rate", "throttle_rate", "retry_after", "rpm")},
+            "params": {k: getattr(args, k) for k in ("chars", "count", "batch", "workers", "long", "long_chars", "seed")},
+            "results": results,
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(record, f, indent=2)
+        print(f"saved {path}")
+    return 0 if len(results) == len(args.workloads) else 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,180 @@
+# Local stand-in for the Azure TTS REST API, used by the benchmarks.
+#
+#   python benchmarks/mock_tts.py --port 8765 --latency 0.05 --error-rate 0.01 --throttle-rate 0.05
+#
+# POST /sts/v1.0/issueToken   returns a dummy token
+# POST /cognitiveservices/v1  returns audio sized from the SSML text (or --payload-bytes): MP3
+#                             frames, PCM silence for raw-* formats, filler for ogg-* formats
+# GET  /stats                 request counters as JSON
+import re
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# one MPEG-1 Layer III frame, 192 kbit/s, 48 kHz, mono (matches OUTPUT_FORMAT in text2audio/text.py)
+FRAME_HEADER = bytes([0xFF, 0xFB, 0xB4, 0xC0])
+FRAME_SIZE = 576
+FRAME = FRAME_HEADER + bytes(FRAME_SIZE - len(FRAME_HEADER))
+WRITE_CHUNK = 64 * 1024
+TAG_REGEX = re.compile(r"<[^>]+>")
+
+class MockConfig:
+    def __init__(self, latency=0.05, jitter=0.0, bytes_per_char=1600, payload_bytes=0,
+                 error_rate=0.0, error_status=500, throttle_rate=0.0, retry_after=1, rpm=0, seed=None):
+        self.latency = latency              # seconds before the response headers
+        self.jitter = jitter                # +/- uniform seconds added to latency
+        self.bytes_per_char = bytes_per_char
+        self.payload_bytes = payload_bytes  # fixed body size; 0 = scale with the text
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.throttle_rate = throttle_rate  # random 429s
+        self.retry_after = retry_after
+        self.rpm = rpm                      # 429 once more than rpm requests arrive in a minute
+        self.random = random.Random(seed)
+
+    def as_dict(self):
+        return {k: v for k, v in vars(self).items() if k != "random"}
+
+class MockState:
+    def __init__(self, config):
+        self.config = config
+        self.lock = threading.Lock()
+        self.window = []        # arrival times inside the last minute, for --rpm
+        self.counts = {"requests": 0, "ok": 0, "errors": 0, "throttled": 0, "bytes": 0, "tokens": 0}
+
+    def count(self, key, n=1):
+        with self.lock:
+            self.counts[key] += n
+
+    def over_rpm(self):
+        if not self.config.rpm:
+            return False
+        now = time.monotonic()
+        with self.lock:
+            self.window = [t for t in self.window if now - t < 60]
+            if len(self.window) >= self.config.rpm:
+                return True
+            self.window.append(now)
+            return False
+
+    def roll(self, rate):
+        with self.lock:
+            return self.config.random.random() < rate
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def reply(self, status, body=b"", headers=()):
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            view = memoryview(body)
+            for i in range(0, len(body), WRITE_CHUNK):
+                self.wfile.write(view[i:i + WRITE_CHUNK])
+
+        def do_GET(self):
+            if self.path.startswith("/stats"):
+                with state.lock:
+                    data = json.dumps(state.counts).encode()
+                self.reply(200, data, [("Content-Type", "application/json")])
+            else:
+                self.reply(404)
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if self.path.startswith("/sts/"):
+                state.count("tokens")
+                self.reply(200, b"mock-token")
+                return
+            if not self.path.startswith("/cognitiveservices/v1"):
+                self.reply(404)
+                return
+            cfg = state.config
+            state.count("requests")
+            if state.over_rpm() or state.roll(cfg.throttle_rate):
+                state.count("throttled")
+                self.reply(429, b"Too many requests", [("Retry-After", str(cfg.retry_after))])
+                return
+            delay = cfg.latency
+            if cfg.jitter:
+                with state.lock:
+                    delay += cfg.random.uniform(-cfg.jitter, cfg.jitter)
+            if delay > 0:
+                time.sleep(delay)
+            if state.roll(cfg.error_rate):
+                state.count("errors")
+                self.reply(cfg.error_status, b"Synthetic failure")
+                return
+            if cfg.payload_bytes:
+                size = cfg.payload_bytes
+            else:
+                text = TAG_REGEX.sub("", body.decode("utf-8", "replace"))
+                size = len(text.strip()) * cfg.bytes_per_char
+            output_format = self.headers.get("X-Microsoft-OutputFormat", "")
+            if output_format.startswith("raw-"):
+                data, content_type = bytes(size + size % 2), "audio/x-wav"
+            elif output_format.startswith("ogg-"):
+                # only the transfer is measured; this isn't a decodable Opus stream
+                data, content_type = b"OggS" + bytes(max(0, size - 4)), "audio/ogg"
+            else:
+                data, content_type = FRAME * max(1, math.ceil(size / FRAME_SIZE)), "audio/mpeg"
+            state.count("ok")
+            state.count("bytes", len(data))
+            self.reply(200, data, [("Content-Type", content_type)])
+    return Handler
+
+def start_server(config, host="127.0.0.1", port=0):
+    # serves on a background thread; returns (server, base_url)
+    state = MockState(config)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    server.state = state
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+def add_arguments(parser):
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds before the response (default 0.05)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- seconds of random latency")
+    parser.add_argument("--bytes-per-char", type=int, default=1600, help="audio bytes per text character")
+    parser.add_argument("--payload-bytes", type=int, default=0, help="fixed response size instead")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of requests answered 429")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--rpm", type=int, default=0, help="answer 429 above this many requests per minute")
+    parser.add_argument("--seed", type=int, default=1)
+
+def config_from_args(args):
+    return MockConfig(latency=args.latency, jitter=args.jitter, bytes_per_char=args.bytes_per_char,
+                      payload_bytes=args.payload_bytes, error_rate=args.error_rate,
+                      error_status=args.error_status, throttle_rate=args.throttle_rate,
+                      retry_after=args.retry_after, rpm=args.rpm, seed=args.seed)
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Mock Azure TTS endpoint for benchmarks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, help="0 picks a free port")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    server, url = start_server(config_from_args(args), args.host, args.port)
+    # the harness reads this line to find the port
+    print(f"listening {url}", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
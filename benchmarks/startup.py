@@ -0,0 +1,129 @@
+# Startup budget: how long headless code takes to import the core, how long the
+# CLI takes end to end, and how long the GUI takes to put its window on screen.
+# Exits non-zero when a measurement is over its budget.
+#
+#   python benchmarks/startup.py
+#   python benchmarks/startup.py --runs 10 --save
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import argparse
+import subprocess
+import statistics
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+BASELINE_DIR = os.path.join(BENCH_DIR, "baselines")
+
+# milliseconds, on top of a bare interpreter start where noted
+CORE_IMPORT_BUDGET_MS = 100     # import text2audio.synthesis + batch, in-process
+CLI_BUDGET_MS = 250             # python main.py usage, minus `python -c pass`
+WINDOW_BUDGET_MS = 1500         # python main.py until the window is mapped
+# must not be loaded by a headless import
+HEAVY_MODULES = ("tkinter", "requests", "urllib3", "asyncio", "ssl")
+
+CORE_PROBE = """
+import sys, time, json
+t = time.perf_counter()
+import text2audio.synthesis, text2audio.batch
+ms = (time.perf_counter() - t) * 1000
+print(json.dumps({"ms": ms, "heavy": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+def run_timed(cmd, env):
+    started = time.perf_counter()
+    subprocess.run(cmd, cwd=REPO_DIR, env=env, capture_output=True, check=True)
+    return (time.perf_counter() - started) * 1000
+
+def measure_core(env, runs):
+    samples, heavy = [], set()
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", CORE_PROBE], cwd=REPO_DIR, env=env,
+                             capture_output=True, text=True, check=True)
+        probe = json.loads(out.stdout)
+        samples.append(probe["ms"])
+        heavy.update(probe["heavy"])
+    return statistics.median(samples), sorted(heavy)
+
+def measure_cli(env, runs):
+    bare = statistics.median(run_timed([sys.executable, "-c", "pass"], env) for _ in range(runs))
+    cli = statistics.median(run_timed([sys.executable, "main.py", "usage", "--days", "1"], env)
+                            for _ in range(runs))
+    return cli - bare
+
+def measure_window(env, runs, timeout=30):
+    # the app prints "mapped" on first paint and "ready" once the DB is open, then quits
+    env = dict(env, TEXT2AUDIO_STARTUP_PROBE="1")
+    mapped, ready = [], []
+    for _ in range(runs):
+        started = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, "main.py"], cwd=REPO_DIR, env=env,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        try:
+            for line in proc.stdout:
+                line = line.strip()
+                if line == "mapped":
+                    mapped.append((time.perf_counter() - started) * 1000)
+                elif line == "ready":
+                    ready.append((time.perf_counter() - started) * 1000)
+                    break
+            proc.wait(timeout=timeout)
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+        if not mapped:
+            # no display (or Tk missing): nothing to measure
+            return None, None, proc.stderr.read().strip().splitlines()[-1:]
+    return statistics.median(mapped), statistics.median(ready), None
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Measure import time and time-to-window against budgets.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--save", nargs="?", const="startup", metavar="NAME",
+                        help="write results to baselines/NAME.json (default: startup)")
+    args = parser.parse_args(argv)
+
+    home = tempfile.mkdtemp(prefix="tts_startup_")
+    env = dict(os.environ, TEXT2AUDIO_HOME=home)
+    try:
+        core_ms, heavy = measure_core(env, args.runs)
+        cli_ms = measure_cli(env, args.runs)
+        window_ms, ready_ms, window_error = measure_window(env, min(args.runs, 3))
+    finally:
+        shutil.rmtree(home, ignore_errors=True)
+
+    failures = []
+    def check(label, value, budget):
+        if value is None:
+            print(f"{label:28s}  skipped")
+            return
+        status = "ok" if value <= budget else "OVER BUDGET"
+        print(f"{label:28s} {value:8.1f} ms  (budget {budget} ms)  {status}")
+        if value > budget:
+            failures.append(label)
+
+    check("core import", core_ms, CORE_IMPORT_BUDGET_MS)
+    print(f"{'heavy modules loaded':28s}  {', '.join(heavy) or 'none'}")
+    if heavy:
+        failures.append("heavy modules")
+    check("cli (over bare python)", cli_ms, CLI_BUDGET_MS)
+    check("time to window", window_ms, WINDOW_BUDGET_MS)
+    if ready_ms is not None:
+        print(f"{'time to DB ready':28s} {ready_ms:8.1f} ms")
+    if window_error:
+        print(f"  ({window_error[0]})")
+
+    if args.save:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, args.save + ".json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"core_import_ms": core_ms, "heavy_modules": heavy, "cli_ms": cli_ms,
+                       "window_ms": window_ms, "ready_ms": ready_ms}, f, indent=2)
+        print(f"saved {path}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -3,6 +3,7 @@ from tkinter import scrolledtext, messagebox, Menu, Toplevel, Label, Entry, Butt
 import json
 import os
 import sys
+import threading
 import azure.cognitiveservices.speech as speechsdk
 from datetime import datetime
 import logging
@@ -23,6 +24,78 @@ def resource_path(relative_path):
 
 CONFIG_FILE = resource_path('config.json')
 OUTPUT_DIR = 'tts_outputs' # Keep this relative to the executable's location
+OUTPUT_FORMAT = speechsdk.SpeechSynthesisOutputFormat.Audio48Khz192KBitRateMonoMp3
+
+class FileStreamCallback(speechsdk.audio.PushAudioOutputStreamCallback):
+    """ Receives audio from the synthesizer as it is produced and writes it to the current file """
+    def __init__(self):
+        super().__init__()
+        self.file = None
+
+    def begin(self, path):
+        self.file = open(path, 'wb')
+
+    def end(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def write(self, audio_buffer: memoryview) -> int:
+        if self.file:
+            self.file.write(audio_buffer)
+        return audio_buffer.nbytes
+
+    def close(self) -> None:
+        self.end()
+
+class SpeechEngine:
+    """ One long-lived synthesizer per (key, region, voice), so repeat conversions
+    reuse its open connection instead of setting up a new one each time """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.synthesizers = {}  # (api_key, region, voice) -> (synthesizer, callback, connection, busy lock)
+
+    def get(self, api_key, region, voice=None):
+        key = (api_key, region, voice)
+        with self.lock:
+            if key not in self.synthesizers:
+                speech_config = speechsdk.SpeechConfig(subscription=api_key, region=region)
+                speech_config.set_speech_synthesis_output_format(OUTPUT_FORMAT)
+                if voice:
+                    speech_config.speech_synthesis_voice_name = voice
+                callback = FileStreamCallback()
+                stream = speechsdk.audio.PushAudioOutputStream(callback)
+                audio_config = speechsdk.audio.AudioOutputConfig(stream=stream)
+                synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=audio_config)
+                connection = speechsdk.Connection.from_speech_synthesizer(synthesizer)
+                self.synthesizers[key] = (synthesizer, callback, connection, threading.Lock())
+            return self.synthesizers[key]
+
+    def prewarm(self, api_key, region, voice=None):
+        """ Open the connection ahead of the first conversion """
+        _, _, connection, _ = self.get(api_key, region, voice)
+        connection.open(True)
+
+    def synthesize(self, text, output_filename, api_key, region, voice=None):
+        """ Blocks until done, so call it off the Tk thread. Audio is written to a
+        temporary file as it arrives and renamed once synthesis has completed """
+        synthesizer, callback, _, busy = self.get(api_key, region, voice)
+        tmp_filename = output_filename + '.part'
+        with busy:
+            callback.begin(tmp_filename)
+            try:
+                result = synthesizer.speak_text_async(text).get()
+            except BaseException:
+                callback.end()
+                if os.path.exists(tmp_filename):
+                    os.remove(tmp_filename)
+                raise
+            callback.end()
+        if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
+            os.replace(tmp_filename, output_filename)
+        elif os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+        return result
 
 class ConfigWindow(Toplevel):
     def __init__(self, parent):
@@ -54,8 +127,10 @@ class ConfigWindow(Toplevel):
             'region': self.region_entry.get()
         }
         try:
+            config = {**self.parent.load_config(), **config}
             with open(CONFIG_FILE, 'w') as f:
                 json.dump(config, f)
+            self.parent.set_config(config)
             messagebox.showinfo("Success", "Configuration saved successfully!", parent=self)
             self.destroy()
         except IOError as e:
@@ -69,9 +144,12 @@ class Application(tk.Frame):
         self.master.title("Text-to-Audio (Azure TTS)")
         self.master.geometry("600x400")
         self.pack(fill=tk.BOTH, expand=True)
+        self.config_data = None
+        self.engine = SpeechEngine()
         self.create_widgets()
         self.create_menu()
         self.ensure_output_dir()
+        self.prewarm()
 
     def create_widgets(self):
         self.text_input = scrolledtext.ScrolledText(self, wrap=tk.WORD, height=15, width=70)
@@ -99,14 +177,34 @@ class Application(tk.Frame):
         ConfigWindow(self)
 
     def load_config(self):
+        # read once; ConfigWindow.save_config replaces it
+        if self.config_data is not None:
+            return self.config_data
+        self.config_data = {}
         try:
             if os.path.exists(CONFIG_FILE):
                 with open(CONFIG_FILE, 'r') as f:
-                    return json.load(f)
+                    self.config_data = json.load(f)
         except (IOError, json.JSONDecodeError) as e:
             logging.error(f"Failed to load config: {e}")
-            return {}
-        return {}
+        return self.config_data
+
+    def set_config(self, config):
+        self.config_data = config
+        self.prewarm()
+
+    def prewarm(self):
+        config_data = self.load_config()
+        api_key, region = config_data.get('api_key'), config_data.get('region')
+        if not api_key or not region:
+            return
+        def work():
+            try:
+                self.engine.prewarm(api_key, region, config_data.get('voice'))
+            except Exception as e:
+                # not fatal: the first conversion connects instead
+                logging.error(f"Failed to pre-warm the speech connection: {e}")
+        threading.Thread(target=work, daemon=True).start()
 
     def ensure_output_dir(self):
         try:
@@ -131,37 +229,43 @@ class Application(tk.Frame):
             return
 
         self.status_label.config(text="Converting...")
-        self.master.update_idletasks()
+        self.convert_button.config(state=tk.DISABLED)
 
-        try:
-            speech_config = speechsdk.SpeechConfig(subscription=api_key, region=region)
-            
-            safe_text = "".join(c for c in text[:30] if c.isalnum() or c in (' ','.','_')).rstrip()
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_filename = os.path.join(OUTPUT_DIR, f"{safe_text}_{timestamp}.mp3")
-            
-            audio_config = speechsdk.audio.AudioOutputConfig(filename=output_filename)
-            synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=audio_config)
-            
-            result = synthesizer.speak_text_async(text).get()
-
-            if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
-                self.status_label.config(text=f"Successfully saved to {output_filename}")
-                messagebox.showinfo("Success", f"Audio file saved successfully in '{OUTPUT_DIR}' folder.")
-            elif result.reason == speechsdk.ResultReason.Canceled:
-                cancellation_details = result.cancellation_details
-                error_message = f"Speech synthesis canceled: {cancellation_details.reason}"
-                if cancellation_details.reason == speechsdk.CancellationReason.Error:
-                    if cancellation_details.error_details:
-                        error_message += f"\nError details: {cancellation_details.error_details}"
-                logging.error(error_message)
-                self.status_label.config(text="Conversion failed.")
-                messagebox.showerror("Error", error_message)
-
-        except Exception as e:
-            logging.error(f"An unexpected error occurred during conversion: {e}")
-            self.status_label.config(text="An error occurred.")
-            messagebox.showerror("Error", f"An unexpected error occurred: {e}\n\nCheck app_errors.log for more details.")
+        safe_text = "".join(c for c in text[:30] if c.isalnum() or c in (' ','.','_')).rstrip()
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_filename = os.path.join(OUTPUT_DIR, f"{safe_text}_{timestamp}.mp3")
+        voice = config_data.get('voice')
+
+        # the synthesizer blocks until the audio is complete, so it runs off the Tk thread
+        def work():
+            try:
+                result = self.engine.synthesize(text, output_filename, api_key, region, voice)
+            except Exception as e:
+                logging.error(f"An unexpected error occurred during conversion: {e}")
+                self.master.after(0, self.conversion_failed, e)
+                return
+            self.master.after(0, self.conversion_finished, result, output_filename)
+        threading.Thread(target=work, daemon=True).start()
+
+    def conversion_finished(self, result, output_filename):
+        self.convert_button.config(state=tk.NORMAL)
+        if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
+            self.status_label.config(text=f"Successfully saved to {output_filename}")
+            messagebox.showinfo("Success", f"Audio file saved successfully in '{OUTPUT_DIR}' folder.")
+        elif result.reason == speechsdk.ResultReason.Canceled:
+            cancellation_details = result.cancellation_details
+            error_message = f"Speech synthesis canceled: {cancellation_details.reason}"
+            if cancellation_details.reason == speechsdk.CancellationReason.Error:
+                if cancellation_details.error_details:
+                    error_message += f"\nError details: {cancellation_details.error_details}"
+            logging.error(error_message)
+            self.status_label.config(text="Conversion failed.")
+            messagebox.showerror("Error", error_message)
+
+    def conversion_failed(self, e):
+        self.convert_button.config(state=tk.NORMAL)
+        self.status_label.config(text="An error occurred.")
+        messagebox.showerror("Error", f"An unexpected error occurred: {e}\n\nCheck app_errors.log for more details.")
 
 if __name__ == "__main__":
     try:
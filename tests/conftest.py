@@ -0,0 +1,20 @@
+# Every test gets its own database, outputs and cache under tmp_path and renders
+# through the offline fake engine, so nothing needs a key or the network.
+import pytest
+
+from text2audio import config, storage
+from text2audio.net import flush_usage
+from text2audio.metrics import flush_metrics
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "DB_PATH", str(tmp_path / "tts_app.db"))
+    monkeypatch.setattr(config, "AUDIO_OUTPUT_DIR", str(tmp_path / "tts_outputs"))
+    monkeypatch.setattr(config, "CACHE_DIR", str(tmp_path / "tts_cache"))
+    monkeypatch.setattr(config, "ENGINE", "fake")
+    monkeypatch.setattr(config, "FAKE_LATENCY", 0)
+    storage.init_db()
+    yield tmp_path
+    # pending usage and metrics belong to this database, not to whatever atexit sees
+    flush_usage()
+    flush_metrics()
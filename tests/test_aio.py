@@ -0,0 +1,72 @@
+# The asyncio client against the mock endpoint in benchmarks/mock_tts.py:
+# plain and segmented texts, 429s retried, and a cancel that leaves nothing behind.
+import os
+import asyncio
+
+import pytest
+
+from benchmarks.mock_tts import MockConfig, start_server
+from text2audio import config, storage
+from text2audio.aio import AsyncSpeechClient
+from text2audio.net import ROUTER, QUOTA
+from text2audio.text import VOICES, STYLES, MAX_SEGMENT_CHARS, compute_hash, find_existing_output, pick_format
+
+VOICE = list(VOICES)[2]
+
+@pytest.fixture
+def mock(home):
+    servers = []
+    def start(**kwargs):
+        server, url = start_server(MockConfig(seed=1, **kwargs))
+        servers.append(server)
+        settings = dict(storage.load_settings(), api_key="k", endpoint=url + "/cognitiveservices/v1")
+        return server, settings
+    yield start
+    for server in servers:
+        server.shutdown()
+
+def synthesize(settings, texts, **kwargs):
+    async def main():
+        async with AsyncSpeechClient(settings, **kwargs) as client:
+            return await asyncio.gather(*(client.synthesize(t, VOICE, STYLES[0]) for t in texts))
+    return asyncio.run(main())
+
+def part_files():
+    return [name for _, _, names in os.walk(config.CACHE_DIR) for name in names if name.endswith(".part")]
+
+def test_synthesize_and_dedup(mock):
+    server, settings = mock(latency=0.01)
+    long_text = " ".join(f"Sentence number {i} is here." for i in range(MAX_SEGMENT_CHARS // 10))
+    texts = [f"Hello {i}." for i in range(20)] + [long_text]
+    paths = synthesize(settings, texts)
+    assert all(os.path.getsize(p) > 0 for p in paths)
+    assert server.state.counts["ok"] > len(texts)       # the long text went as several requests
+    assert find_existing_output(compute_hash(texts[0], VOICE, STYLES[0], pick_format(settings, VOICE))) == paths[0]
+    requests = server.state.counts["requests"]
+    assert synthesize(settings, texts[:3]) == paths[:3]
+    assert server.state.counts["requests"] == requests
+    assert not part_files()
+
+def test_throttled_requests_are_retried(mock):
+    server, settings = mock(latency=0.01, throttle_rate=0.3, retry_after=0)
+    paths = synthesize(settings, [f"Busy {i}." for i in range(30)])
+    assert len(set(paths)) == 30
+    assert server.state.counts["throttled"] > 0 and server.state.counts["ok"] == 30
+    assert QUOTA.limit_for(settings).limit is not None     # lowered by the 429s
+
+def test_cancel_leaves_no_partial_output(mock):
+    server, settings = mock(latency=5)
+
+    async def main():
+        async with AsyncSpeechClient(settings) as client:
+            task = asyncio.ensure_future(client.synthesize("Never finished.", VOICE, STYLES[0]))
+            while not server.state.counts["requests"]:
+                await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+    asyncio.run(main())
+    assert not part_files()
+    assert [s["in_flight"] for s in ROUTER.snapshot() if s["endpoint"] == settings["endpoint"]] == [0]
+    assert QUOTA.limit_for(settings).in_flight == 0
+    assert storage.get_db().execute("SELECT COUNT(*) FROM tts_history").fetchone()[0] == 0
@@ -0,0 +1,35 @@
+# The content-addressed cache: blobs move in, hits refresh their age, and
+# eviction drops the least recently used blob that nobody is reading.
+import os
+import time
+
+from text2audio.cache import cache_put, cache_get, cache_evict, cache_pin, cache_unpin, link_output
+
+def put(home, content_hash, size):
+    src = home / f"{content_hash}.part"
+    src.write_bytes(bytes(size))
+    return cache_put(content_hash, str(src))
+
+def test_put_get_link(home):
+    blob = put(home, "aa11", 100)
+    assert not (home / "aa11.part").exists()
+    assert cache_get("aa11") == blob and cache_get("bb22") is None
+    out = str(home / "out.mp3")
+    link_output(blob, out)
+    assert os.path.getsize(out) == 100
+    os.remove(blob)
+    assert cache_get("aa11") is None        # removed behind the cache's back
+
+def test_evict_lru_skips_pinned_and_kept(home):
+    for h in ("h1", "h2", "h3", "h4"):
+        put(home, h, 1000)
+        time.sleep(0.01)
+    cache_get("h1")                         # now the most recently used
+    cache_pin(["h2"])
+    try:
+        assert cache_evict(3000, keep="h4") == 1
+    finally:
+        cache_unpin(["h2"])
+    assert [h for h in ("h1", "h2", "h3", "h4") if cache_get(h)] == ["h1", "h2", "h4"]
+    assert cache_evict(10 ** 6) == 0
+    assert cache_evict(0) == 3
@@ -0,0 +1,34 @@
+# Synthesis through the offline fake engine: the audio is as long as the text
+# says, and a repeat comes from the cache without another request.
+import pytest
+
+from text2audio import storage
+from text2audio.engines import Engine, FAKE_SECONDS_PER_CHAR, get_engine
+from text2audio.media import audio_info
+from text2audio.synthesis import synthesize_text
+from text2audio.text import VOICES, STYLES, find_existing_output, compute_hash
+
+VOICE = list(VOICES)[2]
+FORMAT = "audio-24khz-48kbitrate-mono-mp3"
+
+def test_engine_needs_stream():
+    with pytest.raises(TypeError):
+        Engine()
+
+def test_fake_duration_and_cache_hit(home):
+    settings = storage.load_settings()
+    engine = get_engine(settings)
+    assert engine.name == "fake"
+    text = "Hello there, this is a test. [p-2] And a second sentence."
+    spoken = len("Hello there, this is a test.") + len("And a second sentence.")
+    before = engine.requests
+    stats = {}
+    first = synthesize_text(text, VOICE, STYLES[0], str(home / "a.mp3"), settings, stats=stats, output_format=FORMAT)
+    assert stats == {"segments": 1, "synthesized": 1} and engine.requests == before + 1
+    info = audio_info(first)
+    assert info["duration_s"] == pytest.approx(spoken * FAKE_SECONDS_PER_CHAR + 2, abs=0.1)
+
+    second = synthesize_text(text, VOICE, STYLES[0], str(home / "b.mp3"), settings, stats=stats, output_format=FORMAT)
+    assert stats["synthesized"] == 0 and engine.requests == before + 1
+    assert audio_info(second)["file_size"] == info["file_size"]
+    assert find_existing_output(compute_hash(text, VOICE, STYLES[0], FORMAT)) in (first, second)
@@ -0,0 +1,39 @@
+# History search over Devanagari text: prefixes must match whole words, not the
+# fragments left when vowel signs and virama are treated as separators.
+import pytest
+
+from text2audio import storage
+
+TEXTS = ["किताब", "कल", "कैसे", "नमस्ते दुनिया"]
+
+@pytest.fixture
+def db(home):
+    storage.add_history_many([(t, "v", "default", "fmt", f"h{i}", str(home / f"{i}.mp3"))
+                              for i, t in enumerate(TEXTS)])
+    if not storage.HAS_FTS:
+        pytest.skip("sqlite built without FTS5")
+    return storage.get_db()
+
+def found(query):
+    return sorted(row[-1] for row in storage.search_history(query))
+
+def test_devanagari_prefixes(db):
+    assert found("का") == []
+    assert found("कि") == ["किताब"]
+    assert found("नम") == ["नमस्ते दुनिया"]
+    assert found("नमस्ते") == ["नमस्ते दुनिया"]
+    assert found("कै") == ["कैसे"]
+
+def test_old_index_is_rebuilt(db):
+    # databases indexed with the default unicode61 categories
+    db.execute("DROP TABLE tts_history_fts")
+    db.execute("""
+        CREATE VIRTUAL TABLE tts_history_fts USING fts5(
+            text, content='tts_history_text', content_rowid='id', tokenize='unicode61 remove_diacritics 0')
+    """)
+    db.execute("INSERT INTO tts_history_fts(tts_history_fts) VALUES ('rebuild')")
+    db.commit()
+    assert found("का")     # matched fragments of unrelated words
+    storage.init_db()
+    assert found("का") == []
+    assert found("कि") == ["किताब"]
@@ -0,0 +1,41 @@
+# MPEG frame parsing: the headers we write parse back, tags and junk are
+# skipped, and slices land on frame boundaries.
+import pytest
+
+from text2audio.mp3 import (mp3_params, frame_header, parse_frame_header, iter_frames, frame_times, slice_frames,
+                            strip_id3)
+from text2audio.text import OUTPUT_FORMATS
+
+MP3_FORMATS = [f for f in OUTPUT_FORMATS if mp3_params(f)]
+
+def frames(output_format, n):
+    header = frame_header(*mp3_params(output_format))
+    size = parse_frame_header(*header[:3])[0]
+    return b"".join(header + bytes([i]) * (size - 4) for i in range(n))
+
+@pytest.mark.parametrize("output_format", MP3_FORMATS)
+def test_header_round_trip(output_format):
+    sample_rate, kbps = mp3_params(output_format)
+    size, samples, rate = parse_frame_header(*frame_header(sample_rate, kbps)[:3])
+    assert rate == sample_rate
+    assert size == (144 if samples == 1152 else 72) * kbps * 1000 // sample_rate
+
+def test_skips_tags_and_junk():
+    audio = frames(MP3_FORMATS[0], 10)
+    id3 = b"ID3\x03\x00\x00\x00\x00\x00\x05" + b"hello"
+    data = id3 + audio[:1000] + b"\x00\xff\x00" + audio[1000:] + b"TAG" + bytes(125)
+    assert bytes(strip_id3(id3 + audio + b"TAG" + bytes(125))) == audio
+    assert len(list(iter_frames(id3 + audio))) == 10
+    assert 8 <= len(list(iter_frames(data))) <= 10     # the frame hit by the junk is lost, nothing else
+    assert parse_frame_header(0xFF, 0xE0 | 3 << 3 | 0x03, 0xF0) is None    # bad bitrate index
+
+def test_slice_on_frame_boundaries():
+    audio = frames("audio-48khz-192kbitrate-mono-mp3", 100)
+    times = frame_times(audio)
+    step = times[1][2]
+    assert step == pytest.approx(0.024)
+    part = slice_frames(audio, times, times[10][2], times[20][2])
+    assert len(part) == 10 * times[0][1] and part[4] == 10
+    led = slice_frames(audio, times, times[10][2], times[20][2], lead=2)
+    assert led[4] == 8 and led.endswith(part)
+    assert slice_frames(audio, times, 1000) == b""
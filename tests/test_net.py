@@ -0,0 +1,119 @@
+# Quota scheduling and endpoint routing: the per-endpoint AIMD limit only closes
+# in after a 429 and hands freed slots to threads and event loops alike; the
+# router prefers fast endpoints and sits out failing ones.
+import asyncio
+import threading
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from text2audio.net import (AdaptiveLimit, QuotaScheduler, TokenBucket, EndpointRouter, EJECT_SECONDS,
+                            parse_retry_after)
+
+RES_A = {"api_key": "a", "endpoint": "https://a.example"}
+RES_B = {"api_key": "b", "endpoint": "https://b.example"}
+
+def test_limit_unbounded_until_throttled():
+    limit = AdaptiveLimit()
+    for _ in range(500):
+        assert limit.try_acquire()
+    for _ in range(500):
+        limit.release()
+        limit.increase()
+    assert limit.limit is None and limit.in_flight == 0
+
+def test_limit_halves_once_per_burst():
+    limit = AdaptiveLimit()
+    for _ in range(40):
+        limit.try_acquire()
+    for _ in range(20):
+        limit.release()
+        limit.decrease()
+    assert limit.limit == 20.0          # the 40 in flight when the first 429 came back, halved
+    assert not limit.try_acquire()
+    for _ in range(25):             # +1/limit per success: one more slot after about 20
+        limit.increase()
+    assert limit.try_acquire() and not limit.try_acquire()
+
+def test_limit_is_per_endpoint():
+    quota = QuotaScheduler()
+    quota.limit_for(RES_A).try_acquire()
+    quota.throttled(RES_A)
+    assert quota.limit_for(RES_A).limit == 1.0
+    assert quota.limit_for(RES_B).limit is None
+    assert quota.limit_for(RES_A) is quota.limit_for(RES_A)
+
+def full_limit():
+    limit = AdaptiveLimit()
+    limit.try_acquire()
+    limit.release()
+    limit.decrease()
+    assert limit.try_acquire() and not limit.try_acquire()
+    return limit
+
+def test_acquire_times_out_or_cancels():
+    limit = full_limit()
+    assert not limit.acquire(timeout=0.05)
+    cancel = threading.Event()
+    threading.Timer(0.05, cancel.set).start()
+    assert not limit.acquire(cancel=cancel)
+    threading.Timer(0.05, limit.release).start()
+    assert limit.acquire(timeout=5)
+
+def test_acquire_async_woken_from_another_thread():
+    limit = full_limit()
+
+    async def main():
+        assert not await limit.acquire_async(timeout=0.05)
+        assert not limit.waiters
+        threading.Timer(0.05, limit.release).start()
+        return await limit.acquire_async(timeout=5)
+    assert asyncio.run(main())
+    assert limit.in_flight == 1
+
+def test_cancelled_async_waiter_passes_the_wake_on():
+    limit = full_limit()
+
+    async def main():
+        first = asyncio.ensure_future(limit.acquire_async())
+        second = asyncio.ensure_future(limit.acquire_async())
+        await asyncio.sleep(0)
+        limit.release()     # wakes first, which is cancelled before it runs
+        first.cancel()
+        return await asyncio.wait_for(second, 5)
+    assert asyncio.run(main())
+
+def test_token_bucket_paces_after_the_burst():
+    bucket = TokenBucket(rate=10.0, capacity=2)
+    assert bucket.reserve(1) == 0.0 and bucket.reserve(1) == 0.0
+    assert bucket.reserve(1) == pytest.approx(0.1, abs=0.02)
+    assert bucket.reserve(1) == pytest.approx(0.2, abs=0.02)     # in debt: callers queue up
+
+def test_router_prefers_fast_and_ejects_failures():
+    router = EndpointRouter()
+    pool = [RES_A, RES_B]
+    for res, latency in ((RES_A, 0.1), (RES_B, 1.0)):
+        router.acquire([res])
+        router.release(res, latency=latency)
+    res, wait = router.acquire(pool)
+    assert res is RES_A and wait == 0.0
+    router.release(RES_A, failed=True)
+    res, _ = router.acquire(pool)
+    assert res is RES_B
+    router.release(RES_B, latency=1.0)
+    router.acquire([RES_A])
+    router.release(RES_A, failed=True)  # already ejected: the penalty doesn't grow
+    state = {s["endpoint"]: s for s in router.snapshot()}
+    assert state[RES_A["endpoint"]]["failures"] == 1
+    assert state[RES_A["endpoint"]]["ejected_for"] == pytest.approx(EJECT_SECONDS, abs=1)
+    assert router.acquire(pool, exclude={(RES_B["api_key"], RES_B["endpoint"])})[0] is RES_A
+    router.release(RES_A)
+    assert router.acquire(pool, exclude={(r["api_key"], r["endpoint"]) for r in pool}) == (None, 0.0)
+    assert all(s["in_flight"] == 0 for s in router.snapshot())
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("") is None and parse_retry_after("soon") is None
+    later = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert parse_retry_after(format_datetime(later, usegmt=True)) == pytest.approx(30, abs=2)
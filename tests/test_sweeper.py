@@ -0,0 +1,96 @@
+# History sweeps: rows follow their files, retention goes by whole files, and a
+# folder that can't be listed (an unplugged drive) leaves its rows alone.
+import os
+import time
+from datetime import datetime, timedelta
+
+from text2audio import storage, sweeper
+from text2audio.text import VOICES, STYLES, OUTPUT_FORMAT
+
+VOICE = list(VOICES)[0]
+
+def add(path, content_hash):
+    storage.add_history("some text", VOICE, STYLES[0], OUTPUT_FORMAT, content_hash, str(path))
+
+def flags():
+    return dict(storage.get_db().execute("SELECT content_hash, file_missing FROM tts_history").fetchall())
+
+def test_missing_then_found(home):
+    folder = home / "tts_outputs"       # the default save folder
+    folder.mkdir()
+    (folder / "a.mp3").write_bytes(b"a")
+    add(folder / "a.mp3", "ha")
+    add(folder / "b.mp3", "hb")
+    stats = sweeper.sweep(0, 0)
+    assert (stats["missing"], stats["found"], stats["skipped"]) == (1, 0, [])
+    assert flags() == {"ha": 0, "hb": 1}
+    (folder / "b.mp3").write_bytes(b"b")
+    assert sweeper.sweep(0, 0)["found"] == 1
+    assert flags() == {"ha": 0, "hb": 0}
+
+def test_unreadable_folder_is_skipped(home):
+    gone = home / "unplugged"
+    add(gone / "a.mp3", "ha")
+    stats = sweeper.sweep(retention_days=1, retention_max_mb=0, remove_orphans=True)
+    assert str(gone) in stats["skipped"] and stats["missing"] == 0 and stats["expired"] == 0
+    assert flags() == {"ha": 0}
+
+def test_failed_sweep_is_logged(home, monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError("disk on fire")
+    monkeypatch.setattr(sweeper, "sweep", broken)
+    lines = []
+    stop = sweeper.start_sweeper(interval=60, log=lines.append)
+    for _ in range(100):
+        if lines:
+            break
+        time.sleep(0.01)
+    stop.set()
+    assert lines and "disk on fire" in lines[0]
+
+def age_row(content_hash, days):
+    stamp = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+    with storage.get_db() as con:
+        con.execute("UPDATE tts_history SET created_at=? WHERE content_hash=?", (stamp, content_hash))
+
+def test_retention_by_age_keeps_shared_files(home):
+    folder = home / "tts_outputs"
+    folder.mkdir()
+    for name in ("old", "new", "shared"):
+        (folder / f"{name}.mp3").write_bytes(b"x")
+    add(folder / "old.mp3", "h-old")
+    add(folder / "new.mp3", "h-new")
+    add(folder / "shared.mp3", "h-shared-old")
+    add(folder / "shared.mp3", "h-shared-new")
+    for content_hash in ("h-old", "h-shared-old"):
+        age_row(content_hash, 40)
+    assert sweeper.sweep(30, 0, dry_run=True)["expired"] == 1
+    assert (folder / "old.mp3").exists()
+    stats = sweeper.sweep(30, 0)
+    assert stats["expired"] == 1 and stats["freed_bytes"] == 1
+    assert not (folder / "old.mp3").exists() and (folder / "shared.mp3").exists()
+    assert set(flags()) == {"h-new", "h-shared-old", "h-shared-new"}
+
+def test_retention_by_size_drops_oldest(home):
+    folder = home / "tts_outputs"
+    folder.mkdir()
+    for i in range(3):
+        (folder / f"{i}.mp3").write_bytes(bytes(400 * 1024))
+        add(folder / f"{i}.mp3", f"h{i}")
+        age_row(f"h{i}", 3 - i)
+    stats = sweeper.sweep(0, 1)
+    assert stats["expired"] == 1 and not (folder / "0.mp3").exists()
+    assert set(flags()) == {"h1", "h2"}
+
+def test_orphans_listed_then_removed(home):
+    folder = home / "tts_outputs"
+    folder.mkdir()
+    stale, fresh = folder / "stale.mp3", folder / "fresh.mp3"
+    stale.write_bytes(b"s")
+    fresh.write_bytes(b"f")
+    past = time.time() - sweeper.ORPHAN_GRACE_SECONDS - 60
+    os.utime(stale, (past, past))
+    (folder / "notes.txt").write_text("not audio")
+    assert sweeper.sweep(0, 0)["orphans"] == [str(stale)] and stale.exists()
+    sweeper.sweep(0, 0, remove_orphans=True)
+    assert not stale.exists() and fresh.exists() and (folder / "notes.txt").exists()
@@ -0,0 +1,40 @@
+# Segmentation and hashing: segments stay under the limit, lose no text, and
+# an edit only moves the boundaries around it.
+from text2audio.text import split_text, split_for_format, compute_hash, MAX_SEGMENT_CHARS, MIN_SEGMENT_CHARS
+
+def story(n, edit=None):
+    sentences = [f"This is sentence number {i} of a long story." for i in range(n)]
+    if edit is not None:
+        sentences[edit] = "This sentence was rewritten."
+    return " ".join(sentences)
+
+def test_segments_fit_and_keep_all_text():
+    text = story(300)
+    segments = split_text(text)
+    assert len(segments) > 1
+    assert all(len(s) <= MAX_SEGMENT_CHARS for s in segments)
+    assert all(len(s) >= MIN_SEGMENT_CHARS for s in segments[:-1])
+    assert " ".join(segments) == text
+
+def test_edit_keeps_other_segments():
+    before = split_text(story(300))
+    after = split_text(story(300, edit=150))
+    assert len(set(before) & set(after)) >= len(before) - 2
+
+def test_long_sentence_cut_at_a_space():
+    text = "word " * (MAX_SEGMENT_CHARS // 2)
+    segments = split_text(text)
+    assert all(len(s) <= MAX_SEGMENT_CHARS for s in segments)
+    assert all(not s.startswith("ord") for s in segments)
+
+def test_ogg_is_never_split():
+    text = story(300)
+    assert split_for_format(text, "ogg-24khz-16bit-mono-opus") == [text]
+    assert split_for_format(text, "raw-24khz-16bit-mono-pcm") == split_text(text)
+    assert split_for_format("  ", "ogg-24khz-16bit-mono-opus") == []
+
+def test_hash_covers_voice_style_and_format():
+    base = compute_hash("नमस्ते", "v", "default", "f")
+    assert base == compute_hash("नमस्ते", "v", "default", "f")
+    assert len({base, compute_hash("नमस्ते", "w", "default", "f"), compute_hash("नमस्ते", "v", "sad", "f"),
+                compute_hash("नमस्ते", "v", "default", "g"), compute_hash("नमस्ते!", "v", "default", "f")}) == 5
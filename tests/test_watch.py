@@ -0,0 +1,57 @@
+# Watch folders: scripts are synthesized next to themselves, only when new or
+# changed, and an edit never leaves the old text pointing at the new audio.
+import os
+import time
+
+from text2audio import storage
+from text2audio.text import VOICES, STYLES, OUTPUT_FORMAT, compute_hash, find_existing_output
+from text2audio.watch import watch_pass
+
+VOICE = list(VOICES)[0]
+
+def write_script(path, text, age=60):
+    # older than WATCH_SETTLE_SECONDS, and a different mtime on every call
+    path.write_text(text, encoding="utf-8")
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+
+def run(folder):
+    return watch_pass([str(folder)], VOICE, STYLES[0], OUTPUT_FORMAT, workers=2, log=lambda m: None)
+
+def test_new_then_unchanged(home):
+    folder = home / "scripts"
+    folder.mkdir()
+    write_script(folder / "a.txt", "first script")
+    write_script(folder / "b.txt", "first script")
+    stats = run(folder)
+    assert (stats["done"], stats["reused"]) == (1, 1)
+    assert (folder / "a.mp3").exists() and (folder / "b.mp3").exists()
+    assert run(folder) == {"done": 0, "reused": 0, "unchanged": 0, "empty": 0, "failed": 0, "removed": 0}
+    write_script(folder / "a.txt", "first script", age=30)     # touched, not edited
+    assert run(folder)["unchanged"] == 1
+
+def test_edit_retires_old_history(home):
+    folder = home / "scripts"
+    folder.mkdir()
+    script, output = folder / "s5.txt", str(folder / "s5.mp3")
+    write_script(script, "old text")
+    run(folder)
+    old_hash = compute_hash("old text", VOICE, STYLES[0], OUTPUT_FORMAT)
+    assert find_existing_output(old_hash) == output
+
+    write_script(script, "new text, a little longer", age=30)
+    assert run(folder)["done"] == 1
+    new_hash = compute_hash("new text, a little longer", VOICE, STYLES[0], OUTPUT_FORMAT)
+    assert find_existing_output(new_hash) == output
+    assert find_existing_output(old_hash) is None
+    rows = storage.get_db().execute("SELECT content_hash FROM tts_history WHERE file_path=?", (output,)).fetchall()
+    assert rows == [(new_hash,)]
+
+def test_deleted_script_leaves_index(home):
+    folder = home / "scripts"
+    folder.mkdir()
+    write_script(folder / "a.txt", "gone soon")
+    run(folder)
+    os.remove(folder / "a.txt")
+    assert run(folder)["removed"] == 1
+    assert storage.load_watch_index(str(folder)) == {}
@@ -0,0 +1,30 @@
+# Text-to-Audio core: synthesis, SSML, hashing and storage, with no GUI.
+# Submodules are imported on first use, so `import text2audio` costs almost nothing:
+#
+#     from text2audio import init_db, load_settings, synthesize_text
+#
+# main.py / gui.py hold the Tk app; only client.py imports requests.
+import importlib
+
+_EXPORTS = {
+    "init_db": "storage", "load_settings": "storage", "save_settings": "storage",
+    "add_history": "storage", "search_history": "storage", "HistoryBatch": "storage",
+    "VOICES": "text", "STYLES": "text", "OUTPUT_FORMAT": "text", "FILE_EXT": "text",
+    "OUTPUT_FORMATS": "text", "pick_format": "text",
+    "to_ssml": "text", "split_text": "text", "split_for_format": "text", "compute_hash": "text",
+    "find_existing_output": "text",
+    "TTSError": "net",
+    "synthesize_text": "synthesis",
+    "get_engine": "engines", "FakeEngine": "engines",
+    "run_batch": "batch", "load_manifest": "batch",
+    "AsyncSpeechClient": "aio",
+    "JOBS": "jobs",
+    "METRICS": "metrics",
+}
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module("." + module, __name__), name)
@@ -0,0 +1,4 @@
+# python -m text2audio ... runs the command line without loading the GUI
+from .cli import main
+
+main()
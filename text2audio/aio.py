@@ -0,0 +1,363 @@
+# asyncio client
+import os
+import ssl
+import time
+import asyncio
+import tempfile
+from urllib.parse import urlsplit
+
+from . import config
+from .config import DEFAULT_CACHE_MAX_MB
+from .storage import load_settings, add_history
+from .cache import cache_pin, cache_unpin, cache_get, cache_put, cache_evict, cache_blob_path, link_output
+from .text import (VOICES, OUTPUT_FORMAT, to_ssml, split_for_format, compute_hash, ensure_folder, find_existing_output,
+                   format_ext, pick_format)
+from .progress import emit, tag_events
+from .net import (TTSError, CONNECT_STATS, TOKEN_TTL, ROUTER, QUOTA, MAX_THROTTLE_RETRIES,
+                  endpoint_pool, token_url_for, parse_retry_after, is_endpoint_failure)
+from .metrics import METRICS
+from .synthesis import concat_parts
+from .engines import DOWNLOAD_CHUNK
+from .wav import pcm_params, wav_header, patch_wav_sizes
+from .batch import batch_output_path
+
+class OutputError(TTSError):
+    # the response couldn't be written to disk; the endpoint that sent it is fine
+    pass
+
+async def _disk(fn, *args):
+    # file work runs on a thread so a slow disk doesn't stall the event loop; its
+    # OSErrors come out as OutputError so the router never counts them against a region
+    try:
+        return await asyncio.to_thread(fn, *args)
+    except OSError as e:
+        raise OutputError(f"Writing audio failed: {e}") from e
+
+def _open_part(dest):
+    # binary temp file next to dest, renamed over it once complete
+    fd, tmp_path = tempfile.mkstemp(prefix="." + os.path.basename(dest) + ".", suffix=".part",
+                                    dir=os.path.dirname(dest) or ".")
+    return os.fdopen(fd, "wb", buffering=0), tmp_path
+
+def _cache_part(content_hash):
+    # empty temp file in the blob's cache folder
+    tmp_dir = ensure_folder(os.path.dirname(cache_blob_path(content_hash)))
+    fd, tmp_path = tempfile.mkstemp(suffix=".part", dir=tmp_dir)
+    os.close(fd)
+    return tmp_path
+
+def _discard(path):
+    # cleanup stays synchronous so it still runs while the task is being cancelled
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+class AsyncSpeechClient:
+    # HTTP/1.1 over asyncio streams with a keep-alive pool, so hundreds of
+    # syntheses can be in flight on one event loop without a thread each.
+    #
+    #   async with AsyncSpeechClient(max_connections=100) as client:
+    #       paths = await asyncio.gather(*(client.synthesize(t, voice_key, style) for t in texts))
+    def __init__(self, settings=None, max_connections=64, timeout=120):
+        self.settings = settings  # None: read from the settings store on first use
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(max_connections)
+        self._idle = {}  # (scheme, host, port) -> [(reader, writer)]
+        self._tokens = {}  # (api_key, token_url) -> (token, expires_at)
+        self._token_lock = asyncio.Lock()
+        self._ssl = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        conns = [c for idle in self._idle.values() for c in idle]
+        self._idle.clear()
+        for _, writer in conns:
+            writer.close()
+        for _, writer in conns:
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+    async def _open(self, key):
+        scheme, host, port = key
+        started = time.perf_counter()
+        if scheme == "https":
+            if self._ssl is None:
+                self._ssl = ssl.create_default_context()
+            conn = await asyncio.open_connection(host, port, ssl=self._ssl)
+        else:
+            conn = await asyncio.open_connection(host, port)
+        CONNECT_STATS.add_connect(time.perf_counter() - started)
+        return conn
+
+    async def _body_chunks(self, reader, headers):
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            while True:
+                size = int((await reader.readline()).split(b";")[0].strip() or b"0", 16)
+                if size == 0:
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    return
+                async for chunk in self._read_exact(reader, size):
+                    yield chunk
+                await reader.readexactly(2)
+        elif "content-length" in headers:
+            async for chunk in self._read_exact(reader, int(headers["content-length"])):
+                yield chunk
+        else:
+            while True:
+                chunk = await reader.read(DOWNLOAD_CHUNK)
+                if not chunk:
+                    return
+                yield chunk
+
+    async def _read_exact(self, reader, n):
+        while n:
+            chunk = await reader.read(min(n, DOWNLOAD_CHUNK))
+            if not chunk:
+                raise asyncio.IncompleteReadError(b"", n)
+            n -= len(chunk)
+            yield chunk
+
+    async def _exchange(self, conn, netloc, target, headers, body, dest, on_event, output_format=None):
+        reader, writer = conn
+        lines = [f"POST {target} HTTP/1.1", f"Host: {netloc}", f"Content-Length: {len(body)}",
+                 "Accept-Encoding: identity", "User-Agent: text2audio"]
+        lines += [f"{k}: {v}" for k, v in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("connection closed by server")
+        version, status = status_line.split(None, 2)[:2]
+        status = int(status)
+        resp_headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            k, _, v = line.decode("latin-1").partition(":")
+            resp_headers[k.strip().lower()] = v.strip()
+        keep = (version != b"HTTP/1.0" and resp_headers.get("connection", "").lower() != "close"
+                and ("content-length" in resp_headers or "chunked" in resp_headers.get("transfer-encoding", "")))
+
+        if status != 200 or dest is None:
+            data = b"".join([c async for c in self._body_chunks(reader, resp_headers)])
+            return status, resp_headers, data, keep
+
+        # same contract as stream_to_file: temp file, renamed once complete
+        total = resp_headers.get("content-length")
+        total = int(total) if total and total.isdigit() else None
+        f, tmp_path = await _disk(_open_part, dest)
+        received = 0
+        pcm = pcm_params(output_format)
+        try:
+            try:
+                if pcm:
+                    await _disk(f.write, wav_header(*pcm))
+                async for chunk in self._body_chunks(reader, resp_headers):
+                    await _disk(f.write, chunk)
+                    if not received:
+                        emit(on_event, "first_byte", total=total)
+                    received += len(chunk)
+                    emit(on_event, "bytes", n=len(chunk), received=received, total=total)
+                if pcm:
+                    await _disk(patch_wav_sizes, f, received)
+            finally:
+                f.close()   # unbuffered: nothing left to flush
+            await _disk(os.replace, tmp_path, dest)
+            emit(on_event, "downloaded", received=received)
+        except BaseException:
+            _discard(tmp_path)
+            raise
+        return status, resp_headers, dest, keep
+
+    async def _post(self, url, headers, body, dest=None, on_event=None, output_format=None):
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+        target = (parts.path or "/") + ("?" + parts.query if parts.query else "")
+        async with self._slots:
+            for attempt in range(2):
+                idle = self._idle.get(key)
+                reused = bool(idle)
+                conn = idle.pop() if reused else await self._open(key)
+                CONNECT_STATS.add_request()
+                try:
+                    status, resp_headers, data, keep = await asyncio.wait_for(
+                        self._exchange(conn, parts.netloc, target, headers, body, dest, on_event, output_format),
+                        self.timeout)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    conn[1].close()
+                    # the server closed an idle keep-alive connection: retry once on a fresh one
+                    if reused and not attempt:
+                        continue
+                    raise
+                except BaseException:
+                    conn[1].close()
+                    raise
+                if keep:
+                    self._idle.setdefault(key, []).append(conn)
+                else:
+                    conn[1].close()
+                return status, resp_headers, data
+
+    async def _get_token(self, settings, force=False):
+        api_key = (settings.get("api_key") or "").strip()
+        url = token_url_for(settings)
+        async with self._token_lock:
+            cached = self._tokens.get((api_key, url))
+            if cached and not force and cached[1] > time.monotonic():
+                return cached[0]
+            status, _, data = await self._post(url, {"Ocp-Apim-Subscription-Key": api_key}, b"")
+            if status != 200:
+                raise TTSError(f"Token request failed: HTTP {status}\n{data.decode('utf-8', 'replace')}", status)
+            self._tokens[(api_key, url)] = (data.decode("utf-8").strip(), time.monotonic() + TOKEN_TTL)
+            return self._tokens[(api_key, url)][0]
+
+    async def _post_to(self, res, body, dest, on_event, output_format=OUTPUT_FORMAT):
+        for attempt in range(2):
+            headers = {
+                "Authorization": "Bearer " + await self._get_token(res, force=attempt > 0),
+                "Content-Type": "application/ssml+xml",
+                "X-Microsoft-OutputFormat": output_format
+            }
+            emit(on_event, "request")
+            status, resp_headers, data = await self._post(res["endpoint"], headers, body, dest=dest, on_event=on_event,
+                                                          output_format=output_format)
+            if status != 401:
+                break
+        return status, resp_headers, data
+
+    async def _post_ssml(self, ssml, settings, dest, chars, on_event=None, output_format=OUTPUT_FORMAT):
+        # same routing, failover and quota handling as SpeechClient.post_ssml;
+        # chars is the spoken text's length
+        resources = endpoint_pool(settings)
+        if not resources:
+            raise TTSError("API Key/Endpoint missing in Settings.")
+        body = ssml.encode("utf-8")
+        tried = set()
+        error = None
+        throttles = 0
+        while True:
+            res, wait = ROUTER.acquire(resources, exclude=tried)
+            if res is None:
+                raise error
+            wait = max(wait, QUOTA.reserve(res, chars))
+            if wait:
+                try:
+                    await asyncio.sleep(wait)
+                except BaseException:
+                    ROUTER.release(res)
+                    raise
+            limit = QUOTA.limit_for(res)
+            if not limit.try_acquire():
+                # at its limit since a 429: wait without counting as in flight there
+                ROUTER.release(res)
+                if not await limit.acquire_async(self.timeout):
+                    raise TTSError(f"{res['endpoint']}: no request slot free within {self.timeout}s")
+                ROUTER.acquire([res])
+            started = time.perf_counter()
+            try:
+                status, resp_headers, data = await self._post_to(res, body, dest, on_event, output_format)
+            except (ConnectionError, OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+                # network only: disk errors arrive as OutputError and take the path below
+                ROUTER.release(res, failed=True)
+                tried.add((res["api_key"], res["endpoint"]))
+                error = TTSError(f"{res['endpoint']}: {e!r}")
+                continue
+            except BaseException:
+                ROUTER.release(res)
+                raise
+            finally:
+                limit.release()
+            if status == 200:
+                ROUTER.release(res, latency=time.perf_counter() - started)
+                QUOTA.succeeded(res, chars)
+                return dest
+            if status == 429 and throttles < MAX_THROTTLE_RETRIES:
+                QUOTA.throttled(res)
+                ROUTER.release(res)
+                ROUTER.throttle(res, QUOTA.backoff(throttles, parse_retry_after(resp_headers.get("retry-after"))))
+                throttles += 1
+                continue
+            ROUTER.release(res, failed=is_endpoint_failure(status))
+            error = TTSError(f"HTTP {status}\n{data.decode('utf-8', 'replace')}", status)
+            if is_endpoint_failure(status):
+                tried.add((res["api_key"], res["endpoint"]))
+                continue
+            raise error
+
+    async def _render(self, ssml, chars, content_hash, settings, on_event, output_format=OUTPUT_FORMAT):
+        # one request into the cache; returns the blob path
+        blob = await asyncio.to_thread(cache_get, content_hash)
+        if blob:
+            emit(on_event, "cached")
+            return blob
+        tmp_path = await _disk(_cache_part, content_hash)
+        try:
+            await self._post_ssml(ssml, settings, tmp_path, chars, on_event, output_format)
+        except BaseException:
+            _discard(tmp_path)
+            raise
+        return await _disk(cache_put, content_hash, tmp_path, None, format_ext(output_format))
+
+    async def synthesize(self, text, voice_key, style, save_path=None, on_event=None, output_format=None):
+        # async counterpart of synthesize_text: dedup, cache, segments and history included
+        if self.settings is None:
+            self.settings = await asyncio.to_thread(load_settings)
+        settings = self.settings
+        started = time.perf_counter()
+        output_format = pick_format(settings, voice_key, output_format)
+        ext = format_ext(output_format)
+        content_hash = compute_hash(text, voice_key, style, output_format)
+        existing = await asyncio.to_thread(find_existing_output, content_hash)
+        if existing:
+            return existing
+        if save_path is None:
+            folder = await _disk(ensure_folder, settings.get("default_folder") or config.AUDIO_OUTPUT_DIR)
+            save_path = batch_output_path(folder, text, content_hash, ext)
+
+        lang, gender, voice_name = VOICES[voice_key]
+        segments = split_for_format(text, output_format)
+        blob = await asyncio.to_thread(cache_get, content_hash)
+        if not blob and len(segments) == 1:
+            blob = await self._render(to_ssml(segments[0], lang, gender, voice_name, style), len(segments[0]),
+                                      content_hash, settings, tag_events(on_event, part=0, parts=1), output_format)
+        elif not blob:
+            seg_hashes = [compute_hash(seg, voice_key, style, output_format) for seg in segments]
+            cache_pin(seg_hashes)
+            try:
+                parts = await asyncio.gather(*(
+                    self._render(to_ssml(seg, lang, gender, voice_name, style), len(seg), h, settings,
+                                 tag_events(on_event, part=i, parts=len(segments)), output_format)
+                    for i, (seg, h) in enumerate(zip(segments, seg_hashes))))
+                tmp_path = await _disk(_cache_part, content_hash)
+                try:
+                    await _disk(concat_parts, parts, tmp_path, output_format)
+                    blob = await _disk(cache_put, content_hash, tmp_path, None, ext)
+                finally:
+                    _discard(tmp_path)   # already moved into the store unless something failed
+            finally:
+                cache_unpin(seg_hashes)
+        else:
+            emit(on_event, "cached")
+        max_mb = settings.get("cache_max_mb", DEFAULT_CACHE_MAX_MB)
+        await asyncio.to_thread(cache_evict, max_mb * 1024 * 1024, content_hash)
+        await _disk(link_output, blob, save_path)
+        emit(on_event, "written", path=save_path)
+        await asyncio.to_thread(add_history, text, voice_key, style, output_format, content_hash, save_path)
+        emit(on_event, "history")
+        # record() may flush pending metrics to sqlite
+        elapsed = time.perf_counter() - started
+        await asyncio.to_thread(lambda: METRICS.record(
+            "total", elapsed, content_hash=content_hash,
+            request_bytes=len(text.encode("utf-8")), response_bytes=os.path.getsize(save_path)))
+        return save_path
@@ -0,0 +1,163 @@
+# Headless batch
+import os
+import csv
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from . import config
+from .storage import init_db, load_settings, HistoryBatch
+from .text import (VOICES, STYLES, OUTPUT_FORMATS, FILE_EXT, compute_hash, ensure_folder, sanitize_filename,
+                   find_existing_output, format_ext, is_mp3_format, pick_format)
+from .net import TTSError, flush_usage, http_stats
+from .metrics import flush_metrics
+from .cache import cache_get
+from .synthesis import synthesize_text
+from .packing import PACK_UTTERANCE_MAX_CHARS, pack_utterances, synthesize_pack
+from .engines import batch_engine
+
+def load_manifest(path):
+    # JSONL (one object per line) or CSV with a header row; columns: text, voice, style
+    # and optionally format (an X-Microsoft-OutputFormat value from OUTPUT_FORMATS)
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            records = list(csv.DictReader(f))
+    else:
+        records = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    records.append(json.loads(line))
+
+    items = []
+    for n, rec in enumerate(records, 1):
+        text = (rec.get("text") or "").strip()
+        voice_key = (rec.get("voice") or list(VOICES.keys())[0]).strip()
+        style = (rec.get("style") or STYLES[0]).strip()
+        output_format = (rec.get("format") or "").strip() or None
+        if not text:
+            raise ValueError(f"{path}: row {n} has no text")
+        if voice_key not in VOICES:
+            raise ValueError(f"{path}: row {n} has unknown voice {voice_key!r}")
+        if style not in STYLES:
+            raise ValueError(f"{path}: row {n} has unknown style {style!r}")
+        if output_format and output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"{path}: row {n} has unknown format {output_format!r}")
+        items.append({"text": text, "voice_key": voice_key, "style": style, "output_format": output_format})
+    return items
+
+def batch_output_path(base_folder, text, content_hash, ext=FILE_EXT):
+    # hash suffix keeps names unique when many rows start with the same words
+    fname = sanitize_filename(text[:40]) + "_" + content_hash[:12] + ext
+    return os.path.join(base_folder, fname)
+
+def run_batch(items, workers=4, out_folder=None, log=print, pack=False, output_format=None, engine=None):
+    # pack=True sends short texts several at a time through an engine that reports
+    # bookmarks (see packing.py); output_format applies to rows that don't name their
+    # own format; engine overrides the configured one (see engines.py)
+    init_db()
+    settings = load_settings()
+    if engine:
+        settings["engine"] = engine
+    base_folder = ensure_folder(out_folder or settings["default_folder"] or config.AUDIO_OUTPUT_DIR)
+    stats = {"total": len(items), "done": 0, "skipped": 0, "failed": 0, "chars": 0}
+
+    # drop duplicate rows up front so two workers never render the same hash
+    jobs = []
+    seen = set()
+    for item in items:
+        item = dict(item, output_format=pick_format(settings, item["voice_key"],
+                                                    item.get("output_format") or output_format))
+        content_hash = compute_hash(item["text"], item["voice_key"], item["style"], item["output_format"])
+        if content_hash in seen:
+            stats["skipped"] += 1
+            continue
+        seen.add(content_hash)
+        jobs.append((item, content_hash))
+
+    def run_one(item, content_hash):
+        existing = find_existing_output(content_hash)
+        if existing:
+            return "skipped", existing
+        save_path = batch_output_path(base_folder, item["text"], content_hash, format_ext(item["output_format"]))
+        synthesize_text(item["text"], item["voice_key"], item["style"], save_path, settings,
+                        content_hash=content_hash, history=history.add, output_format=item["output_format"])
+        return "done", save_path
+
+    def run_pack(pack):
+        # one request for the whole pack; utterances it couldn't cut out go one by one
+        results = [None] * len(pack)
+        todo = []
+        for i, item in enumerate(pack):
+            existing = find_existing_output(item["content_hash"])
+            if existing:
+                results[i] = ("skipped", existing)
+            else:
+                item["save_path"] = batch_output_path(base_folder, item["text"], item["content_hash"],
+                                                      format_ext(item["output_format"]))
+                todo.append(i)
+        written = synthesize_pack([pack[i] for i in todo], settings, history=history.add,
+                                  engine=packer) if todo else {}
+        for n, i in enumerate(todo):
+            if n in written:
+                results[i] = ("done", written[n])
+            else:
+                try:
+                    results[i] = run_one(pack[i], pack[i]["content_hash"])
+                except Exception as e:
+                    results[i] = e
+        return results
+
+    packer = None
+    if pack:
+        try:
+            packer = batch_engine(settings)
+        except TTSError as e:
+            log(f"[warning] {e} Sending one text per request instead.")
+            pack = False
+
+    # work units: (items, fn, args); fn returns one result per item
+    units = []
+    if pack:
+        # only MP3 can be cut at bookmarks without re-encoding
+        short = [dict(item, content_hash=h) for item, h in jobs
+                 if len(item["text"]) <= PACK_UTTERANCE_MAX_CHARS and is_mp3_format(item["output_format"])
+                 and not cache_get(h)]
+        packed = {item["content_hash"] for item in short}
+        jobs = [(item, h) for item, h in jobs if h not in packed]
+        units += [(p, run_pack, (p,)) for p in pack_utterances(short)]
+    units += [([item], lambda item, h: [run_one(item, h)], (item, h)) for item, h in jobs]
+
+    started = time.perf_counter()
+    with HistoryBatch() as history, ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(fn, *args): unit_items for unit_items, fn, args in units}
+        for fut in as_completed(futures):
+            unit_items = futures[fut]
+            try:
+                results = fut.result()
+            except Exception as e:
+                results = [e] * len(unit_items)
+            for item, result in zip(unit_items, results):
+                if isinstance(result, Exception):
+                    stats["failed"] += 1
+                    log(f"[failed] {item['text'][:40]}: {result}")
+                    continue
+                status, path = result
+                stats[status] += 1
+                if status == "done":
+                    stats["chars"] += len(item["text"])
+                log(f"[{status}] {path}")
+    elapsed = time.perf_counter() - started
+    flush_usage()
+    flush_metrics()
+
+    stats["elapsed"] = elapsed
+    stats["items_per_sec"] = stats["done"] / elapsed if elapsed > 0 else 0.0
+    stats["chars_per_sec"] = stats["chars"] / elapsed if elapsed > 0 else 0.0
+    log(f"{stats['done']} synthesized, {stats['skipped']} skipped, {stats['failed']} failed "
+        f"in {elapsed:.2f}s ({stats['items_per_sec']:.2f} items/s, {stats['chars_per_sec']:.0f} chars/s)")
+    net = http_stats()
+    log(f"{net['requests']} HTTP requests over {net['connections']} connections "
+        f"(avg handshake {net['avg_connect_ms']:.1f} ms)")
+    return stats
@@ -0,0 +1,93 @@
+# Content-addressed audio cache
+import os
+import shutil
+import threading
+import time
+
+from . import config
+from .storage import get_db
+from .text import FILE_EXT, ensure_folder
+
+_cache_lock = threading.Lock()
+_cache_pins = {}  # content_hash -> number of jobs still reading the blob
+
+def cache_pin(hashes):
+    with _cache_lock:
+        for h in hashes:
+            _cache_pins[h] = _cache_pins.get(h, 0) + 1
+
+def cache_unpin(hashes):
+    with _cache_lock:
+        for h in hashes:
+            _cache_pins[h] -= 1
+            if not _cache_pins[h]:
+                del _cache_pins[h]
+
+def cache_blob_path(content_hash, ext=FILE_EXT):
+    # sharded as tts_cache/ab/cd/<hash>.mp3 so no directory gets huge
+    return os.path.join(config.CACHE_DIR, content_hash[:2], content_hash[2:4], content_hash + ext)
+
+def cache_get(content_hash):
+    con = get_db()
+    row = con.execute("SELECT blob_path FROM audio_cache WHERE content_hash=?", (content_hash,)).fetchone()
+    if not row:
+        return None
+    with con:
+        if not os.path.exists(row[0]):
+            # blob removed behind our back
+            con.execute("DELETE FROM audio_cache WHERE content_hash=?", (content_hash,))
+            return None
+        con.execute("UPDATE audio_cache SET last_access=? WHERE content_hash=?", (time.time(), content_hash))
+    return row[0]
+
+def cache_put(content_hash, src_path, max_bytes=None, ext=FILE_EXT):
+    # move a finished file into the store and return its blob path; max_bytes=None skips eviction.
+    # ext only names the blob: the format is already part of content_hash
+    blob = cache_blob_path(content_hash, ext)
+    ensure_folder(os.path.dirname(blob))
+    os.replace(src_path, blob)
+    con = get_db()
+    with con:
+        con.execute("""
+            INSERT OR REPLACE INTO audio_cache (content_hash, blob_path, size, last_access)
+            VALUES (?, ?, ?, ?)
+        """, (content_hash, blob, os.path.getsize(blob), time.time()))
+    if max_bytes is not None:
+        cache_evict(max_bytes, keep=content_hash)
+    return blob
+
+def cache_evict(max_bytes, keep=None):
+    # drop least recently used blobs until the store fits in max_bytes
+    with _cache_lock:
+        con = get_db()
+        total = con.execute("SELECT COALESCE(SUM(size), 0) FROM audio_cache").fetchone()[0]
+        if total <= max_bytes:
+            return 0
+        evicted = []
+        for content_hash, blob, size in con.execute(
+                "SELECT content_hash, blob_path, size FROM audio_cache ORDER BY last_access ASC").fetchall():
+            if total <= max_bytes:
+                break
+            if content_hash == keep or content_hash in _cache_pins:
+                continue
+            try:
+                os.remove(blob)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue
+            evicted.append((content_hash,))
+            total -= size
+        with con:
+            con.executemany("DELETE FROM audio_cache WHERE content_hash=?", evicted)
+        return len(evicted)
+
+def link_output(blob, save_path):
+    # user-facing file shares the blob's bytes via a hardlink; copy where links aren't supported
+    if os.path.exists(save_path):
+        os.remove(save_path)
+    try:
+        os.link(blob, save_path)
+    except OSError:
+        shutil.copyfile(blob, save_path)
+    return save_path
@@ -0,0 +1,107 @@
+# Command line: batch runs, watch folders, endpoint management, usage, metrics and history sweeps.
+import sys
+import argparse
+
+from .storage import init_db, load_settings, add_endpoint, delete_endpoint, list_usage
+from .text import VOICES, STYLES, OUTPUT_FORMATS
+
+def cli(argv):
+    parser = argparse.ArgumentParser(prog="text2audio", description="Text-to-Audio without the GUI.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_batch = sub.add_parser("batch", help="synthesize every row of a JSONL/CSV manifest")
+    p_batch.add_argument("manifest", help="JSONL or CSV file with text, voice and style columns")
+    p_batch.add_argument("-w", "--workers", type=int, default=4, help="concurrent requests (default 4)")
+    p_batch.add_argument("-o", "--out", help="output folder (default: Settings save folder)")
+    p_batch.add_argument("--pack", action="store_true",
+                         help="send short texts several per request via the Speech SDK, split at bookmarks")
+    p_batch.add_argument("--engine", choices=("rest", "sdk", "fake"),
+                         help="synthesis engine (default: rest, or TEXT2AUDIO_ENGINE); fake renders silent "
+                              "audio offline for load tests")
+    p_batch.add_argument("--format", choices=sorted(OUTPUT_FORMATS), metavar="FORMAT",
+                         help="output format for rows without a format column (default: per voice from Settings); "
+                              "one of " + ", ".join(OUTPUT_FORMATS))
+    p_watch = sub.add_parser("watch", help="synthesize .txt scripts dropped into folders, next to each script")
+    p_watch.add_argument("folders", nargs="+", metavar="folder")
+    p_watch.add_argument("--voice", choices=list(VOICES), metavar="VOICE",
+                         help="voice for every script (default: " + list(VOICES)[0] + "); one of " + ", ".join(VOICES))
+    p_watch.add_argument("--style", choices=STYLES, default=STYLES[0], help=f"default {STYLES[0]}")
+    p_watch.add_argument("--format", choices=sorted(OUTPUT_FORMATS), metavar="FORMAT",
+                         help="output format (default: the voice's format from Settings)")
+    p_watch.add_argument("--engine", choices=("rest", "sdk", "fake"), help="synthesis engine (default: rest)")
+    p_watch.add_argument("-w", "--workers", type=int, default=4, help="concurrent requests (default 4)")
+    p_watch.add_argument("-r", "--recursive", action="store_true", help="also watch subfolders")
+    p_watch.add_argument("--interval", type=float, default=5.0, help="seconds between scans (default 5)")
+    p_watch.add_argument("--once", action="store_true", help="scan once and exit")
+    p_ep = sub.add_parser("endpoints", help="manage extra Speech resources used for load balancing")
+    ep_sub = p_ep.add_subparsers(dest="action", required=True)
+    ep_sub.add_parser("list", help="show configured resources")
+    p_add = ep_sub.add_parser("add", help="add a resource")
+    p_add.add_argument("api_key")
+    p_add.add_argument("region")
+    p_add.add_argument("endpoint", nargs="?", help="default: https://<region>.tts.speech.microsoft.com/cognitiveservices/v1")
+    p_add.add_argument("--rpm", type=int, default=0, help="requests per minute allowed on this key (0 = no limit)")
+    p_add.add_argument("--cpm", type=int, default=0, help="characters per minute allowed on this key (0 = no limit)")
+    p_rm = ep_sub.add_parser("remove", help="remove a resource by id")
+    p_rm.add_argument("id", type=int)
+    p_usage = sub.add_parser("usage", help="show requests, characters and 429s per day")
+    p_usage.add_argument("--days", type=int, default=30)
+    p_metrics = sub.add_parser("metrics", help="per-stage latency percentiles")
+    p_metrics.add_argument("--days", type=float, default=1, help="look back this many days (default 1)")
+    p_metrics.add_argument("--format", choices=("json", "prometheus"), default="json")
+    p_sweep = sub.add_parser("sweep", help="reconcile history with the output folders and apply retention")
+    p_sweep.add_argument("--days", type=int, help="delete outputs older than this (default: Settings, 0 = keep)")
+    p_sweep.add_argument("--max-mb", type=int, help="delete the oldest outputs past this total (default: Settings)")
+    p_sweep.add_argument("--remove-orphans", action="store_true",
+                         help="also delete audio files in the output folders that no history row references")
+    p_sweep.add_argument("-n", "--dry-run", action="store_true", help="report without changing anything")
+    args = parser.parse_args(argv)
+
+    if args.command == "batch":
+        from .batch import run_batch, load_manifest
+        stats = run_batch(load_manifest(args.manifest), workers=args.workers, out_folder=args.out,
+                          pack=args.pack, output_format=args.format, engine=args.engine)
+        return 1 if stats["failed"] else 0
+    if args.command == "watch":
+        from .watch import watch
+        try:
+            stats = watch(args.folders, args.interval, args.once, engine=args.engine, voice_key=args.voice,
+                          style=args.style, output_format=args.format, workers=args.workers,
+                          recursive=args.recursive)
+        except KeyboardInterrupt:
+            return 0
+        return 1 if stats["failed"] else 0
+    if args.command == "endpoints":
+        init_db()
+        if args.action == "add":
+            print(add_endpoint(args.api_key, args.region, args.endpoint, args.rpm, args.cpm))
+        elif args.action == "remove":
+            delete_endpoint(args.id)
+        else:
+            sett = load_settings()
+            print(f"-  {sett['region']}  {sett['endpoint']}  (Settings)")
+            for ep in sett["endpoints"]:
+                print(f"{ep['id']}  {ep['region']}  {ep['endpoint']}")
+    if args.command == "usage":
+        init_db()
+        print("day         requests     chars  throttled  resource")
+        for day, resource, requests_, chars, throttled in list_usage(args.days):
+            print(f"{day}  {requests_:8d}  {chars:8d}  {throttled:9d}  {resource}")
+    if args.command == "metrics":
+        from .metrics import metrics_json, metrics_prometheus
+        init_db()
+        print(metrics_prometheus(args.days) if args.format == "prometheus" else metrics_json(args.days), end="")
+    if args.command == "sweep":
+        from .sweeper import sweep
+        init_db()
+        stats = sweep(args.days, args.max_mb, args.remove_orphans, args.dry_run)
+        for path in stats["orphans"]:
+            print(f"unreferenced  {path}")
+        for folder in stats["skipped"]:
+            print(f"not readable  {folder} (its entries were left alone)")
+        print(f"{stats['rows']} rows in {stats['folders']} folders: {stats['missing']} missing, "
+              f"{stats['found']} found again, {stats['expired']} expired, {len(stats['orphans'])} unreferenced, "
+              f"{stats['freed_bytes'] / 1048576:.1f} MB freed" + (" (dry run)" if args.dry_run else ""))
+    return 0
+
+def main():
+    sys.exit(cli(sys.argv[1:]))
@@ -0,0 +1,195 @@
+# Blocking Speech REST client on a shared requests.Session. This is the one
+# module that imports requests/urllib3; the rest of the package loads it lazily.
+import time
+import threading
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+
+from .jobs import current_job, check_cancelled, cancellable_sleep, JobCancelled
+from .net import (TTSError, CONNECT_STATS, HTTP_POOL_SIZE, TOKEN_TTL, ROUTER, QUOTA, MAX_THROTTLE_RETRIES,
+                  endpoint_pool, token_url_for, parse_retry_after, is_endpoint_failure)
+from .text import OUTPUT_FORMAT, spoken_chars
+
+# connection classes that time TCP connect + TLS handshake, and register with
+# the current job while a request is in flight so cancelling it can abort the transfer
+class _JobConnectionMixin:
+    def connect(self):
+        started = time.perf_counter()
+        super().connect()
+        CONNECT_STATS.add_connect(time.perf_counter() - started)
+
+    def request(self, *args, **kwargs):
+        job = current_job()
+        if job is not None:
+            job.watch(self)
+            check_cancelled()
+        return super().request(*args, **kwargs)
+
+class _JobPoolMixin:
+    def _put_conn(self, conn):
+        # response fully read (or closed): the socket may now serve other jobs
+        job = current_job()
+        if job is not None and conn is not None:
+            job.unwatch(conn)
+        super()._put_conn(conn)
+
+class _TimedHTTPConnection(_JobConnectionMixin, urllib3.connection.HTTPConnection):
+    pass
+
+class _TimedHTTPSConnection(_JobConnectionMixin, urllib3.connection.HTTPSConnection):
+    pass
+
+class _TimedHTTPConnectionPool(_JobPoolMixin, urllib3.HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+class _TimedHTTPSConnectionPool(_JobPoolMixin, urllib3.HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+class _TimedAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+class SpeechClient:
+    # one keep-alive session shared by every synthesis path; urllib3's pool is thread-safe
+    def __init__(self, pool_size=HTTP_POOL_SIZE):
+        self.session = requests.Session()
+        adapter = _TimedAdapter(pool_connections=16, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._token_lock = threading.Lock()
+        self._tokens = {}  # (api_key, token_url) -> (token, expires_at)
+
+    def get_token(self, settings, force=False):
+        api_key = (settings.get("api_key") or "").strip()
+        url = token_url_for(settings)
+        key = (api_key, url)
+        with self._token_lock:
+            cached = self._tokens.get(key)
+            if cached and not force and cached[1] > time.monotonic():
+                return cached[0]
+            CONNECT_STATS.add_request()
+            resp = self.session.post(url, headers={"Ocp-Apim-Subscription-Key": api_key,
+                                                   "Content-Length": "0"}, timeout=30)
+            if resp.status_code != 200:
+                raise TTSError(f"Token request failed: HTTP {resp.status_code}\n{resp.text}", resp.status_code)
+            self._tokens[key] = (resp.text.strip(), time.monotonic() + TOKEN_TTL)
+            return self._tokens[key][0]
+
+    def _post_to(self, res, body, timeout, stream, output_format=OUTPUT_FORMAT):
+        for attempt in range(2):
+            headers = {
+                "Authorization": "Bearer " + self.get_token(res, force=attempt > 0),
+                "Content-Type": "application/ssml+xml",
+                "X-Microsoft-OutputFormat": output_format,
+                # audio is streamed from resp.raw, which is never decompressed
+                "Accept-Encoding": "identity"
+            }
+            CONNECT_STATS.add_request()
+            resp = self.session.post(res["endpoint"], headers=headers, data=body, timeout=timeout, stream=stream)
+            # token revoked or expired early: fetch a fresh one and retry once
+            if resp.status_code != 401 or attempt:
+                return resp
+            resp.content  # drain so the connection goes back to the pool
+
+    def post_ssml(self, ssml, settings, timeout=120, stream=False, output_format=OUTPUT_FORMAT, chars=None):
+        # routed over endpoint_pool(settings), failing over on 5xx/timeouts and
+        # waiting out 429s. chars is the spoken text's length, what the character
+        # quota is charged (None: counted from the SSML). With stream=True the
+        # caller must read the response and then call resp.release_route(failed)
+        # to free its slot.
+        resources = endpoint_pool(settings)
+        if not resources:
+            raise TTSError("API Key/Endpoint missing in Settings.")
+        body = ssml.encode("utf-8")
+        if chars is None:
+            chars = spoken_chars(ssml)
+        job = current_job()
+        tried = set()
+        error = None
+        throttles = 0
+        while True:
+            check_cancelled()
+            res, wait = ROUTER.acquire(resources, exclude=tried)
+            if res is None:
+                raise error
+            wait = max(wait, QUOTA.reserve(res, chars))
+            if wait:
+                try:
+                    cancellable_sleep(wait)
+                except JobCancelled:
+                    ROUTER.release(res)
+                    raise
+            limit = QUOTA.limit_for(res)
+            if not limit.try_acquire():
+                # the endpoint is at its limit since a 429: wait for a slot
+                # without counting as in flight there
+                ROUTER.release(res)
+                if not limit.acquire(timeout, job.cancelled if job is not None else None):
+                    check_cancelled()
+                    raise TTSError(f"{res['endpoint']}: no request slot free within {timeout}s")
+                ROUTER.acquire([res])
+            started = time.perf_counter()
+            try:
+                resp = self._post_to(res, body, timeout, stream, output_format)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                limit.release()
+                if job is not None and job.cancelled.is_set():
+                    # our own abort, not the endpoint's fault
+                    ROUTER.release(res)
+                    raise JobCancelled() from e
+                ROUTER.release(res, failed=True)
+                tried.add((res["api_key"], res["endpoint"]))
+                error = TTSError(f"{res['endpoint']}: {e}")
+                continue
+            except Exception:
+                limit.release()
+                ROUTER.release(res)
+                raise
+            if resp.status_code == 429 and throttles < MAX_THROTTLE_RETRIES:
+                # throttled: back off this key and put the request back in line
+                delay = QUOTA.backoff(throttles, parse_retry_after(resp.headers.get("Retry-After")))
+                resp.close()
+                limit.release()
+                QUOTA.throttled(res)
+                ROUTER.release(res)
+                ROUTER.throttle(res, delay)
+                throttles += 1
+                continue
+            if resp.status_code != 200:
+                message = f"HTTP {resp.status_code}\n{resp.text}"
+                resp.close()
+                limit.release()
+                ROUTER.release(res, failed=is_endpoint_failure(resp.status_code))
+                error = TTSError(message, resp.status_code)
+                if is_endpoint_failure(resp.status_code):
+                    tried.add((res["api_key"], res["endpoint"]))
+                    continue
+                raise error
+            latency = time.perf_counter() - started
+
+            def release_route(failed=False, res=res, limit=limit, latency=latency):
+                limit.release()
+                ROUTER.release(res, latency=None if failed else latency, failed=failed)
+                if not failed:
+                    QUOTA.succeeded(res, chars)
+            if not stream:
+                release_route()
+                return resp
+            resp.release_route = release_route
+            return resp
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = SpeechClient()
+        return _client
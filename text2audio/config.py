@@ -0,0 +1,23 @@
+# Paths and defaults shared by the GUI, the CLI and the core modules.
+import os
+import sys
+
+def get_app_dir():
+    if getattr(sys, 'frozen', False):
+        # Running as a bundled exe
+        return os.path.dirname(sys.executable)
+    else:
+        # Running as a script: the folder holding main.py
+        return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# TEXT2AUDIO_HOME points a worker (or a benchmark) at its own DB, outputs and cache
+APP_DIR = os.environ.get("TEXT2AUDIO_HOME") or get_app_dir()
+DB_PATH = os.path.join(APP_DIR, "tts_app.db")
+AUDIO_OUTPUT_DIR = os.path.join(APP_DIR, "tts_outputs")
+CACHE_DIR = os.path.join(APP_DIR, "tts_cache")
+DEFAULT_CACHE_MAX_MB = 2048
+
+# synthesis engine when Settings don't name one: "rest", "sdk" or "fake" (offline, see engines.py)
+ENGINE = os.environ.get("TEXT2AUDIO_ENGINE") or "rest"
+# seconds the fake engine waits before its first byte, to stand in for network latency
+FAKE_LATENCY = float(os.environ.get("TEXT2AUDIO_FAKE_LATENCY") or 0)
@@ -0,0 +1,260 @@
+# Synthesis engines: one interface over the REST API, the Speech SDK and an
+# offline fake, so the pipeline above (segments, cache, history, batch) doesn't
+# care which one renders the audio. get_engine picks one by settings["engine"],
+# falling back to config.ENGINE (TEXT2AUDIO_ENGINE).
+import os
+import re
+import math
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+
+from . import config
+from .text import OUTPUT_FORMAT, OUTPUT_FORMATS
+from .progress import emit
+from .jobs import check_cancelled, cancellable_sleep
+from .net import TTSError
+from .metrics import METRICS
+from .mp3 import mp3_params, frame_header, parse_frame_header
+from .wav import pcm_params, wav_header, patch_wav_sizes
+
+def get_client():
+    # the requests-based client is only imported once something is actually synthesized
+    from .client import get_client
+    return get_client()
+
+DOWNLOAD_CHUNK = 64 * 1024
+
+# ------------------------------
+# Writing audio to disk
+# ------------------------------
+def write_chunks(chunks, save_path, on_event=None, output_format=OUTPUT_FORMAT, total=None):
+    # chunks go into a temp file that only takes save_path's name once the last
+    # one is in; raw PCM gets a WAV header up front whose sizes are filled in at the end
+    folder = os.path.dirname(save_path) or "."
+    fd, tmp_path = tempfile.mkstemp(prefix="." + os.path.basename(save_path) + ".", suffix=".part", dir=folder)
+    received = 0
+    pcm = pcm_params(output_format)
+    try:
+        with os.fdopen(fd, "wb", buffering=0) as f:
+            if pcm:
+                f.write(wav_header(*pcm))
+            for chunk in chunks:
+                f.write(chunk)
+                if not received:
+                    emit(on_event, "first_byte", total=total)
+                received += len(chunk)
+                emit(on_event, "bytes", n=len(chunk), received=received, total=total)
+            if pcm:
+                patch_wav_sizes(f, received)
+        # a cancelled job's socket is shut down, which can look like a clean end of body
+        check_cancelled()
+        if total is not None and received != total:
+            raise TTSError(f"Download incomplete: {received} of {total} bytes")
+        os.replace(tmp_path, save_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    emit(on_event, "downloaded", received=received)
+    return save_path
+
+def iter_response(resp):
+    # body through one reused buffer; each view is only valid until the next one
+    view = memoryview(bytearray(DOWNLOAD_CHUNK))
+    while True:
+        n = resp.raw.readinto(view)
+        if not n:
+            return
+        yield view[:n]
+
+def stream_to_file(resp, save_path, on_event=None, output_format=OUTPUT_FORMAT):
+    total = resp.headers.get("Content-Length")
+    total = int(total) if total and total.isdigit() else None
+    try:
+        return write_chunks(iter_response(resp), save_path, on_event, output_format, total)
+    finally:
+        resp.close()
+
+# ------------------------------
+# Engines
+# ------------------------------
+class Engine(ABC):
+    # subclasses implement stream(); synthesize() and batch() have defaults on top of it
+    name = None
+
+    def capabilities(self):
+        # formats: output formats it can produce; streaming: audio arrives while it is
+        # rendered; batch: several utterances per request with bookmark offsets;
+        # network: needs the service (and a key)
+        return {"formats": set(OUTPUT_FORMATS), "streaming": True, "batch": False, "network": True}
+
+    def check(self):
+        # raises TTSError if the engine can't run in this install
+        pass
+
+    @abstractmethod
+    def stream(self, ssml, settings, output_format=OUTPUT_FORMAT, timeout=120):
+        # yields encoded audio chunks (raw PCM without a WAV header)
+        ...
+
+    def synthesize(self, ssml, save_path, settings, output_format=OUTPUT_FORMAT, timeout=120, on_event=None,
+                   chars=None):
+        # chars: length of the text behind ssml, for engines that bill by it
+        emit(on_event, "request")
+        return write_chunks(self.stream(ssml, settings, output_format, timeout), save_path, on_event, output_format)
+
+    def batch(self, ssml, settings, output_format=OUTPUT_FORMAT):
+        # one request for several utterances marked with <bookmark>s (see to_packed_ssml);
+        # returns (audio bytes, {mark: offset in seconds})
+        raise TTSError(f"The {self.name} engine can't report bookmark offsets.")
+
+class RestEngine(Engine):
+    # the Azure REST API through SpeechClient: pooled connections, endpoint failover, quotas
+    name = "rest"
+
+    def stream(self, ssml, settings, output_format=OUTPUT_FORMAT, timeout=120, chars=None):
+        resp = get_client().post_ssml(ssml, settings, timeout=timeout, stream=True, output_format=output_format,
+                                      chars=chars)
+        import requests, urllib3
+        failed = False
+        try:
+            yield from iter_response(resp)
+        except (requests.ConnectionError, requests.Timeout, urllib3.exceptions.HTTPError):
+            failed = True
+            raise
+        finally:
+            resp.close()
+            resp.release_route(failed=failed)
+
+    def synthesize(self, ssml, save_path, settings, output_format=OUTPUT_FORMAT, timeout=120, on_event=None,
+                   chars=None):
+        emit(on_event, "request")
+        with METRICS.timer("ttfb", request_bytes=len(ssml.encode("utf-8"))) as t:
+            resp = get_client().post_ssml(ssml, settings, timeout=timeout, stream=True, output_format=output_format,
+                                          chars=chars)
+            t.info["status"] = resp.status_code
+        import requests, urllib3     # already loaded by get_client()
+        try:
+            with METRICS.timer("download", status=resp.status_code) as t:
+                stream_to_file(resp, save_path, on_event, output_format)
+                t.info["response_bytes"] = os.path.getsize(save_path)
+        except (requests.ConnectionError, requests.Timeout, urllib3.exceptions.HTTPError):
+            resp.release_route(failed=True)
+            raise
+        except BaseException:
+            resp.release_route()
+            raise
+        resp.release_route()
+        return save_path
+
+class SdkEngine(Engine):
+    # azure-cognitiveservices-speech; the only real engine that reports bookmark offsets
+    name = "sdk"
+
+    def capabilities(self):
+        from .sdk import SDK_OUTPUT_FORMATS
+        return dict(super().capabilities(), formats=set(SDK_OUTPUT_FORMATS), batch=True)
+
+    def check(self):
+        from .sdk import speechsdk
+        speechsdk()
+
+    def stream(self, ssml, settings, output_format=OUTPUT_FORMAT, timeout=120):
+        from .sdk import stream_ssml
+        for chunk in stream_ssml(ssml, settings, output_format):
+            check_cancelled()
+            yield chunk
+
+    def batch(self, ssml, settings, output_format=OUTPUT_FORMAT):
+        from .sdk import synthesize_with_bookmarks
+        return synthesize_with_bookmarks(ssml, settings, output_format)
+
+# ------------------------------
+# Offline fake
+# ------------------------------
+FAKE_SECONDS_PER_CHAR = 0.065   # roughly a neural voice's speaking rate
+FAKE_TOKEN_REGEX = re.compile(r"<bookmark mark='([^']*)'\s*/>|<break time='(\d+)(ms|s)'\s*/>|<[^>]+>|([^<]+)")
+
+class FakeEngine(Engine):
+    # Deterministic and offline: silent but valid MP3 frames (or PCM) whose length
+    # follows the text, breaks and bookmarks of the SSML. Lets the cache, batch and
+    # concurrency paths be load-tested without a key or a network.
+    name = "fake"
+
+    def __init__(self, latency=None):
+        self.latency = latency      # None: config.FAKE_LATENCY
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def capabilities(self):
+        formats = {f for f in OUTPUT_FORMATS if mp3_params(f) or pcm_params(f)}
+        return dict(super().capabilities(), formats=formats, batch=True, network=False)
+
+    def timeline(self, ssml):
+        # (seconds of audio, {mark: offset}) for the spoken part of the document
+        body = ssml[ssml.find(">", ssml.find("<voice")) + 1:] if "<voice" in ssml else ssml
+        seconds, marks = 0.0, {}
+        for m in FAKE_TOKEN_REGEX.finditer(body):
+            mark, pause, unit, text = m.groups()
+            if mark is not None:
+                marks[mark] = seconds
+            elif pause is not None:
+                seconds += int(pause) / (1000 if unit == "ms" else 1)
+            elif text is not None:
+                seconds += len(text.strip()) * FAKE_SECONDS_PER_CHAR
+        return seconds, marks
+
+    def render(self, seconds, output_format):
+        mp3 = mp3_params(output_format)
+        if mp3:
+            header = frame_header(*mp3)
+            size, samples, sample_rate = parse_frame_header(*header[:3])
+            return (header + bytes(size - 4)) * max(1, math.ceil(seconds * sample_rate / samples))
+        pcm = pcm_params(output_format)
+        if pcm:
+            rate, bits = pcm
+            return bytes(int(seconds * rate) * bits // 8)
+        raise TTSError(f"The fake engine can't produce {output_format}.")
+
+    def _request(self, ssml, output_format):
+        with self.lock:
+            self.requests += 1
+        latency = config.FAKE_LATENCY if self.latency is None else self.latency
+        if latency:
+            cancellable_sleep(latency)
+        check_cancelled()
+        seconds, marks = self.timeline(ssml)
+        return self.render(seconds, output_format), marks
+
+    def stream(self, ssml, settings, output_format=OUTPUT_FORMAT, timeout=120):
+        audio, _ = self._request(ssml, output_format)
+        view = memoryview(audio)
+        for i in range(0, len(audio), DOWNLOAD_CHUNK):
+            yield view[i:i + DOWNLOAD_CHUNK]
+
+    def batch(self, ssml, settings, output_format=OUTPUT_FORMAT):
+        return self._request(ssml, output_format)
+
+ENGINES = {"rest": RestEngine, "sdk": SdkEngine, "fake": FakeEngine}
+_engines = {}
+_engines_lock = threading.Lock()
+
+def get_engine(settings=None, name=None):
+    name = name or (settings or {}).get("engine") or config.ENGINE
+    if name not in ENGINES:
+        raise TTSError(f"Unknown synthesis engine {name!r} (one of {', '.join(ENGINES)}).")
+    with _engines_lock:
+        if name not in _engines:
+            _engines[name] = ENGINES[name]()
+        return _engines[name]
+
+def batch_engine(settings=None):
+    # engine for packed requests: the configured one if it can report bookmarks, else the SDK
+    engine = get_engine(settings)
+    if not engine.capabilities()["batch"]:
+        engine = get_engine(settings, "sdk")
+    engine.check()
+    return engine
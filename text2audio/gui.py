@@ -0,0 +1,821 @@
+# Tk GUI. Nothing in the core package imports this module.
+import os
+import sys
+import queue
+import shutil
+import threading
+import subprocess
+from datetime import datetime
+
+from . import config
+from .config import DEFAULT_CACHE_MAX_MB
+from .storage import (init_db, load_settings, save_settings, add_endpoint, delete_endpoint, get_history_item,
+                      delete_history_item, list_history_page, list_history_since, history_ids_between,
+                      search_history, fill_media_info, HISTORY_PAGE_SIZE)
+from .cache import cache_evict
+from .sweeper import start_sweeper
+from .text import (VOICES, STYLES, OUTPUT_FORMATS, FILE_EXT, FILE_TYPES, compute_hash, ensure_folder,
+                   default_output_path, find_existing_output, format_ext, pick_format)
+from .net import TTSError, endpoint_pool
+from .synthesis import synthesize_text
+from .jobs import JOBS
+
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+
+# format combobox label -> X-Microsoft-OutputFormat value
+FORMAT_BY_LABEL = {label: fmt for fmt, (label, _) in OUTPUT_FORMATS.items()}
+VOICE_DEFAULT = "Voice default"
+
+def file_types(ext):
+    return [(FILE_TYPES.get(ext, "Audio"), f"*{ext}")]
+
+def open_file_cross_platform(path):
+    try:
+        if sys.platform.startswith("win"):
+            os.startfile(path)  # type: ignore
+        elif sys.platform == "darwin":
+            subprocess.run(["open", path], check=False)
+        else:
+            subprocess.run(["xdg-open", path], check=False)
+    except Exception as e:
+        messagebox.showerror("Open Error", str(e))
+
+# how often the Tk thread picks up progress events from workers
+PROGRESS_POLL_MS = 100
+# benchmarks/startup.py sets this to time the window coming up, then the app closes itself
+STARTUP_PROBE = bool(os.environ.get("TEXT2AUDIO_STARTUP_PROBE"))
+
+class App(tk.Tk):
+    def __init__(self):
+        super().__init__()
+        self.title("Text-to-Audio")
+        self.geometry("980x640")
+        self.minsize(820, 600)
+
+        # the DB is opened on a worker once the window is on screen (see on_map)
+        self.settings = None
+        self.storage_ready = threading.Event()
+        self.storage_error = None
+        self.mapped = False
+        self.bind("<Map>", self.on_map)
+
+        # Menu
+        menubar = tk.Menu(self)
+        settings_menu = tk.Menu(menubar, tearoff=0)
+        settings_menu.add_command(label="Settings…", command=self.open_settings)
+        settings_menu.add_separator()
+        settings_menu.add_command(label="History…", command=self.open_history)
+        settings_menu.add_command(label="Jobs…", command=self.open_jobs)
+        menubar.add_cascade(label="Menu", menu=settings_menu)
+        self.config(menu=menubar)
+
+        # Top controls
+        top = ttk.Frame(self)
+        top.pack(fill="x", padx=12, pady=8)
+
+        ttk.Label(top, text="Voice:").grid(row=0, column=0, sticky="w", padx=(0,6))
+        self.voice_var = tk.StringVar(value=list(VOICES.keys())[0])
+        self.voice_combo = ttk.Combobox(top, textvariable=self.voice_var, state="readonly",
+                                        values=list(VOICES.keys()), width=30)
+        self.voice_combo.grid(row=0, column=1, sticky="w")
+
+        ttk.Label(top, text="Style:").grid(row=0, column=2, sticky="w", padx=(18,6))
+        self.style_var = tk.StringVar(value=STYLES[0])
+        self.style_combo = ttk.Combobox(top, textvariable=self.style_var, state="readonly",
+                                        values=STYLES, width=18)
+        self.style_combo.grid(row=0, column=3, sticky="w")
+
+        ttk.Label(top, text="Format:").grid(row=0, column=4, sticky="w", padx=(18,6))
+        self.format_var = tk.StringVar(value=VOICE_DEFAULT)
+        self.format_combo = ttk.Combobox(top, textvariable=self.format_var, state="readonly",
+                                         values=[VOICE_DEFAULT] + list(FORMAT_BY_LABEL), width=30)
+        self.format_combo.grid(row=0, column=5, sticky="w")
+
+        # Pause buttons
+        pause_bar = ttk.Frame(self)
+        pause_bar.pack(fill="x", padx=12, pady=(0,6))
+        ttk.Label(pause_bar, text="Insert Pause at cursor:").pack(side="left")
+        for sec in [1, 2, 3, 5]:
+            ttk.Button(pause_bar, text=f"[p-{sec}]", command=lambda s=sec: self.insert_pause(s)).pack(side="left", padx=4)
+
+        # Text area
+        text_frame = ttk.Frame(self)
+        text_frame.pack(fill="both", expand=True, padx=12, pady=6)
+        ttk.Label(text_frame, text="Enter Text:").pack(anchor="w")
+        self.text = tk.Text(text_frame, wrap="word", height=18)
+        self.text.pack(fill="both", expand=True)
+        self.text.insert("1.0", "नमस्ते! यह एक डेमो है। [p-1] आप कैसे हैं?")
+
+        # Bottom controls
+        bottom = ttk.Frame(self)
+        bottom.pack(fill="x", padx=12, pady=8)
+
+        self.progress = ttk.Progressbar(bottom, orient="horizontal", mode="determinate")
+        self.progress.pack(side="left", fill="x", expand=True, padx=(0,8))
+
+        # status label to show text status
+        self.status_label = ttk.Label(bottom, text="Status: Idle")
+        self.status_label.pack(side="left", padx=(8,12))
+
+        ttk.Button(bottom, text="Cancel", command=self.cancel_current).pack(side="right")
+        ttk.Button(bottom, text="Convert & Save", command=self.convert_and_save).pack(side="right", padx=(0,8))
+        ttk.Button(bottom, text="Jobs", command=self.open_jobs).pack(side="right", padx=(0,8))
+        ttk.Button(bottom, text="Preview / Open Last File", command=self.open_last_file).pack(side="right", padx=(0,8))
+        ttk.Button(bottom, text="History", command=self.open_history).pack(side="right", padx=(0,8))
+
+        self.last_saved_file = None
+        # job updates arrive from worker threads; the Tk thread drains them
+        self.events = queue.Queue()
+        self.current_job = None     # the job the main progress bar follows
+        self.job_callbacks = {}     # job id -> fn(job), run on the Tk thread once it finishes
+        self.jobs_tree = None
+        JOBS.subscribe(self.events.put)
+        self.after(PROGRESS_POLL_MS, self.drain_events)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    # ---- Startup ----
+    def on_map(self, event):
+        # first paint is done: now do the slow part of startup off the Tk thread
+        if event.widget is not self or self.mapped:
+            return
+        self.mapped = True
+        if STARTUP_PROBE:
+            print("mapped", flush=True)
+        threading.Thread(target=self.load_storage, daemon=True).start()
+
+    def load_storage(self):
+        try:
+            init_db()
+            self.settings = load_settings()
+            ensure_folder(self.settings["default_folder"])
+        except Exception as e:
+            self.storage_error = e
+        finally:
+            self.storage_ready.set()
+        if STARTUP_PROBE:
+            print("ready", flush=True)
+            self.after(0, self.destroy)
+            return
+        # durations for history rows saved by older versions, a page at a time
+        try:
+            while not self.storage_error and fill_media_info():
+                pass
+        except Exception:
+            pass
+        # then reconcile history with the output folders, now and every few hours
+        if not self.storage_error:
+            start_sweeper()
+
+    def wait_storage(self):
+        # anything that touches the DB waits for load_storage (normally long finished)
+        self.storage_ready.wait()
+        if self.storage_error:
+            messagebox.showerror("Database Error", str(self.storage_error))
+            return False
+        return True
+
+    # ---- UX helpers ----
+    def insert_pause(self, seconds):
+        token = f"[p-{seconds}]"
+        pos = self.text.index(tk.INSERT)
+        self.text.insert(pos, token)
+
+    # ---- TTS workflow ----
+    def convert_and_save(self):
+        if not self.wait_storage():
+            return
+        text_val = self.text.get("1.0", "end-1c").strip()
+        if not text_val:
+            messagebox.showerror("Error", "कृपया कुछ टेक्स्ट दर्ज करें।")
+            return
+
+        voice_key = self.voice_var.get()
+        if voice_key not in VOICES:
+            messagebox.showerror("Error", "कृपया एक वैध voice चुनें।")
+            return
+        style = self.style_var.get()
+        output_format = pick_format(self.settings, voice_key, FORMAT_BY_LABEL.get(self.format_var.get()))
+        ext = format_ext(output_format)
+
+        # Decide output folder (from Settings)
+        base_folder = self.settings.get("default_folder") or config.AUDIO_OUTPUT_DIR
+        ensure_folder(base_folder)
+        proposed_path = default_output_path(base_folder, text_val, ext)
+
+        # Check duplicates
+        content_hash = compute_hash(text_val, voice_key, style, output_format)
+        path = find_existing_output(content_hash)
+        if path:
+            # Reuse
+            self.last_saved_file = path
+            messagebox.showinfo("Already Exists", f"उसी टेक्स्ट/वॉइस/स्टाइल की फ़ाइल पहले से मौजूद है:\n{path}\n\nनई फ़ाइल नहीं बनाई गई।")
+            return
+
+        # Ask save path (allow user to override file name)
+        save_path = filedialog.asksaveasfilename(
+            initialdir=base_folder,
+            initialfile=os.path.basename(proposed_path),
+            defaultextension=ext,
+            filetypes=file_types(ext)
+        )
+        if not save_path:
+            return
+
+        # Settings check
+        sett = load_settings()
+        api_key = sett["api_key"].strip()
+        endpoint = (sett["endpoint"] or "").strip()
+
+        if not endpoint_pool(sett):
+            if not api_key:
+                messagebox.showerror("Missing API Key", "Settings में API Key जोड़ें।")
+                return
+            if not endpoint:
+                messagebox.showerror("Missing Endpoint", "Settings में Endpoint जोड़ें (e.g., https://<region>.tts.speech.microsoft.com/cognitiveservices/v1).")
+                return
+
+        def finished(job):
+            if job.status == "done":
+                self.last_saved_file = save_path
+                messagebox.showinfo("Success", f"Saved:\n{save_path}")
+            elif job.status == "failed":
+                title = "TTS Error" if isinstance(job.error, TTSError) else "Exception"
+                messagebox.showerror(title, str(job.error))
+
+        self.current_job = self.submit_job(f"Convert: {text_val[:40]}", finished, synthesize_text,
+                                           text_val, voice_key, style, save_path, sett,
+                                           content_hash=content_hash, output_format=output_format)
+        self.show_job(self.current_job)
+
+    # ---- Background jobs ----
+    def submit_job(self, title, on_finish, fn, *args, **kwargs):
+        job = JOBS.submit(title, fn, *args, **kwargs)
+        if on_finish:
+            self.job_callbacks[job.id] = on_finish
+        return job
+
+    def cancel_current(self):
+        if self.current_job and not self.current_job.finished:
+            self.current_job.cancel()
+
+    def show_job(self, job):
+        self.progress["value"] = job.percent if job.status != "failed" else 0
+        text = {"queued": "Queued…", "done": "Completed ✅", "failed": "Failed ❌",
+                "cancelled": "Cancelled"}.get(job.status, job.message)
+        self.status_label.config(text=text)
+
+    def drain_events(self):
+        # job updates from worker threads, applied on the Tk thread
+        changed = {}
+        try:
+            while True:
+                job = self.events.get_nowait()
+                changed[job.id] = job
+        except queue.Empty:
+            pass
+        for job in changed.values():
+            if job is self.current_job:
+                self.show_job(job)
+            if job.finished and job.id in self.job_callbacks:
+                self.job_callbacks.pop(job.id)(job)
+        if changed and self.jobs_tree is not None:
+            self.refresh_jobs()
+        self.after(PROGRESS_POLL_MS, self.drain_events)
+
+    def refresh_jobs(self):
+        tree = self.jobs_tree
+        if tree is None or not tree.winfo_exists():
+            self.jobs_tree = None
+            return
+        selected = tree.selection()
+        tree.delete(*tree.get_children())
+        for job in reversed(JOBS.list()):
+            tree.insert("", "end", iid=str(job.id),
+                        values=(job.id, job.title, job.status, f"{int(job.percent)}%", job.message))
+        tree.selection_set([iid for iid in selected if tree.exists(iid)])
+
+    def open_jobs(self):
+        if self.jobs_tree is not None and self.jobs_tree.winfo_exists():
+            self.jobs_tree.winfo_toplevel().lift()
+            return
+        win = tk.Toplevel(self)
+        win.title("Jobs")
+        win.geometry("760x320")
+
+        cols = ("id", "title", "status", "progress", "message")
+        tree = ttk.Treeview(win, columns=cols, show="headings", selectmode="extended")
+        for c, w in zip(cols, (50, 300, 90, 80, 220)):
+            tree.heading(c, text=c.title())
+            tree.column(c, width=w, anchor="w")
+        tree.pack(fill="both", expand=True, padx=8, pady=8)
+        self.jobs_tree = tree
+
+        def cancel_selected():
+            for iid in tree.selection():
+                JOBS.cancel(int(iid))
+
+        def clear_finished():
+            JOBS.clear_finished()
+            self.refresh_jobs()
+
+        def close():
+            self.jobs_tree = None
+            win.destroy()
+
+        btns = ttk.Frame(win)
+        btns.pack(fill="x", padx=8, pady=(0,8))
+        ttk.Button(btns, text="Cancel Selected", command=cancel_selected).pack(side="left")
+        ttk.Button(btns, text="Clear Finished", command=clear_finished).pack(side="left", padx=6)
+        ttk.Button(btns, text="Close", command=close).pack(side="right")
+        win.protocol("WM_DELETE_WINDOW", close)
+        self.refresh_jobs()
+
+    def on_close(self):
+        JOBS.cancel_all()
+        self.destroy()
+
+    def open_last_file(self):
+        if not self.last_saved_file or not os.path.exists(self.last_saved_file):
+            messagebox.showinfo("Info", "अभी कोई recent फ़ाइल नहीं मिली। History से खोलें।")
+            return
+        open_file_cross_platform(self.last_saved_file)
+
+    # ---- Settings dialog ----
+    def open_settings(self):
+        if not self.wait_storage():
+            return
+        sett = load_settings()
+        win = tk.Toplevel(self)
+        win.title("Settings")
+        win.geometry("620x560")
+        win.transient(self)
+        win.grab_set()
+
+        frm = ttk.Frame(win, padding=12)
+        frm.pack(fill="both", expand=True)
+
+        ttk.Label(frm, text="API Key:").grid(row=0, column=0, sticky="e", pady=6, padx=6)
+        api_var = tk.StringVar(value=sett["api_key"])
+        ttk.Entry(frm, textvariable=api_var, show="•", width=52).grid(row=0, column=1, sticky="we")
+
+        ttk.Label(frm, text="Region:").grid(row=1, column=0, sticky="e", pady=6, padx=6)
+        region_var = tk.StringVar(value=sett["endpoint"].split("//")[1].split(".")[0] if sett["endpoint"] else "northcentralus")
+        ttk.Entry(frm, textvariable=region_var, width=52).grid(row=1, column=1, sticky="we")
+
+        ttk.Label(frm, text="Endpoint:").grid(row=2, column=0, sticky="e", pady=6, padx=6)
+        ep_var = tk.StringVar(value=sett["endpoint"])
+        ttk.Entry(frm, textvariable=ep_var, width=52).grid(row=2, column=1, sticky="we")
+
+        ttk.Label(frm, text="Default Save Folder:").grid(row=3, column=0, sticky="e", pady=6, padx=6)
+        folder_var = tk.StringVar(value=sett["default_folder"])
+        frow = ttk.Frame(frm)
+        frow.grid(row=3, column=1, sticky="we")
+        e = ttk.Entry(frow, textvariable=folder_var, width=42)
+        e.pack(side="left", fill="x", expand=True)
+        def browse_folder():
+            p = filedialog.askdirectory(initialdir=folder_var.get() or os.getcwd())
+            if p:
+                folder_var.set(p)
+        ttk.Button(frow, text="Browse", command=browse_folder).pack(side="left", padx=(6,0))
+
+        ttk.Label(frm, text="Cache Limit (MB):").grid(row=4, column=0, sticky="e", pady=6, padx=6)
+        cache_var = tk.StringVar(value=str(sett["cache_max_mb"]))
+        ttk.Entry(frm, textvariable=cache_var, width=12).grid(row=4, column=1, sticky="w")
+
+        ttk.Label(frm, text="Rate Limit (0 = none):").grid(row=5, column=0, sticky="e", pady=6, padx=6)
+        rrow = ttk.Frame(frm)
+        rrow.grid(row=5, column=1, sticky="w")
+        rpm_var = tk.StringVar(value=str(sett["rate_rpm"]))
+        ttk.Entry(rrow, textvariable=rpm_var, width=8).pack(side="left")
+        ttk.Label(rrow, text="requests/min").pack(side="left", padx=(4,12))
+        cpm_var = tk.StringVar(value=str(sett["rate_cpm"]))
+        ttk.Entry(rrow, textvariable=cpm_var, width=10).pack(side="left")
+        ttk.Label(rrow, text="characters/min").pack(side="left", padx=(4,0))
+
+        format_labels = {fmt: label for label, fmt in FORMAT_BY_LABEL.items()}
+        ttk.Label(frm, text="Default Format:").grid(row=6, column=0, sticky="e", pady=6, padx=6)
+        fmt_var = tk.StringVar(value=format_labels.get(sett["output_format"] or "", VOICE_DEFAULT))
+        ttk.Combobox(frm, textvariable=fmt_var, state="readonly", values=[VOICE_DEFAULT] + list(FORMAT_BY_LABEL),
+                     width=34).grid(row=6, column=1, sticky="w")
+
+        # per-voice formats, e.g. 8 kHz PCM for a voice only used on phone lines
+        ttk.Label(frm, text="Format per Voice:").grid(row=7, column=0, sticky="ne", pady=6, padx=6)
+        vrow = ttk.Frame(frm)
+        vrow.grid(row=7, column=1, sticky="w", pady=6)
+        voice_fmt_vars = {}
+        for i, voice_key in enumerate(VOICES):
+            ttk.Label(vrow, text=voice_key).grid(row=i, column=0, sticky="w", padx=(0,8), pady=2)
+            var = tk.StringVar(value=format_labels.get(sett["voice_formats"].get(voice_key, ""), VOICE_DEFAULT))
+            ttk.Combobox(vrow, textvariable=var, state="readonly", values=[VOICE_DEFAULT] + list(FORMAT_BY_LABEL),
+                         width=30).grid(row=i, column=1, sticky="w", pady=2)
+            voice_fmt_vars[voice_key] = var
+
+        # the background sweeper deletes older outputs (and their history rows) past these
+        ttk.Label(frm, text="Keep Outputs (0 = all):").grid(row=8, column=0, sticky="e", pady=6, padx=6)
+        krow = ttk.Frame(frm)
+        krow.grid(row=8, column=1, sticky="w")
+        keep_days_var = tk.StringVar(value=str(sett["retention_days"]))
+        ttk.Entry(krow, textvariable=keep_days_var, width=8).pack(side="left")
+        ttk.Label(krow, text="days").pack(side="left", padx=(4,12))
+        keep_mb_var = tk.StringVar(value=str(sett["retention_max_mb"]))
+        ttk.Entry(krow, textvariable=keep_mb_var, width=10).pack(side="left")
+        ttk.Label(krow, text="MB").pack(side="left", padx=(4,0))
+
+        btn_row = ttk.Frame(frm)
+        btn_row.grid(row=9, column=0, columnspan=2, pady=12)
+        def save_and_close():
+            api_key = api_var.get().strip()
+            region = region_var.get().strip() or "northcentralus"
+            endpoint = ep_var.get().strip() or f"https://{region}.tts.speech.microsoft.com/cognitiveservices/v1"
+            folder = folder_var.get().strip() or config.AUDIO_OUTPUT_DIR
+            try:
+                cache_mb = max(0, int(cache_var.get().strip() or DEFAULT_CACHE_MAX_MB))
+                rpm = max(0, int(rpm_var.get().strip() or 0))
+                cpm = max(0, int(cpm_var.get().strip() or 0))
+                keep_days = max(0, int(keep_days_var.get().strip() or 0))
+                keep_mb = max(0, int(keep_mb_var.get().strip() or 0))
+            except ValueError:
+                messagebox.showerror("Invalid", "Cache, rate and retention limits must be whole numbers.", parent=win)
+                return
+            voice_formats = {v: FORMAT_BY_LABEL[var.get()] for v, var in voice_fmt_vars.items()
+                             if var.get() in FORMAT_BY_LABEL}
+            save_settings(api_key, region, endpoint, folder, cache_mb, rpm, cpm,
+                          FORMAT_BY_LABEL.get(fmt_var.get()), voice_formats, keep_days, keep_mb)
+            cache_evict(cache_mb * 1024 * 1024)
+            self.settings = load_settings()
+            ensure_folder(self.settings["default_folder"])
+            messagebox.showinfo("Saved", "Settings updated.")
+            win.destroy()
+        ttk.Button(btn_row, text="Save", command=save_and_close).pack(side="right")
+        ttk.Button(btn_row, text="Cancel", command=win.destroy).pack(side="right", padx=(0,8))
+        ttk.Button(btn_row, text="Extra Endpoints…", command=lambda: self.open_endpoints(win)).pack(side="right", padx=(0,8))
+
+        for i in range(2):
+            frm.columnconfigure(i, weight=1)
+
+    # ---- Extra endpoints dialog ----
+    def open_endpoints(self, parent):
+        win = tk.Toplevel(parent)
+        win.title("Extra Endpoints")
+        win.geometry("640x340")
+        win.transient(parent)
+        win.grab_set()
+
+        ttk.Label(win, text="Requests are spread over the Settings resource and these, "
+                            "preferring the fastest and skipping failing ones.").pack(anchor="w", padx=8, pady=(8,0))
+        cols = ("id", "region", "endpoint")
+        tree = ttk.Treeview(win, columns=cols, show="headings", height=8)
+        for c, w in zip(cols, [50, 130, 420]):
+            tree.heading(c, text=c.title())
+            tree.column(c, width=w, anchor="w")
+        tree.pack(fill="both", expand=True, padx=8, pady=8)
+
+        def refresh():
+            tree.delete(*tree.get_children())
+            for ep in load_settings()["endpoints"]:
+                tree.insert("", "end", values=(ep["id"], ep["region"], ep["endpoint"]))
+
+        frm = ttk.Frame(win)
+        frm.pack(fill="x", padx=8)
+        key_var, region_var, ep_var = tk.StringVar(), tk.StringVar(), tk.StringVar()
+        ttk.Label(frm, text="Key:").pack(side="left")
+        ttk.Entry(frm, textvariable=key_var, show="•", width=18).pack(side="left", padx=(4,8))
+        ttk.Label(frm, text="Region:").pack(side="left")
+        ttk.Entry(frm, textvariable=region_var, width=14).pack(side="left", padx=(4,8))
+        ttk.Label(frm, text="Endpoint:").pack(side="left")
+        ttk.Entry(frm, textvariable=ep_var, width=24).pack(side="left", padx=(4,0), fill="x", expand=True)
+
+        def add():
+            key, region = key_var.get().strip(), region_var.get().strip()
+            if not key or not region:
+                messagebox.showerror("Missing", "Key and Region are required.", parent=win)
+                return
+            add_endpoint(key, region, ep_var.get().strip() or None)
+            for var in (key_var, region_var, ep_var):
+                var.set("")
+            refresh()
+
+        def remove():
+            item = tree.focus()
+            if item:
+                delete_endpoint(int(tree.item(item, "values")[0]))
+                refresh()
+
+        btn_row = ttk.Frame(win)
+        btn_row.pack(fill="x", padx=8, pady=8)
+        ttk.Button(btn_row, text="Close", command=win.destroy).pack(side="right")
+        ttk.Button(btn_row, text="Remove Selected", command=remove).pack(side="right", padx=(0,8))
+        ttk.Button(btn_row, text="Add", command=add).pack(side="right", padx=(0,8))
+        refresh()
+
+    # ---- History window ----
+    def open_history(self):
+        if not self.wait_storage():
+            return
+        win = tk.Toplevel(self)
+        win.title("History")
+        win.geometry("1000x500")
+        win.transient(self)
+        win.grab_set()
+
+        search_bar = ttk.Frame(win)
+        search_bar.pack(fill="x", padx=8, pady=(8,0))
+        ttk.Label(search_bar, text="Search:").pack(side="left")
+        q_var = tk.StringVar()
+        q_entry = ttk.Entry(search_bar, textvariable=q_var, width=28)
+        q_entry.pack(side="left", padx=(4,10))
+        ttk.Label(search_bar, text="Voice:").pack(side="left")
+        fv_var = tk.StringVar(value="All")
+        ttk.Combobox(search_bar, textvariable=fv_var, state="readonly",
+                     values=["All"] + list(VOICES.keys()), width=24).pack(side="left", padx=(4,10))
+        ttk.Label(search_bar, text="Style:").pack(side="left")
+        fs_var = tk.StringVar(value="All")
+        ttk.Combobox(search_bar, textvariable=fs_var, state="readonly",
+                     values=["All"] + STYLES, width=11).pack(side="left", padx=(4,10))
+        ttk.Label(search_bar, text="From:").pack(side="left")
+        from_var = tk.StringVar()
+        ttk.Entry(search_bar, textvariable=from_var, width=11).pack(side="left", padx=(4,6))
+        ttk.Label(search_bar, text="To:").pack(side="left")
+        to_var = tk.StringVar()
+        ttk.Entry(search_bar, textvariable=to_var, width=11).pack(side="left", padx=(4,10))
+
+        cols = ("id", "created", "voice", "style", "format", "duration", "file", "preview")
+        list_frame = ttk.Frame(win)
+        list_frame.pack(fill="both", expand=True, padx=8, pady=8)
+        tree = ttk.Treeview(list_frame, columns=cols, show="headings")
+        for c, w in zip(cols,
+                        [60, 140, 180, 110, 160, 70, 240, 280]):
+            tree.heading(c, text=c.title())
+            tree.column(c, width=w, anchor="w")
+        vsb = ttk.Scrollbar(list_frame, orient="vertical", command=tree.yview)
+        tree.pack(side="left", fill="both", expand=True)
+        vsb.pack(side="right", fill="y")
+
+        # rows are loaded a page at a time (keyset on id) as the list is scrolled;
+        # queries run on a worker thread and results are applied on the Tk thread
+        state = {"oldest": None, "newest": 0, "loading": False, "exhausted": False,
+                 "filters": None, "gen": 0}
+
+        def reset():
+            # drop loaded rows; results of queries already in flight are ignored
+            tree.delete(*tree.get_children())
+            state.update(oldest=None, newest=0, loading=False, exhausted=False, gen=state["gen"] + 1)
+
+        def run_query(fn, done):
+            def work():
+                try:
+                    result = fn()
+                except Exception as e:
+                    err = str(e)
+                    self.after(0, lambda: messagebox.showerror("History", err))
+                    return
+                def apply():
+                    if win.winfo_exists():
+                        done(result)
+                self.after(0, apply)
+            threading.Thread(target=work, daemon=True).start()
+
+        def load_more():
+            if state["loading"] or state["exhausted"]:
+                return
+            state["loading"] = True
+            before = state["oldest"]
+            filters = state["filters"]
+            gen = state["gen"]
+            def fetch():
+                if filters:
+                    return search_history(before_id=before, **filters)
+                return list_history_page(before_id=before)
+            def done(rows):
+                if gen != state["gen"]:
+                    return
+                state["loading"] = False
+                for r in rows:
+                    tree.insert("", "end", iid=str(r[0]), values=r)
+                if rows:
+                    state["oldest"] = rows[-1][0]
+                    state["newest"] = max(state["newest"], rows[0][0])
+                if len(rows) < HISTORY_PAGE_SIZE:
+                    state["exhausted"] = True
+            run_query(fetch, done)
+
+        def on_scroll(first, last):
+            vsb.set(first, last)
+            if float(last) > 0.9:
+                load_more()
+        tree.configure(yscrollcommand=on_scroll)
+
+        def refresh():
+            # only touch rows added after, or deleted from, what is already loaded;
+            # search results are simply re-run
+            if state["oldest"] is None or state["filters"]:
+                reset()
+                load_more()
+                return
+            oldest, newest = state["oldest"], state["newest"]
+            def fetch():
+                return list_history_since(newest), history_ids_between(oldest, newest)
+            def done(result):
+                new_rows, live_ids = result
+                live = set(live_ids)
+                for iid in tree.get_children():
+                    if int(iid) not in live and int(iid) <= newest:
+                        tree.delete(iid)
+                for r in reversed(new_rows):
+                    tree.insert("", 0, iid=str(r[0]), values=r)
+                if new_rows:
+                    state["newest"] = new_rows[0][0]
+            run_query(fetch, done)
+
+        def apply_search():
+            filters = {
+                "query": q_var.get().strip(),
+                "voice": fv_var.get() if fv_var.get() != "All" else None,
+                "style": fs_var.get() if fs_var.get() != "All" else None,
+                "date_from": from_var.get().strip() or None,
+                "date_to": to_var.get().strip() or None,
+            }
+            for d in (filters["date_from"], filters["date_to"]):
+                if d:
+                    try:
+                        datetime.strptime(d, "%Y-%m-%d")
+                    except ValueError:
+                        messagebox.showerror("Search", "Dates must be YYYY-MM-DD.", parent=win)
+                        return
+            state["filters"] = filters if any(filters.values()) else None
+            reset()
+            load_more()
+
+        def clear_search():
+            for var in (q_var, from_var, to_var):
+                var.set("")
+            fv_var.set("All")
+            fs_var.set("All")
+            apply_search()
+
+        ttk.Button(search_bar, text="Search", command=apply_search).pack(side="left")
+        ttk.Button(search_bar, text="Clear", command=clear_search).pack(side="left", padx=(6,0))
+        q_entry.bind("<Return>", lambda e: apply_search())
+
+        def get_selected_id():
+            item = tree.focus()
+            if not item:
+                return None
+            vals = tree.item(item, "values")
+            return int(vals[0]) if vals else None
+
+        btns = ttk.Frame(win)
+        btns.pack(fill="x", padx=8, pady=(0,8))
+
+        def play_selected():
+            hid = get_selected_id()
+            if not hid: return
+            row = get_history_item(hid)
+            if row:
+                path = row[7]
+                if os.path.exists(path):
+                    open_file_cross_platform(path)
+                else:
+                    messagebox.showerror("Missing", "File not found on disk.")
+
+        def download_selected():
+            hid = get_selected_id()
+            if not hid: return
+            row = get_history_item(hid)
+            if not row: return
+            src = row[7]
+            if not os.path.exists(src):
+                messagebox.showerror("Missing", "File not found on disk.")
+                return
+            ext = os.path.splitext(src)[1] or FILE_EXT
+            dst = filedialog.asksaveasfilename(defaultextension=ext,
+                                               initialfile=os.path.basename(src),
+                                               filetypes=file_types(ext))
+            if not dst: return
+            try:
+                shutil.copy2(src, dst)
+                messagebox.showinfo("Downloaded", f"Saved to:\n{dst}")
+            except Exception as e:
+                messagebox.showerror("Error", str(e))
+
+        def delete_selected():
+            hid = get_selected_id()
+            if not hid: return
+            if messagebox.askyesno("Delete", "Delete selected history and file?"):
+                if not delete_history_item(hid):
+                    messagebox.showwarning("Delete", "The history entry was removed, but its audio file "
+                                                     "could not be deleted (in use or read-only).", parent=win)
+                refresh()
+
+        def update_regen():
+            # allows editing text/voice/style then re-generate
+            hid = get_selected_id()
+            if not hid: return
+            row = get_history_item(hid)
+            if not row: return
+            _, _, old_text, old_voice, old_style, old_format, _, old_path = row
+
+            upd = tk.Toplevel(win)
+            upd.title("Update & Re-generate")
+            upd.geometry("760x560")
+            upd.transient(win)
+            upd.grab_set()
+
+            ttk.Label(upd, text="Voice:").grid(row=0, column=0, sticky="e", padx=6, pady=6)
+            v_var = tk.StringVar(value=old_voice)
+            v_combo = ttk.Combobox(upd, textvariable=v_var, state="readonly", values=list(VOICES.keys()), width=32)
+            v_combo.grid(row=0, column=1, sticky="w")
+
+            ttk.Label(upd, text="Style:").grid(row=0, column=2, sticky="e", padx=6, pady=6)
+            s_var = tk.StringVar(value=old_style)
+            s_combo = ttk.Combobox(upd, textvariable=s_var, state="readonly", values=STYLES, width=20)
+            s_combo.grid(row=0, column=3, sticky="w")
+
+            ttk.Label(upd, text="Text:").grid(row=1, column=0, sticky="ne", padx=6, pady=6)
+            t = tk.Text(upd, wrap="word", height=20)
+            t.grid(row=1, column=1, columnspan=3, sticky="nsew", padx=(0,6), pady=6)
+            t.insert("1.0", old_text)
+
+            # pause quick insert buttons
+            pbar = ttk.Frame(upd)
+            pbar.grid(row=2, column=1, columnspan=3, sticky="w", padx=0, pady=(0,6))
+            ttk.Label(pbar, text="Insert Pause:").pack(side="left")
+            for sec in [1,2,3,5]:
+                ttk.Button(pbar, text=f"[p-{sec}]", command=lambda s=sec: t.insert(tk.INSERT, f"[p-{s}]")).pack(side="left", padx=4)
+
+            def do_regen():
+                new_text = t.get("1.0", "end-1c").strip()
+                if not new_text:
+                    messagebox.showerror("Error", "Text empty.")
+                    return
+                voice_key = v_var.get()
+                style = s_var.get()
+
+                # keeps the original's format; formats no longer offered fall back to the voice's
+                output_format = old_format if old_format in OUTPUT_FORMATS else pick_format(load_settings(), voice_key)
+                ext = format_ext(output_format)
+
+                # Check duplicate hash
+                content_hash = compute_hash(new_text, voice_key, style, output_format)
+                path = find_existing_output(content_hash)
+                if path:
+                    messagebox.showinfo("Already Exists", f"Same content exists:\n{path}")
+                    return
+
+                # Use same folder as original file
+                base_folder = os.path.dirname(old_path) if old_path and os.path.isdir(os.path.dirname(old_path)) else load_settings()["default_folder"]
+                ensure_folder(base_folder)
+                save_path = filedialog.asksaveasfilename(
+                    initialdir=base_folder,
+                    initialfile=os.path.basename(default_output_path(base_folder, new_text, ext)),
+                    defaultextension=ext,
+                    filetypes=file_types(ext)
+                )
+                if not save_path: return
+
+                sett = load_settings()
+                if not endpoint_pool(sett):
+                    messagebox.showerror("Missing Settings", "API Key/Endpoint missing in Settings.")
+                    return
+
+                seg_stats = {}
+
+                def finished(job):
+                    if job.status == "done":
+                        messagebox.showinfo("Success", f"Saved:\n{save_path}\n\n"
+                                            f"Re-synthesized {seg_stats['synthesized']} of {seg_stats['segments']} segment(s); "
+                                            f"the rest came from cache.")
+                        if win.winfo_exists():
+                            refresh()
+                    elif job.status == "failed":
+                        title = "TTS Error" if isinstance(job.error, TTSError) else "Exception"
+                        messagebox.showerror(title, str(job.error))
+
+                # runs in the background; progress shows in the main window and Jobs list
+                self.current_job = self.submit_job(f"Re-generate: {new_text[:40]}", finished, synthesize_text,
+                                                   new_text, voice_key, style, save_path, sett,
+                                                   content_hash=content_hash, timeout=60, stats=seg_stats,
+                                                   output_format=output_format)
+                self.show_job(self.current_job)
+                upd.destroy()
+
+            btnrow = ttk.Frame(upd)
+            btnrow.grid(row=3, column=0, columnspan=4, pady=10)
+            ttk.Button(btnrow, text="Re-generate & Save", command=do_regen).pack(side="right")
+            ttk.Button(btnrow, text="Cancel", command=upd.destroy).pack(side="right", padx=(0,8))
+
+            upd.columnconfigure(1, weight=1)
+            upd.columnconfigure(3, weight=1)
+            upd.rowconfigure(1, weight=1)
+
+        ttk.Button(btns, text="Play/Open", command=play_selected).pack(side="left")
+        ttk.Button(btns, text="Download", command=download_selected).pack(side="left", padx=6)
+        ttk.Button(btns, text="Update / Re-generate", command=update_regen).pack(side="left", padx=6)
+        ttk.Button(btns, text="Delete", command=delete_selected).pack(side="left", padx=6)
+        ttk.Button(btns, text="Refresh", command=refresh).pack(side="right")
+
+        refresh()
+
+def run():
+    App().mainloop()
@@ -0,0 +1,173 @@
+# Background jobs
+import time
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .progress import ProgressTracker
+
+# conversions run on a small pool; the job a thread is working for is kept
+# thread-local so the HTTP layer can check for cancellation and register sockets
+JOB_WORKERS = 2
+JOB_HISTORY = 50    # finished jobs kept in the list
+
+class JobCancelled(Exception):
+    pass
+
+_job_local = threading.local()
+
+def current_job():
+    return getattr(_job_local, "job", None)
+
+class job_scope:
+    # run a block on behalf of job (also used to carry it into helper threads)
+    def __init__(self, job):
+        self.job = job
+
+    def __enter__(self):
+        self.prev = current_job()
+        _job_local.job = self.job
+        return self.job
+
+    def __exit__(self, *exc):
+        _job_local.job = self.prev
+
+def check_cancelled():
+    job = current_job()
+    if job is not None and job.cancelled.is_set():
+        raise JobCancelled()
+
+def cancellable_sleep(seconds):
+    job = current_job()
+    if job is None:
+        time.sleep(seconds)
+    elif job.cancelled.wait(seconds):
+        raise JobCancelled()
+
+class Job:
+    def __init__(self, job_id, title, notify):
+        self.id = job_id
+        self.title = title
+        self.status = "queued"      # queued, running, done, failed, cancelled
+        self.percent = 0
+        self.message = "Queued"
+        self.result = None
+        self.error = None
+        self.cancelled = threading.Event()
+        self.tracker = ProgressTracker()
+        self._notify = notify
+        self._lock = threading.Lock()
+        self._conns = set()         # HTTP connections with a request in flight
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed", "cancelled")
+
+    def on_event(self, kind, info):
+        # progress callback handed to the synthesis pipeline; also where a cancel takes effect
+        if self.cancelled.is_set():
+            raise JobCancelled()
+        self.percent, self.message = self.tracker.update(kind, info)
+        self._notify(self)
+
+    def watch(self, conn):
+        with self._lock:
+            self._conns.add(conn)
+
+    def unwatch(self, conn):
+        with self._lock:
+            self._conns.discard(conn)
+
+    def cancel(self):
+        if self.finished:
+            return
+        self.cancelled.set()
+        with self._lock:
+            conns = list(self._conns)
+        # shutting the socket down wakes a thread blocked waiting for headers or body
+        for conn in conns:
+            sock = getattr(conn, "sock", None)
+            if sock is not None:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        if self.status == "queued":
+            self._finish("cancelled", "Cancelled")
+
+    def _finish(self, status, message):
+        with self._lock:
+            self._conns.clear()
+        self.status, self.message = status, message
+        if status == "done":
+            self.percent = 100
+        self._notify(self)
+
+class JobManager:
+    def __init__(self, workers=JOB_WORKERS):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts-job")
+        self.lock = threading.Lock()
+        self.jobs = {}
+        self.listeners = []
+        self.next_id = 1
+
+    def subscribe(self, listener):
+        # listener(job) is called from worker threads on every change
+        self.listeners.append(listener)
+
+    def _notify(self, job):
+        for listener in list(self.listeners):
+            listener(job)
+
+    def submit(self, title, fn, *args, **kwargs):
+        # fn(*args, on_event=..., **kwargs) runs on the pool; its return value becomes job.result
+        with self.lock:
+            job = Job(self.next_id, title, self._notify)
+            self.next_id += 1
+            self.jobs[job.id] = job
+            finished = [j.id for j in self.jobs.values() if j.finished]
+            for job_id in finished[:max(0, len(finished) - JOB_HISTORY)]:
+                del self.jobs[job_id]
+        self.pool.submit(self._run, job, fn, args, kwargs)
+        self._notify(job)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        if job.cancelled.is_set():
+            return
+        job.status, job.message = "running", "Starting"
+        self._notify(job)
+        with job_scope(job):
+            try:
+                job.result = fn(*args, on_event=job.on_event, **kwargs)
+            except Exception as e:
+                if job.cancelled.is_set() or isinstance(e, JobCancelled):
+                    job._finish("cancelled", "Cancelled")
+                else:
+                    job.error = e
+                    job._finish("failed", str(e).splitlines()[0] if str(e) else type(e).__name__)
+                return
+        job._finish("done", "Completed")
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def list(self):
+        with self.lock:
+            return list(self.jobs.values())
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job:
+            job.cancel()
+
+    def cancel_all(self):
+        for job in self.list():
+            job.cancel()
+
+    def clear_finished(self):
+        with self.lock:
+            self.jobs = {k: j for k, j in self.jobs.items() if not j.finished}
+
+JOBS = JobManager()
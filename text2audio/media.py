@@ -0,0 +1,134 @@
+# Duration, bitrate and frame index of saved outputs, read through mmap without
+# decoding, so a long file costs one pass over its frame headers and no copies.
+import os
+import mmap
+import zlib
+import struct
+
+from .mp3 import iter_frames, parse_frame_header, slice_frames
+
+OGG_GRANULE_RATE = 48000    # Opus granule positions always count 48 kHz samples
+
+def _mapped(path):
+    # read-only map of the whole file, or None for an empty/unreadable one
+    try:
+        with open(path, "rb") as f:
+            if not os.fstat(f.fileno()).st_size:
+                return None
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+def encode_frame_index(frames):
+    # frames: [(offset, size), ...] -> zlib'd little-endian uint32 deltas between frame
+    # starts (first value is the first offset, last is the last frame's size); CBR
+    # output makes every delta the same, so an hour of audio packs into a few bytes
+    bounds = [offset for offset, _ in frames] + [frames[-1][0] + frames[-1][1]]
+    deltas = [bounds[0]] + [b - a for a, b in zip(bounds, bounds[1:])]
+    return zlib.compress(struct.pack(f"<{len(deltas)}I", *deltas))
+
+def decode_frame_index(blob):
+    # inverse of encode_frame_index: [(offset, size), ...]
+    raw = zlib.decompress(blob)
+    deltas = struct.unpack(f"<{len(raw) // 4}I", raw)
+    frames, pos = [], deltas[0]
+    for size in deltas[1:]:
+        frames.append((pos, size))
+        pos += size
+    return frames
+
+def mp3_info(data):
+    frames, seconds = [], 0.0
+    for offset, size, samples, sample_rate in iter_frames(data):
+        frames.append((offset, size))
+        seconds += samples / sample_rate
+    if not frames:
+        return None
+    audio_bytes = sum(size for _, size in frames)
+    return {"duration_s": seconds, "frame_count": len(frames),
+            "bitrate_kbps": round(audio_bytes * 8 / seconds / 1000) if seconds else None,
+            "frame_index": encode_frame_index(frames)}
+
+def wav_info(data):
+    # walks the RIFF chunks for fmt and data
+    if data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        return None
+    pos, fmt, data_size = 12, None, None
+    while pos + 8 <= len(data):
+        chunk, size = data[pos:pos + 4], struct.unpack("<I", data[pos + 4:pos + 8])[0]
+        if chunk == b"fmt ":
+            fmt = struct.unpack("<HHIIHH", data[pos + 8:pos + 24])
+        elif chunk == b"data":
+            data_size = min(size, len(data) - pos - 8)
+            break
+        pos += 8 + size + (size & 1)
+    if not fmt or data_size is None or not fmt[3]:
+        return None
+    _, channels, sample_rate, byte_rate, block, bits = fmt
+    return {"duration_s": data_size / byte_rate, "frame_count": data_size // block if block else None,
+            "bitrate_kbps": round(byte_rate * 8 / 1000), "frame_index": None}
+
+def ogg_info(data):
+    # sums (last granule - pre-skip) over each chained Opus stream
+    pos, seconds, pages = 0, 0.0, 0
+    preskip, granule = 0, 0
+    while data[pos:pos + 4] == b"OggS" and pos + 27 <= len(data):
+        flags = data[pos + 5]
+        nsegs = data[pos + 26]
+        body = pos + 27 + nsegs
+        size = sum(data[pos + 27:body])
+        if flags & 0x02 and data[body:body + 8] == b"OpusHead":
+            preskip = struct.unpack("<H", data[body + 10:body + 12])[0]
+        page_granule = struct.unpack("<q", data[pos + 6:pos + 14])[0]
+        if page_granule >= 0:
+            granule = page_granule
+        if flags & 0x04:
+            seconds += max(0, granule - preskip) / OGG_GRANULE_RATE
+            granule = 0
+        pages += 1
+        pos = body + size
+    seconds += max(0, granule - preskip) / OGG_GRANULE_RATE
+    if not pages:
+        return None
+    return {"duration_s": seconds, "frame_count": pages,
+            "bitrate_kbps": round(len(data) * 8 / seconds / 1000) if seconds else None, "frame_index": None}
+
+def audio_info(path):
+    # {"duration_s", "frame_count", "bitrate_kbps", "file_size", "frame_index"} or None;
+    # frame_count is MPEG frames for MP3, sample frames for WAV and pages for OGG
+    data = _mapped(path)
+    if data is None:
+        return None
+    try:
+        head = data[:4]
+        if head == b"RIFF":
+            info = wav_info(data)
+        elif head == b"OggS":
+            info = ogg_info(data)
+        else:
+            info = mp3_info(data)
+        if info is not None:
+            info["file_size"] = len(data)
+        return info
+    finally:
+        data.close()
+
+def trim_mp3(src_path, dst_path, start, end=None, frame_index=None):
+    # copy the frames starting in [start, end) seconds, no re-encoding; frame_index
+    # (from tts_history) saves rescanning the file
+    data = _mapped(src_path)
+    if data is None:
+        raise ValueError(f"{src_path}: empty or unreadable")
+    try:
+        frames = decode_frame_index(frame_index) if frame_index else [(o, s) for o, s, _, _ in iter_frames(data)]
+        if not frames:
+            raise ValueError(f"{src_path}: no MPEG audio frames")
+        first = frames[0][0]
+        _, samples, sample_rate = parse_frame_header(data[first], data[first + 1], data[first + 2])
+        per_frame = samples / sample_rate
+        timed = [(offset, size, i * per_frame) for i, (offset, size) in enumerate(frames)]
+        with open(dst_path, "wb") as out:
+            out.write(slice_frames(data, timed, start, end))
+    finally:
+        data.close()
+    return dst_path
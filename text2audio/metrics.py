@@ -0,0 +1,145 @@
+# Per-stage latency metrics
+import math
+import time
+import json
+import atexit
+import sqlite3
+import threading
+
+from .storage import add_metrics_many, list_metrics
+
+# Stages timed for every synthesis:
+#   ssml      building the SSML for one request
+#   ttfb      request sent until response headers (routing/quota waits included)
+#   download  response body to disk
+#   concat    joining segment files
+#   write     cache store + output file link
+#   history   add_history commit
+#   total     the whole synthesize_text call
+# Any other name can be timed with METRICS.timer(); hooks see every measurement.
+METRICS_FLUSH_SECONDS = 5
+METRIC_QUANTILES = (0.5, 0.95, 0.99)
+
+class StageTimer:
+    # times a with-block; fields in .info (status, request_bytes, ...) may be set inside it
+    def __init__(self, metrics, stage, info):
+        self.metrics = metrics
+        self.stage = stage
+        self.info = info
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.started
+        if exc is not None:
+            self.info["ok"] = False
+            if getattr(exc, "status_code", None):
+                self.info["status"] = exc.status_code
+        self.metrics.record(self.stage, seconds, **self.info)
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = []
+        self.hooks = []
+        self.last_flush = time.monotonic()
+
+    def add_hook(self, hook):
+        # hook(stage, seconds, info) runs on the timing thread for every measurement,
+        # e.g. to forward timings to another system; it must not raise
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook):
+        if hook in self.hooks:
+            self.hooks.remove(hook)
+
+    def timer(self, stage, **info):
+        return StageTimer(self, stage, info)
+
+    def record(self, stage, seconds, ok=True, status=None, request_bytes=None, response_bytes=None,
+               content_hash=None):
+        row = (time.time(), stage, seconds, int(bool(ok)), status, request_bytes, response_bytes, content_hash)
+        for hook in list(self.hooks):
+            hook(stage, seconds, {"ok": bool(ok), "status": status, "request_bytes": request_bytes,
+                                  "response_bytes": response_bytes, "content_hash": content_hash})
+        with self.lock:
+            self.pending.append(row)
+            due = time.monotonic() - self.last_flush >= METRICS_FLUSH_SECONDS
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            rows, self.pending = self.pending, []
+            self.last_flush = time.monotonic()
+        if rows:
+            add_metrics_many(rows)
+
+METRICS = Metrics()
+
+def flush_metrics():
+    try:
+        METRICS.flush()
+    except sqlite3.Error:
+        pass
+
+atexit.register(flush_metrics)
+
+def percentile(sorted_values, q):
+    # nearest-rank percentile of an already sorted list
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(q * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def metrics_summary(days=1):
+    # {stage: {count, errors, mean, max, p50, p95, p99, request_bytes, response_bytes}, ...}
+    # plus "http_status": {status: count} over the ttfb stage
+    flush_metrics()
+    stages = {}
+    statuses = {}
+    for stage, seconds, ok, status, req_bytes, resp_bytes in list_metrics(days):
+        st = stages.setdefault(stage, {"values": [], "errors": 0, "request_bytes": 0, "response_bytes": 0})
+        st["values"].append(seconds)
+        st["errors"] += 0 if ok else 1
+        st["request_bytes"] += req_bytes or 0
+        st["response_bytes"] += resp_bytes or 0
+        if stage == "ttfb" and status is not None:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+    summary = {}
+    for stage, st in stages.items():
+        values = st.pop("values")      # already sorted by the query
+        st.update(count=len(values), sum=sum(values), mean=sum(values) / len(values), max=values[-1])
+        for q in METRIC_QUANTILES:
+            st[f"p{int(q * 100)}"] = percentile(values, q)
+        summary[stage] = st
+    return {"stages": summary, "http_status": statuses}
+
+def metrics_json(days=1):
+    return json.dumps(metrics_summary(days), indent=2, sort_keys=True)
+
+def metrics_prometheus(days=1):
+    # Prometheus text exposition format. Every value is computed over the rows in
+    # tts_metrics for the last `days`, so it drops as old rows are pruned: all gauges,
+    # never counters (rate()/increase() would read a drop as a reset)
+    summary = metrics_summary(days)
+    stages = summary["stages"]
+    lines = ["# HELP tts_stage_seconds Time spent in each synthesis stage, over the window.",
+             "# TYPE tts_stage_seconds gauge"]
+    for stage, st in sorted(stages.items()):
+        for q in METRIC_QUANTILES:
+            lines.append(f'tts_stage_seconds{{stage="{stage}",quantile="{q}"}} {st[f"p{int(q * 100)}"]:.6f}')
+    for name, key, help_text in (("tts_stage_seconds_window_sum", "sum", "Seconds spent, by stage"),
+                                 ("tts_stage_window_count", "count", "Timed stages, by stage"),
+                                 ("tts_stage_window_errors", "errors", "Timed stages that raised"),
+                                 ("tts_request_window_bytes", "request_bytes", "Bytes sent, by stage"),
+                                 ("tts_response_window_bytes", "response_bytes", "Bytes received or written, by stage")):
+        lines += [f"# HELP {name} {help_text}, over the window.", f"# TYPE {name} gauge"]
+        lines += [f'{name}{{stage="{stage}"}} {round(st[key], 6)}' for stage, st in sorted(stages.items())]
+    lines += ["# HELP tts_http_window_responses Synthesis responses by HTTP status, over the window.",
+              "# TYPE tts_http_window_responses gauge"]
+    lines += [f'tts_http_window_responses{{status="{status}"}} {n}'
+              for status, n in sorted(summary["http_status"].items())]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,88 @@
+# MPEG audio frame parsing (Layer III, as produced by the Speech service), stdlib only.
+import re
+
+# bitrate tables in kbit/s, indexed by the 4-bit header field
+BITRATES_V1 = (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320)
+BITRATES_V2 = (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)
+SAMPLE_RATES = {3: (44100, 48000, 32000),     # MPEG-1
+                2: (22050, 24000, 16000),     # MPEG-2
+                0: (11025, 12000, 8000)}      # MPEG-2.5
+
+MP3_FORMAT_REGEX = re.compile(r"audio-(\d+)khz-(\d+)kbitrate-mono-mp3$")
+
+def mp3_params(output_format):
+    # (sample rate, bitrate in kbit/s) for audio-*-mp3 output formats, else None
+    m = MP3_FORMAT_REGEX.match(output_format or "")
+    return (int(m.group(1)) * 1000, int(m.group(2))) if m else None
+
+def frame_header(sample_rate, bitrate_kbps):
+    # 4-byte header of a mono Layer III frame without CRC; inverse of parse_frame_header
+    for version, rates in SAMPLE_RATES.items():
+        if sample_rate in rates:
+            break
+    else:
+        raise ValueError(f"unsupported sample rate {sample_rate}")
+    bitrates = BITRATES_V1 if version == 3 else BITRATES_V2
+    return bytes((0xFF, 0xE0 | version << 3 | 0x03, bitrates.index(bitrate_kbps) << 4 | rates.index(sample_rate) << 2, 0xC0))
+
+def audio_bounds(data):
+    # (start, end) of the MPEG frames, leaving out a leading ID3v2 and trailing ID3v1 tag
+    start, end = 0, len(data)
+    if data[:3] == b"ID3" and end >= 10:
+        size = ((data[6] & 0x7f) << 21) | ((data[7] & 0x7f) << 14) | ((data[8] & 0x7f) << 7) | (data[9] & 0x7f)
+        start = 10 + size + (10 if data[5] & 0x10 else 0)
+    if end - start >= 128 and data[end - 128:end - 125] == b"TAG":
+        end -= 128
+    return start, end
+
+def strip_id3(data):
+    start, end = audio_bounds(data)
+    return memoryview(data)[start:end]
+
+def parse_frame_header(b0, b1, b2):
+    # (frame size in bytes, samples per frame, sample rate) or None if this isn't a Layer III header
+    if b0 != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+    version = (b1 >> 3) & 0x03
+    layer = (b1 >> 1) & 0x03
+    bitrate_index = b2 >> 4
+    rate_index = (b2 >> 2) & 0x03
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    sample_rate = SAMPLE_RATES[version][rate_index]
+    padding = (b2 >> 1) & 0x01
+    if version == 3:
+        return 144 * BITRATES_V1[bitrate_index] * 1000 // sample_rate + padding, 1152, sample_rate
+    return 72 * BITRATES_V2[bitrate_index] * 1000 // sample_rate + padding, 576, sample_rate
+
+def iter_frames(data):
+    # yields (offset, size, samples, sample_rate) for every frame, skipping tags and junk
+    pos, end = audio_bounds(data)
+    while pos + 4 <= end:
+        header = parse_frame_header(data[pos], data[pos + 1], data[pos + 2])
+        if header is None or pos + header[0] > end:
+            pos += 1
+            continue
+        yield (pos, *header)
+        pos += header[0]
+
+def frame_times(data):
+    # [(offset, size, start time in seconds), ...]
+    frames = []
+    elapsed = 0.0
+    for offset, size, samples, sample_rate in iter_frames(data):
+        frames.append((offset, size, elapsed))
+        elapsed += samples / sample_rate
+    return frames
+
+def slice_frames(data, frames, start, end=None, lead=0):
+    # bytes of the frames starting in [start, end) seconds; cuts land on frame
+    # boundaries (~24 ms at 48 kHz), which is as fine as MP3 can be cut without re-encoding.
+    # lead: extra frames kept before start. A frame's data can begin in earlier frames
+    # (the bit reservoir), so the first frame of a cut may not decode; leading in from
+    # silence keeps that loss out of the speech
+    picked = [i for i, (offset, size, t) in enumerate(frames) if t >= start and (end is None or t < end)]
+    if not picked:
+        return b""
+    first, last = frames[max(0, picked[0] - lead)], frames[picked[-1]]
+    return bytes(memoryview(data)[first[0]:last[0] + last[1]])
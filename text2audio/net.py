@@ -0,0 +1,385 @@
+# Network helpers that need no HTTP library: errors, connection stats,
+# endpoint routing and quota scheduling. The HTTP clients live in client.py / aio.py.
+import time
+import random
+import collections
+import atexit
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+from .storage import add_usage_many
+
+class TTSError(Exception):
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+def is_endpoint_failure(status_code):
+    return status_code is not None and status_code >= 500
+
+# ------------------------------
+# Connection stats
+# ------------------------------
+
+HTTP_POOL_SIZE = 16
+# issueToken tokens are valid for 10 minutes; refresh a minute early
+TOKEN_TTL = 9 * 60
+
+class _ConnectStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        self.connect_seconds = 0.0
+
+    def add_connect(self, seconds):
+        with self.lock:
+            self.connections += 1
+            self.connect_seconds += seconds
+
+    def add_request(self):
+        with self.lock:
+            self.requests += 1
+
+    def snapshot(self):
+        with self.lock:
+            avg = self.connect_seconds / self.connections if self.connections else 0.0
+            return {"requests": self.requests, "connections": self.connections,
+                    "connect_seconds": self.connect_seconds, "avg_connect_ms": avg * 1000}
+
+CONNECT_STATS = _ConnectStats()
+
+def http_stats():
+    return CONNECT_STATS.snapshot()
+
+def token_url_for(settings):
+    endpoint = (settings.get("endpoint") or "").strip()
+    parts = urlsplit(endpoint)
+    if parts.hostname and parts.hostname.endswith(".tts.speech.microsoft.com"):
+        region = (settings.get("region") or "").strip() or parts.hostname.split(".")[0]
+        return f"https://{region}.api.cognitive.microsoft.com/sts/v1.0/issueToken"
+    # custom / private endpoints serve issueToken on the same host
+    return f"{parts.scheme}://{parts.netloc}/sts/v1.0/issueToken"
+
+# ------------------------------
+# Endpoint routing
+# ------------------------------
+
+EJECT_SECONDS = 30
+EJECT_MAX_SECONDS = 600
+LATENCY_ALPHA = 0.3  # weight of the newest sample in the latency moving average
+
+def endpoint_pool(settings):
+    # the resource in settings first, then any extra ones; each entry works as a settings dict
+    pool = []
+    seen = set()
+    primary = {"api_key": (settings.get("api_key") or "").strip(),
+               "region": (settings.get("region") or "").strip(),
+               "endpoint": (settings.get("endpoint") or "").strip(),
+               "rate_rpm": settings.get("rate_rpm", 0), "rate_cpm": settings.get("rate_cpm", 0)}
+    for res in [primary] + list(settings.get("endpoints", [])):
+        key = (res["api_key"], res["endpoint"])
+        if res["api_key"] and res["endpoint"] and key not in seen:
+            seen.add(key)
+            pool.append(res)
+    return pool
+
+class _EndpointState:
+    def __init__(self):
+        self.latency = None
+        self.in_flight = 0
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.throttled_until = 0.0
+
+class EndpointRouter:
+    # picks the endpoint with the lowest latency * (in-flight + 1); endpoints that
+    # return 5xx or time out sit out EJECT_SECONDS, doubling per repeated failure
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.states = {}
+
+    def _state(self, res):
+        key = (res["api_key"], res["endpoint"])
+        if key not in self.states:
+            self.states[key] = _EndpointState()
+        return self.states[key]
+
+    def acquire(self, resources, exclude=()):
+        # returns (resource, seconds to wait before using it) or (None, 0) when all are excluded
+        now = time.monotonic()
+        with self.lock:
+            candidates = [r for r in resources if (r["api_key"], r["endpoint"]) not in exclude]
+            if not candidates:
+                return None, 0.0
+            healthy = [r for r in candidates if self._state(r).ejected_until <= now]
+            live = [r for r in healthy if self._state(r).throttled_until <= now]
+            wait = 0.0
+            if live:
+                def score(r):
+                    st = self._state(r)
+                    return (st.latency or 0.0) * (st.in_flight + 1), st.in_flight
+                best = min(live, key=score)
+            elif healthy:
+                # every healthy resource is throttled: wait for the first to reopen
+                best = min(healthy, key=lambda r: self._state(r).throttled_until)
+                wait = self._state(best).throttled_until - now
+            else:
+                # everything is ejected: try the one that comes back first
+                best = min(candidates, key=lambda r: self._state(r).ejected_until)
+            self._state(best).in_flight += 1
+            return best, wait
+
+    def throttle(self, res, seconds):
+        with self.lock:
+            st = self._state(res)
+            st.throttled_until = max(st.throttled_until, time.monotonic() + seconds)
+
+    def release(self, res, latency=None, failed=False):
+        with self.lock:
+            st = self._state(res)
+            st.in_flight -= 1
+            if failed:
+                now = time.monotonic()
+                # requests that were already in flight when it was ejected don't extend the penalty
+                if st.ejected_until <= now:
+                    st.failures += 1
+                    st.ejected_until = now + min(EJECT_MAX_SECONDS, EJECT_SECONDS * 2 ** (st.failures - 1))
+            elif latency is not None:
+                st.failures = 0
+                st.latency = latency if st.latency is None else \
+                    (1 - LATENCY_ALPHA) * st.latency + LATENCY_ALPHA * latency
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self.lock:
+            return [{"endpoint": endpoint, "latency_ms": (st.latency or 0.0) * 1000,
+                     "in_flight": st.in_flight, "failures": st.failures,
+                     "ejected_for": max(0.0, st.ejected_until - now)}
+                    for (_, endpoint), st in self.states.items()]
+
+ROUTER = EndpointRouter()
+
+# ------------------------------
+# Quota scheduling
+# ------------------------------
+
+THROTTLE_BASE_SECONDS = 1.0
+THROTTLE_MAX_SECONDS = 60.0
+MAX_THROTTLE_RETRIES = 8
+USAGE_FLUSH_SECONDS = 5.0
+CANCEL_POLL_SECONDS = 0.25
+
+class TokenBucket:
+    # refills at rate units/second up to capacity; reserve() may go into debt
+    # and returns how long the caller must wait for its share
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.stamp = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, n):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+            self.tokens -= n
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+class AdaptiveLimit:
+    # AIMD cap on concurrent requests to one endpoint. There is no cap until its
+    # first 429, which halves the concurrency of the moment; each success adds
+    # 1/limit back. The 429s of one burst only halve it once.
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.limit = None   # None: unbounded
+        self.in_flight = 0
+        self.lowered_at = float("-inf")
+        self.waiters = collections.deque()  # (loop, asyncio.Event) of acquire_async callers
+
+    def _free(self):
+        return self.limit is None or self.in_flight < int(self.limit)
+
+    def _wake(self, n=1):
+        # under self.cond: n waiters, threads and event loops alike, try again
+        self.cond.notify(n)
+        while n and self.waiters:
+            loop, event = self.waiters.popleft()
+            try:
+                loop.call_soon_threadsafe(event.set)
+                n -= 1
+            except RuntimeError:
+                pass    # its event loop has closed
+
+    def try_acquire(self):
+        with self.cond:
+            if self._free():
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self, timeout=None, cancel=None):
+        # False once timeout runs out or the cancel event is set; a Condition
+        # can't wait on an Event, so cancel is checked every CANCEL_POLL_SECONDS
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.cond:
+            while not self._free():
+                if cancel is not None and cancel.is_set():
+                    return False
+                wait = None if deadline is None else deadline - time.monotonic()
+                if wait is not None and wait <= 0:
+                    return False
+                if cancel is not None:
+                    wait = CANCEL_POLL_SECONDS if wait is None else min(wait, CANCEL_POLL_SECONDS)
+                self.cond.wait(wait)
+            self.in_flight += 1
+            return True
+
+    async def acquire_async(self, timeout=None):
+        # like acquire; release() on any thread wakes the loop with call_soon_threadsafe
+        import asyncio
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            with self.cond:
+                if self._free():
+                    self.in_flight += 1
+                    return True
+                waiter = (loop, asyncio.Event())
+                self.waiters.append(waiter)
+            woken = False
+            try:
+                await asyncio.wait_for(waiter[1].wait(), None if deadline is None else deadline - loop.time())
+                woken = True
+            except asyncio.TimeoutError:
+                return False
+            finally:
+                if not woken:
+                    with self.cond:
+                        try:
+                            self.waiters.remove(waiter)
+                        except ValueError:
+                            self._wake()    # woken as we left: pass it on
+
+    def release(self):
+        with self.cond:
+            self.in_flight -= 1
+            self._wake()
+
+    def increase(self):
+        with self.cond:
+            if self.limit is not None:
+                grown = int(self.limit + 1.0 / self.limit) - int(self.limit)
+                self.limit += 1.0 / self.limit
+                if grown:
+                    self._wake(grown)
+
+    def decrease(self):
+        with self.cond:
+            now = time.monotonic()
+            if now - self.lowered_at < THROTTLE_BASE_SECONDS:
+                return
+            self.lowered_at = now
+            # the throttled request has already been released
+            current = self.in_flight + 1 if self.limit is None else self.limit
+            self.limit = max(1.0, current / 2)
+
+def parse_retry_after(value):
+    # Retry-After is either delta-seconds or an HTTP date
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def resource_id(res):
+    # usage rows name the endpoint plus a key fingerprint, never the key itself
+    return f"{res['endpoint']}#{hashlib.sha256(res['api_key'].encode('utf-8')).hexdigest()[:8]}"
+
+class QuotaScheduler:
+    # per-key request/character token buckets, an AIMD concurrency limit per
+    # endpoint, 429 backoff and per-day usage counters flushed to tts_usage
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets = {}  # (api_key, kind) -> (per_minute, TokenBucket)
+        self.limits = {}  # (api_key, endpoint) -> AdaptiveLimit
+        self.usage = {}  # (day, resource) -> [requests, chars, throttled]
+        self.last_flush = time.monotonic()
+
+    def _bucket(self, api_key, kind, per_minute):
+        with self.lock:
+            cur = self.buckets.get((api_key, kind))
+            if cur is None or cur[0] != per_minute:
+                cur = (per_minute, TokenBucket(per_minute / 60.0, per_minute))
+                self.buckets[(api_key, kind)] = cur
+            return cur[1]
+
+    def limit_for(self, res):
+        with self.lock:
+            key = (res["api_key"], res["endpoint"])
+            if key not in self.limits:
+                self.limits[key] = AdaptiveLimit()
+            return self.limits[key]
+
+    def reserve(self, res, chars):
+        # seconds to wait before this request fits the key's budgets
+        waits = [0.0]
+        if res.get("rate_rpm"):
+            waits.append(self._bucket(res["api_key"], "requests", res["rate_rpm"]).reserve(1))
+        if res.get("rate_cpm"):
+            waits.append(self._bucket(res["api_key"], "chars", res["rate_cpm"]).reserve(chars))
+        return max(waits)
+
+    def backoff(self, attempt, retry_after=None):
+        # honour Retry-After when given, otherwise exponential backoff; jitter either way
+        if retry_after is not None:
+            return retry_after + random.uniform(0, min(1.0, retry_after * 0.1 + 0.1))
+        ceiling = min(THROTTLE_MAX_SECONDS, THROTTLE_BASE_SECONDS * 2 ** attempt)
+        return random.uniform(ceiling / 2, ceiling)
+
+    def succeeded(self, res, chars):
+        self.limit_for(res).increase()
+        self._count(res, requests=1, chars=chars)
+
+    def throttled(self, res):
+        self.limit_for(res).decrease()
+        self._count(res, throttled=1)
+
+    def _count(self, res, requests=0, chars=0, throttled=0):
+        # UTC days, the same clock as list_usage's date('now')
+        key = (datetime.now(timezone.utc).strftime("%Y-%m-%d"), resource_id(res))
+        with self.lock:
+            row = self.usage.setdefault(key, [0, 0, 0])
+            row[0] += requests
+            row[1] += chars
+            row[2] += throttled
+            due = time.monotonic() - self.last_flush >= USAGE_FLUSH_SECONDS
+        if due:
+            self.flush_usage()
+
+    def flush_usage(self):
+        with self.lock:
+            pending, self.usage = self.usage, {}
+            self.last_flush = time.monotonic()
+        if pending:
+            add_usage_many([(day, res, *counts) for (day, res), counts in pending.items()])
+
+QUOTA = QuotaScheduler()
+
+def flush_usage():
+    try:
+        QUOTA.flush_usage()
+    except sqlite3.Error:
+        pass
+
+atexit.register(flush_usage)
@@ -0,0 +1,77 @@
+# Packing: many short utterances for one voice go out as a single SSML request
+# with <bookmark>s around each, and the returned audio is cut back into one file
+# per utterance at the bookmark offsets reported by the engine (the Speech SDK,
+# or the offline fake).
+import os
+import tempfile
+
+from .config import DEFAULT_CACHE_MAX_MB
+from .storage import add_history
+from .cache import cache_put, cache_evict, cache_blob_path, link_output
+from .text import VOICES, OUTPUT_FORMAT, to_packed_ssml, ensure_folder, format_ext
+from .net import TTSError
+from .metrics import METRICS
+from .mp3 import frame_times, slice_frames
+from .engines import batch_engine
+
+PACK_MAX_CHARS = 3000           # text characters per packed request
+PACK_MAX_ITEMS = 50             # utterances per packed request
+PACK_UTTERANCE_MAX_CHARS = 300  # longer texts are synthesized on their own
+PACK_LEAD_FRAMES = 2            # frames of the PACK_GAP silence kept before each utterance (see slice_frames)
+
+def pack_utterances(items, max_chars=PACK_MAX_CHARS, max_items=PACK_MAX_ITEMS):
+    # items have voice_key/style/text (and output_format); returns lists of items sharing
+    # a voice, style and format, each within the size limits, in first-seen order
+    groups = {}
+    for item in items:
+        key = (item["voice_key"], item["style"], item.get("output_format") or OUTPUT_FORMAT)
+        groups.setdefault(key, []).append(item)
+    packs = []
+    for group in groups.values():
+        pack, size = [], 0
+        for item in group:
+            if pack and (size + len(item["text"]) > max_chars or len(pack) >= max_items):
+                packs.append(pack)
+                pack, size = [], 0
+            pack.append(item)
+            size += len(item["text"])
+        if pack:
+            packs.append(pack)
+    return packs
+
+def synthesize_pack(pack, settings, history=None, engine=None):
+    # pack: items with text, voice_key, style, content_hash and save_path, one voice/style and
+    # an MP3 output_format.
+    # Returns {index: save_path} for the utterances written; the caller decides what to
+    # do with any whose bookmarks didn't come back.
+    voice_key, style = pack[0]["voice_key"], pack[0]["style"]
+    output_format = pack[0].get("output_format") or OUTPUT_FORMAT
+    lang, gender, voice_name = VOICES[voice_key]
+    ssml = to_packed_ssml([item["text"] for item in pack], lang, gender, voice_name, style)
+    with METRICS.timer("pack", request_bytes=len(ssml.encode("utf-8"))) as t:
+        audio, marks = (engine or batch_engine(settings)).batch(ssml, settings, output_format)
+        t.info["response_bytes"] = len(audio)
+    frames = frame_times(audio)
+    if not frames:
+        raise TTSError("Packed response contained no MP3 audio")
+
+    max_bytes = settings.get("cache_max_mb", DEFAULT_CACHE_MAX_MB) * 1024 * 1024
+    written = {}
+    for i, item in enumerate(pack):
+        start, end = marks.get(f"u{i}"), marks.get(f"e{i}")
+        if start is None or end is None:
+            continue
+        data = slice_frames(audio, frames, start, end, lead=PACK_LEAD_FRAMES)
+        if not data:
+            continue
+        content_hash = item["content_hash"]
+        tmp_dir = ensure_folder(os.path.dirname(cache_blob_path(content_hash)))
+        fd, tmp_path = tempfile.mkstemp(suffix=".part", dir=tmp_dir)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        blob = cache_put(content_hash, tmp_path, ext=format_ext(output_format))
+        link_output(blob, item["save_path"])
+        (history or add_history)(item["text"], voice_key, style, output_format, content_hash, item["save_path"])
+        written[i] = item["save_path"]
+    cache_evict(max_bytes)
+    return written
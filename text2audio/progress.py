@@ -0,0 +1,67 @@
+# Progress events emitted by the synthesis pipeline, and a tracker that turns them into percent/status.
+
+# Progress events: on_event(kind, info) is called from the worker as a job moves through
+#   "ssml"       SSML built                 "request"  request sent
+#   "first_byte" response body started      "bytes"    info: n, received, total (Content-Length or None)
+#   "downloaded" one response fully on disk "cached"   audio served from the cache
+#   "written"    output file in place       "history"  history row saved
+# Per-request events carry part/parts when a long text is split into several requests.
+
+def emit(on_event, kind, **info):
+    if on_event:
+        on_event(kind, info)
+
+def tag_events(on_event, **extra):
+    # same callback, with extra fields added to every event
+    if not on_event:
+        return None
+    return lambda kind, info: on_event(kind, {**extra, **info})
+
+# percent reached at each stage; the download itself fills BYTES_FROM..BYTES_TO
+PROGRESS_STAGES = {"ssml": 5, "request": 10, "first_byte": 20, "written": 95, "history": 100}
+BYTES_FROM, BYTES_TO = 20, 90
+
+class ProgressTracker:
+    # folds progress events into (percent, status text); never moves backwards
+    def __init__(self):
+        self.percent = 0
+        self.status = "Converting... (starting)"
+        self.parts = {}     # part -> fraction of its download done
+
+    def _fraction(self, info):
+        total = info.get("total")
+        if not total:
+            return 0.5      # no Content-Length: halfway once bytes flow
+        return min(1.0, info["received"] / total)
+
+    def _download_percent(self, parts):
+        done = sum(self.parts.values()) / max(1, parts)
+        return BYTES_FROM + (BYTES_TO - BYTES_FROM) * done
+
+    def update(self, kind, info):
+        parts = info.get("parts", 1)
+        part = info.get("part", 0)
+        percent = self.percent
+        if kind == "cached" and "part" not in info:
+            percent, self.status = BYTES_TO, "Converting... (from cache)"
+        elif kind in ("bytes", "downloaded", "cached"):
+            self.parts[part] = 1.0 if kind != "bytes" else self._fraction(info)
+            percent = self._download_percent(parts)
+            if kind == "bytes":
+                received = info["received"] // 1024
+                self.status = (f"Converting... ({received} KB received)" if parts == 1 else
+                               f"Converting... (part {part + 1}/{parts}, {received} KB)")
+        elif kind in PROGRESS_STAGES:
+            # per-part stage events only count for the first part, later ones are inside the download span
+            if "part" in info and part and kind != "first_byte":
+                return self.percent, self.status
+            percent = PROGRESS_STAGES[kind]
+            self.status = {"ssml": "Converting... (preparing)",
+                           "request": "Converting... (requesting)",
+                           "first_byte": "Converting... (receiving audio)",
+                           "written": "Converting... (saving)",
+                           "history": "Completed ✅"}[kind]
+            if kind == "first_byte":
+                percent = max(percent, self._download_percent(parts))
+        self.percent = max(self.percent, percent)
+        return self.percent, self.status
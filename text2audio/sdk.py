@@ -0,0 +1,93 @@
+# Speech SDK path (azure-cognitiveservices-speech, the library src/main.py uses).
+# The SDK is optional: it is imported on first use and only the features that
+# need it (bookmark offsets, the "sdk" engine) fail without it.
+import queue
+import threading
+
+from .net import TTSError
+from .text import OUTPUT_FORMAT
+
+# REST X-Microsoft-OutputFormat value -> SpeechSynthesisOutputFormat member
+SDK_OUTPUT_FORMATS = {
+    "audio-48khz-192kbitrate-mono-mp3": "Audio48Khz192KBitRateMonoMp3",
+    "audio-24khz-96kbitrate-mono-mp3": "Audio24Khz96KBitRateMonoMp3",
+    "audio-24khz-48kbitrate-mono-mp3": "Audio24Khz48KBitRateMonoMp3",
+    "audio-16khz-32kbitrate-mono-mp3": "Audio16Khz32KBitRateMonoMp3",
+    "ogg-48khz-16bit-mono-opus": "Ogg48Khz16BitMonoOpus",
+    "ogg-24khz-16bit-mono-opus": "Ogg24Khz16BitMonoOpus",
+    "ogg-16khz-16bit-mono-opus": "Ogg16Khz16BitMonoOpus",
+    "raw-24khz-16bit-mono-pcm": "Raw24Khz16BitMonoPcm",
+    "raw-16khz-16bit-mono-pcm": "Raw16Khz16BitMonoPcm",
+    "raw-8khz-16bit-mono-pcm": "Raw8Khz16BitMonoPcm",
+}
+TICKS_PER_SECOND = 10_000_000   # SDK audio offsets are in 100 ns ticks
+
+def speechsdk():
+    try:
+        import azure.cognitiveservices.speech as sdk
+    except ImportError:
+        raise TTSError("The Azure Speech SDK is not installed (pip install azure-cognitiveservices-speech).")
+    return sdk
+
+def speech_config(settings, output_format=OUTPUT_FORMAT):
+    sdk = speechsdk()
+    api_key = (settings.get("api_key") or "").strip()
+    region = (settings.get("region") or "").strip()
+    if not api_key or not region:
+        raise TTSError("API Key/Region missing in Settings.")
+    if output_format not in SDK_OUTPUT_FORMATS:
+        raise TTSError(f"Output format {output_format} is not available through the Speech SDK.")
+    cfg = sdk.SpeechConfig(subscription=api_key, region=region)
+    cfg.set_speech_synthesis_output_format(
+        getattr(sdk.SpeechSynthesisOutputFormat, SDK_OUTPUT_FORMATS[output_format]))
+    return cfg
+
+def check_result(sdk, result):
+    if result.reason == sdk.ResultReason.SynthesizingAudioCompleted:
+        return result
+    message = "Speech synthesis canceled"
+    details = getattr(result, "cancellation_details", None)
+    if details is not None:
+        message += f": {details.reason}"
+        if details.error_details:
+            message += f"\n{details.error_details}"
+    raise TTSError(message)
+
+def synthesize_with_bookmarks(ssml, settings, output_format=OUTPUT_FORMAT):
+    # returns (encoded audio bytes, {bookmark name: audio offset in seconds})
+    sdk = speechsdk()
+    synthesizer = sdk.SpeechSynthesizer(speech_config=speech_config(settings, output_format), audio_config=None)
+    marks = {}
+
+    def on_bookmark(evt):
+        marks[evt.text] = evt.audio_offset / TICKS_PER_SECOND
+    synthesizer.bookmark_reached.connect(on_bookmark)
+    result = check_result(sdk, synthesizer.speak_ssml_async(ssml).get())
+    return result.audio_data, marks
+
+def stream_ssml(ssml, settings, output_format=OUTPUT_FORMAT):
+    # yields audio chunks from the synthesizing events while the rest is still being produced
+    sdk = speechsdk()
+    synthesizer = sdk.SpeechSynthesizer(speech_config=speech_config(settings, output_format), audio_config=None)
+    chunks = queue.Queue()
+    synthesizer.synthesizing.connect(lambda evt: chunks.put(evt.result.audio_data))
+    future = synthesizer.speak_ssml_async(ssml)
+    outcome = []
+
+    def wait():
+        try:
+            outcome.append(future.get())
+        except Exception as e:
+            outcome.append(e)
+        finally:
+            chunks.put(None)
+    threading.Thread(target=wait, daemon=True).start()
+    while True:
+        chunk = chunks.get()
+        if chunk is None:
+            break
+        if chunk:
+            yield chunk
+    if isinstance(outcome[0], Exception):
+        raise TTSError(f"Speech SDK: {outcome[0]}")
+    check_result(sdk, outcome[0])
@@ -0,0 +1,560 @@
+# SQLite storage: settings, history (with FTS5 search), cache index, usage and metrics.
+import os
+import json
+import time
+import zlib
+import sqlite3
+import threading
+from datetime import datetime
+
+from . import config
+from .config import DEFAULT_CACHE_MAX_MB
+from .media import audio_info
+
+# one long-lived connection per thread (sqlite3 connections can't be shared across threads)
+_db_local = threading.local()
+_settings_cache = None
+_settings_lock = threading.Lock()
+HISTORY_BATCH_SIZE = 200
+METRICS_KEEP_DAYS = 30
+HAS_FTS = True
+PREVIEW_CHARS = 80
+
+# history text is stored zlib-compressed in text_z, next to a short preview and its
+# length, so list queries only read small columns; these are also registered as
+# SQL functions on every connection (the FTS view and triggers call unzip_text)
+def zip_text(text):
+    return zlib.compress(text.encode("utf-8"))
+
+def unzip_text(blob):
+    return None if blob is None else zlib.decompress(blob).decode("utf-8")
+
+def text_preview(text):
+    return text[:PREVIEW_CHARS] + ("…" if len(text) > PREVIEW_CHARS else "")
+
+def get_db():
+    con = getattr(_db_local, "con", None)
+    if con is None or _db_local.path != config.DB_PATH:
+        con = sqlite3.connect(config.DB_PATH, timeout=30)
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA synchronous=NORMAL")
+        con.execute("PRAGMA busy_timeout=30000")
+        con.create_function("zip_text", 1, zip_text, deterministic=True)
+        con.create_function("unzip_text", 1, unzip_text, deterministic=True)
+        con.create_function("text_preview", 1, text_preview, deterministic=True)
+        _db_local.con = con
+        _db_local.path = config.DB_PATH
+    return con
+
+def init_db():
+    con = get_db()
+    compacted = False
+    with con:
+        cur = con.cursor()
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS settings (
+                id INTEGER PRIMARY KEY CHECK (id=1),
+                api_key TEXT,
+                region TEXT,
+                endpoint TEXT,
+                default_folder TEXT
+            )
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS tts_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at TEXT NOT NULL,
+                text TEXT NOT NULL,
+                voice TEXT NOT NULL,
+                style TEXT NOT NULL,
+                output_format TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                file_path TEXT NOT NULL
+            )
+        """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_tts_history_content_hash ON tts_history(content_hash)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_tts_history_created_at ON tts_history(created_at)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_tts_history_file_path ON tts_history(file_path)")
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS audio_cache (
+                content_hash TEXT PRIMARY KEY,
+                blob_path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_audio_cache_last_access ON audio_cache(last_access)")
+        # extra Speech resources used alongside the one in settings
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS tts_endpoints (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                api_key TEXT NOT NULL,
+                region TEXT NOT NULL,
+                endpoint TEXT NOT NULL
+            )
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS tts_usage (
+                day TEXT NOT NULL,
+                resource TEXT NOT NULL,
+                requests INTEGER NOT NULL DEFAULT 0,
+                chars INTEGER NOT NULL DEFAULT 0,
+                throttled INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (day, resource)
+            )
+        """)
+        # one row per timed stage of a synthesis (see Metrics)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS tts_metrics (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at REAL NOT NULL,
+                stage TEXT NOT NULL,
+                seconds REAL NOT NULL,
+                ok INTEGER NOT NULL DEFAULT 1,
+                status INTEGER,
+                request_bytes INTEGER,
+                response_bytes INTEGER,
+                content_hash TEXT
+            )
+        """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_tts_metrics_created_at ON tts_metrics(created_at)")
+        # scripts seen in watched folders (see watch.py): a file whose mtime and size
+        # still match its row isn't read again
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS watch_files (
+                path TEXT PRIMARY KEY,
+                folder TEXT NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                content_hash TEXT,
+                output_path TEXT
+            )
+        """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_watch_files_folder ON watch_files(folder)")
+        cur.execute("DELETE FROM tts_metrics WHERE created_at<?", (time.time() - METRICS_KEEP_DAYS * 86400,))
+        # columns added after the first release
+        _add_missing_columns(cur, "settings", {
+            "cache_max_mb": f"INTEGER DEFAULT {DEFAULT_CACHE_MAX_MB}",
+            "rate_rpm": "INTEGER DEFAULT 0",
+            "rate_cpm": "INTEGER DEFAULT 0",
+            "output_format": "TEXT",
+            "voice_formats": "TEXT",    # JSON {voice key: output format}
+            "retention_days": "INTEGER DEFAULT 0",
+            "retention_max_mb": "INTEGER DEFAULT 0",
+        })
+        # read from the saved file when the row is written (see media.audio_info)
+        _add_missing_columns(cur, "tts_history", {
+            "duration_s": "REAL",
+            "frame_count": "INTEGER",
+            "bitrate_kbps": "INTEGER",
+            "file_size": "INTEGER",
+            "frame_index": "BLOB",
+            "file_missing": "INTEGER NOT NULL DEFAULT 0",   # set by the sweeper, see sweeper.py
+        })
+        if "text_z" not in {r[1] for r in cur.execute("PRAGMA table_info(tts_history)")}:
+            _add_missing_columns(cur, "tts_history", {
+                "text_z": "BLOB",           # zip_text(text); the text column itself is left ''
+                "preview": "TEXT",          # text_preview(text)
+                "char_count": "INTEGER",
+            })
+            _compact_history_text(cur)
+            compacted = True
+        _init_history_fts(cur)
+        _add_missing_columns(cur, "tts_endpoints", {
+            "rate_rpm": "INTEGER DEFAULT 0",
+            "rate_cpm": "INTEGER DEFAULT 0",
+        })
+        # seed single settings row if not present
+        cur.execute("SELECT COUNT(*) FROM settings WHERE id=1")
+        if cur.fetchone()[0] == 0:
+            # Default values from your message (can be changed in Settings dialog)
+            cur.execute("""
+                INSERT INTO settings (id, api_key, region, endpoint, default_folder)
+                VALUES (1, ?, ?, ?, ?)
+            """, (
+                "",  # keep blank by default; fill in Settings
+                "northcentralus",
+                "https://northcentralus.tts.speech.microsoft.com/cognitiveservices/v1",
+                config.AUDIO_OUTPUT_DIR
+            ))
+    if compacted:
+        # hand the space the plain text took back to the filesystem
+        con.execute("VACUUM")
+    invalidate_settings()
+
+def _add_missing_columns(cur, table, columns):
+    existing = {r[1] for r in cur.execute(f"PRAGMA table_info({table})")}
+    for name, decl in columns.items():
+        if name not in existing:
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+
+def _compact_history_text(cur):
+    # one-time move of plain text into text_z/preview/char_count; the old index read
+    # tts_history.text directly, so it is dropped and rebuilt by _init_history_fts
+    for trigger in ("tts_history_fts_ai", "tts_history_fts_ad", "tts_history_fts_au"):
+        cur.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    cur.execute("DROP TABLE IF EXISTS tts_history_fts")
+    cur.execute("UPDATE tts_history SET text_z=zip_text(text), preview=text_preview(text), "
+                "char_count=length(text), text=''")
+
+def _init_history_fts(cur):
+    # full-text index over the history text, kept in sync by triggers; it reads the
+    # decompressed text through the tts_history_text view. unicode61 splits on
+    # anything outside its token categories, which by default leave out M*: Devanagari
+    # matras and virama would cut नमस्ते into नमस + त, so M* is added back
+    global HAS_FTS
+    cur.execute("CREATE VIEW IF NOT EXISTS tts_history_text AS SELECT id, unzip_text(text_z) AS text FROM tts_history")
+    exists = cur.execute(
+        "SELECT sql FROM sqlite_master WHERE type='table' AND name='tts_history_fts'").fetchone()
+    if exists and "M*" not in exists[0]:
+        # index built with the default categories: drop it and rebuild below
+        cur.execute("DROP TABLE tts_history_fts")
+        exists = None
+    try:
+        cur.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS tts_history_fts USING fts5(
+                text, content='tts_history_text', content_rowid='id',
+                tokenize="unicode61 remove_diacritics 0 categories 'L* N* Co M*'"
+            )
+        """)
+    except sqlite3.OperationalError:
+        # sqlite built without FTS5: search falls back to LIKE
+        HAS_FTS = False
+        return
+    HAS_FTS = True
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS tts_history_fts_ai AFTER INSERT ON tts_history BEGIN
+            INSERT INTO tts_history_fts(rowid, text) VALUES (new.id, unzip_text(new.text_z));
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS tts_history_fts_ad AFTER DELETE ON tts_history BEGIN
+            INSERT INTO tts_history_fts(tts_history_fts, rowid, text) VALUES ('delete', old.id, unzip_text(old.text_z));
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS tts_history_fts_au AFTER UPDATE OF text_z ON tts_history BEGIN
+            INSERT INTO tts_history_fts(tts_history_fts, rowid, text) VALUES ('delete', old.id, unzip_text(old.text_z));
+            INSERT INTO tts_history_fts(rowid, text) VALUES (new.id, unzip_text(new.text_z));
+        END
+    """)
+    if not exists:
+        # index rows written before the FTS table existed (or before it was rebuilt)
+        cur.execute("INSERT INTO tts_history_fts(tts_history_fts) VALUES ('rebuild')")
+
+def invalidate_settings():
+    global _settings_cache
+    with _settings_lock:
+        _settings_cache = None
+
+def load_settings():
+    # served from memory until save_settings/init_db invalidates it
+    global _settings_cache
+    with _settings_lock:
+        if _settings_cache is None:
+            cur = get_db().execute(
+                "SELECT api_key, region, endpoint, default_folder, cache_max_mb, rate_rpm, rate_cpm, "
+                "output_format, voice_formats, retention_days, retention_max_mb FROM settings WHERE id=1")
+            row = cur.fetchone()
+            if not row:
+                _settings_cache = {"api_key": "", "region": "northcentralus",
+                                   "endpoint": "https://northcentralus.tts.speech.microsoft.com/cognitiveservices/v1",
+                                   "default_folder": config.AUDIO_OUTPUT_DIR, "cache_max_mb": DEFAULT_CACHE_MAX_MB,
+                                   "rate_rpm": 0, "rate_cpm": 0, "output_format": None, "voice_formats": {},
+                                   "retention_days": 0, "retention_max_mb": 0}
+            else:
+                _settings_cache = {"api_key": row[0] or "", "region": row[1] or "northcentralus",
+                                   "endpoint": row[2] or "https://northcentralus.tts.speech.microsoft.com/cognitiveservices/v1",
+                                   "default_folder": row[3],
+                                   "cache_max_mb": row[4] if row[4] is not None else DEFAULT_CACHE_MAX_MB,
+                                   "rate_rpm": row[5] or 0, "rate_cpm": row[6] or 0,
+                                   "output_format": row[7] or None, "voice_formats": json.loads(row[8] or "{}"),
+                                   "retention_days": row[9] or 0, "retention_max_mb": row[10] or 0}
+            _settings_cache["endpoints"] = [
+                {"id": r[0], "api_key": r[1], "region": r[2], "endpoint": r[3],
+                 "rate_rpm": r[4] or 0, "rate_cpm": r[5] or 0}
+                for r in get_db().execute(
+                    "SELECT id, api_key, region, endpoint, rate_rpm, rate_cpm FROM tts_endpoints ORDER BY id")
+            ]
+        return dict(_settings_cache)
+
+def save_settings(api_key, region, endpoint, default_folder, cache_max_mb=DEFAULT_CACHE_MAX_MB,
+                  rate_rpm=0, rate_cpm=0, output_format=None, voice_formats=None,
+                  retention_days=0, retention_max_mb=0):
+    # rate_rpm / rate_cpm: requests and characters per minute allowed on this key, 0 = no limit;
+    # output_format / voice_formats: default and per-voice formats, None = built-in default;
+    # retention_days / retention_max_mb: how long and how much output the sweeper keeps, 0 = no limit
+    con = get_db()
+    with con:
+        con.execute("""
+            UPDATE settings SET api_key=?, region=?, endpoint=?, default_folder=?, cache_max_mb=?,
+                rate_rpm=?, rate_cpm=?, output_format=?, voice_formats=?,
+                retention_days=?, retention_max_mb=? WHERE id=1
+        """, (api_key, region, endpoint, default_folder, cache_max_mb, rate_rpm, rate_cpm,
+              output_format, json.dumps(voice_formats or {}, ensure_ascii=False),
+              retention_days, retention_max_mb))
+    invalidate_settings()
+
+def add_endpoint(api_key, region, endpoint=None, rate_rpm=0, rate_cpm=0):
+    endpoint = endpoint or f"https://{region}.tts.speech.microsoft.com/cognitiveservices/v1"
+    con = get_db()
+    with con:
+        cur = con.execute("INSERT INTO tts_endpoints (api_key, region, endpoint, rate_rpm, rate_cpm) "
+                          "VALUES (?, ?, ?, ?, ?)", (api_key, region, endpoint, rate_rpm, rate_cpm))
+    invalidate_settings()
+    return cur.lastrowid
+
+def delete_endpoint(endpoint_id):
+    con = get_db()
+    with con:
+        con.execute("DELETE FROM tts_endpoints WHERE id=?", (endpoint_id,))
+    invalidate_settings()
+
+def add_usage_many(rows):
+    # rows of (day, resource, requests, chars, throttled), added onto the day's totals
+    con = get_db()
+    with con:
+        con.executemany("""
+            INSERT INTO tts_usage (day, resource, requests, chars, throttled) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(day, resource) DO UPDATE SET
+                requests=requests+excluded.requests, chars=chars+excluded.chars,
+                throttled=throttled+excluded.throttled
+        """, rows)
+
+def list_usage(days=30):
+    cur = get_db().execute("""
+        SELECT day, resource, requests, chars, throttled FROM tts_usage
+        WHERE day>=date('now', ?) ORDER BY day DESC, resource
+    """, (f"-{days} days",))
+    return cur.fetchall()
+
+def add_metrics_many(rows):
+    # rows of (created_at, stage, seconds, ok, status, request_bytes, response_bytes, content_hash)
+    con = get_db()
+    with con:
+        con.executemany("""
+            INSERT INTO tts_metrics (created_at, stage, seconds, ok, status, request_bytes, response_bytes, content_hash)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+
+def list_metrics(days=1):
+    cur = get_db().execute("""
+        SELECT stage, seconds, ok, status, request_bytes, response_bytes FROM tts_metrics
+        WHERE created_at>=? ORDER BY stage, seconds
+    """, (time.time() - days * 86400,))
+    return cur.fetchall()
+
+def load_watch_index(folder):
+    # {path: (mtime_ns, size, content_hash, output_path)} for one watched folder
+    cur = get_db().execute(
+        "SELECT path, mtime_ns, size, content_hash, output_path FROM watch_files WHERE folder=?", (folder,))
+    return {r[0]: r[1:] for r in cur}
+
+def save_watch_index(folder, rows, gone=()):
+    # rows of (path, mtime_ns, size, content_hash, output_path); gone: paths no longer on disk
+    con = get_db()
+    with con:
+        con.executemany("""
+            INSERT OR REPLACE INTO watch_files (path, folder, mtime_ns, size, content_hash, output_path)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, [(r[0], folder) + tuple(r[1:]) for r in rows])
+        con.executemany("DELETE FROM watch_files WHERE path=?", [(p,) for p in gone])
+
+MEDIA_COLUMNS = ("duration_s", "frame_count", "bitrate_kbps", "file_size", "frame_index")
+
+def _media_values(file_path):
+    info = audio_info(file_path) or {}
+    if not info and os.path.exists(file_path):
+        info = {"file_size": os.path.getsize(file_path)}
+    return tuple(info.get(c) for c in MEDIA_COLUMNS)
+
+def _history_row(text, voice, style, output_format, content_hash, file_path):
+    return ((datetime.now().strftime("%Y-%m-%d %H:%M:%S"), zip_text(text), text_preview(text), len(text),
+             voice, style, output_format, content_hash, file_path)
+            + _media_values(file_path))
+
+def _insert_history(rows):
+    # rows already built by _history_row
+    con = get_db()
+    with con:
+        con.executemany("""
+            INSERT INTO tts_history (created_at, text, text_z, preview, char_count, voice, style, output_format,
+                                     content_hash, file_path, duration_s, frame_count, bitrate_kbps, file_size,
+                                     frame_index)
+            VALUES (?, '', ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+
+def add_history_many(rows):
+    # rows of (text, voice, style, output_format, content_hash, file_path), one transaction
+    _insert_history([_history_row(*r) for r in rows])
+
+def add_history(text, voice, style, output_format, content_hash, file_path):
+    add_history_many([(text, voice, style, output_format, content_hash, file_path)])
+
+def fill_media_info(limit=500):
+    # rows written before the media columns existed; a file that is gone gets
+    # file_size 0 so it isn't looked at again. Returns the number of rows updated.
+    rows = get_db().execute(
+        "SELECT id, file_path FROM tts_history WHERE file_size IS NULL ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+    updates = []
+    for item_id, file_path in rows:
+        values = _media_values(file_path)
+        if values[3] is None:
+            values = values[:3] + (0,) + values[4:]
+        updates.append(values + (item_id,))
+    con = get_db()
+    with con:
+        con.executemany(f"UPDATE tts_history SET {'=?, '.join(MEDIA_COLUMNS)}=? WHERE id=?", updates)
+    return len(updates)
+
+class HistoryBatch:
+    # group commit for bulk runs: add() has add_history's signature, rows are
+    # written batch_size at a time and the rest when the block exits
+    def __init__(self, batch_size=HISTORY_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        self.pending = []
+
+    def add(self, text, voice, style, output_format, content_hash, file_path):
+        # the file is scanned here, on the caller's worker thread, not at commit time
+        row = _history_row(text, voice, style, output_format, content_hash, file_path)
+        with self.lock:
+            self.pending.append(row)
+            if len(self.pending) < self.batch_size:
+                return
+            rows, self.pending = self.pending, []
+        _insert_history(rows)
+
+    def flush(self):
+        with self.lock:
+            rows, self.pending = self.pending, []
+        if rows:
+            _insert_history(rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+def find_history_by_hash(content_hash):
+    # rows whose file the sweeper last saw on disk
+    cur = get_db().execute("""
+        SELECT id, created_at, unzip_text(text_z), voice, style, output_format, content_hash, file_path
+        FROM tts_history WHERE content_hash=? AND file_missing=0
+        ORDER BY id DESC
+    """, (content_hash,))
+    return cur.fetchall()
+
+def mark_history_missing(item_ids, missing=True):
+    con = get_db()
+    with con:
+        con.executemany("UPDATE tts_history SET file_missing=? WHERE id=?",
+                        [(int(missing), item_id) for item_id in item_ids])
+
+def retire_history_path(file_path, keep_hash):
+    # about to overwrite file_path with keep_hash's audio: rows for other content that
+    # point at it would serve the new audio for their old text, so they go. (Marking
+    # them missing isn't enough, the sweeper would find the file and unmark them.)
+    con = get_db()
+    with con:
+        cur = con.execute("DELETE FROM tts_history WHERE file_path=? AND content_hash!=?", (file_path, keep_hash))
+    return cur.rowcount
+
+# list queries select FROM tts_history h
+HISTORY_LIST_COLUMNS = ("h.id, h.created_at, h.voice, h.style, h.output_format, "
+                        "CASE WHEN h.duration_s IS NULL THEN '' ELSE printf('%d:%04.1f', "
+                        "CAST(h.duration_s AS INTEGER) / 60, h.duration_s - CAST(h.duration_s AS INTEGER) / 60 * 60) "
+                        "END AS duration, h.file_path, h.preview")
+HISTORY_PAGE_SIZE = 200
+
+def list_history():
+    cur = get_db().execute(f"SELECT {HISTORY_LIST_COLUMNS} FROM tts_history h ORDER BY id DESC")
+    return cur.fetchall()
+
+def list_history_page(before_id=None, limit=HISTORY_PAGE_SIZE):
+    # keyset pagination: newest first, rows older than before_id
+    if before_id is None:
+        cur = get_db().execute(f"SELECT {HISTORY_LIST_COLUMNS} FROM tts_history h ORDER BY id DESC LIMIT ?",
+                               (limit,))
+    else:
+        cur = get_db().execute(f"SELECT {HISTORY_LIST_COLUMNS} FROM tts_history h WHERE id<? ORDER BY id DESC LIMIT ?",
+                               (before_id, limit))
+    return cur.fetchall()
+
+def list_history_since(after_id):
+    cur = get_db().execute(f"SELECT {HISTORY_LIST_COLUMNS} FROM tts_history h WHERE id>? ORDER BY id DESC",
+                           (after_id,))
+    return cur.fetchall()
+
+def fts_query(text):
+    # every word is matched as a prefix: "नम" finds नमस्ते, "hel" finds hello
+    return " ".join('"' + word.replace('"', '""') + '"*' for word in text.split())
+
+def search_history(query="", voice=None, style=None, date_from=None, date_to=None,
+                   before_id=None, limit=HISTORY_PAGE_SIZE):
+    # dates are "YYYY-MM-DD", both ends inclusive; results are newest first and keyset-paged like list_history_page
+    sql = f"SELECT {HISTORY_LIST_COLUMNS} FROM tts_history h"
+    key = "h.id"
+    where, params = [], []
+    if query.strip():
+        if HAS_FTS:
+            # walk the index in rowid order so LIMIT stops the scan early
+            sql = f"SELECT {HISTORY_LIST_COLUMNS} FROM tts_history_fts f JOIN tts_history h ON h.id=f.rowid"
+            key = "f.rowid"
+            where.append("tts_history_fts MATCH ?")
+            params.append(fts_query(query))
+        else:
+            for word in query.split():
+                where.append("unzip_text(h.text_z) LIKE ?")
+                params.append(f"%{word}%")
+    if voice:
+        where.append("h.voice=?")
+        params.append(voice)
+    if style:
+        where.append("h.style=?")
+        params.append(style)
+    # unary + keeps sqlite scanning by id (newest first) instead of sorting the whole date range
+    if date_from:
+        where.append("+h.created_at>=?")
+        params.append(date_from)
+    if date_to:
+        where.append("+h.created_at<date(?, '+1 day')")
+        params.append(date_to)
+    if before_id is not None:
+        where.append(f"{key}<?")
+        params.append(before_id)
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {key} DESC LIMIT ?"
+    return get_db().execute(sql, params + [limit]).fetchall()
+
+def history_ids_between(low_id, high_id):
+    cur = get_db().execute("SELECT id FROM tts_history WHERE id BETWEEN ? AND ?", (low_id, high_id))
+    return [r[0] for r in cur.fetchall()]
+
+def get_history_item(item_id):
+    cur = get_db().execute("""
+        SELECT id, created_at, unzip_text(text_z), voice, style, output_format, content_hash, file_path
+        FROM tts_history WHERE id=?
+    """, (item_id,))
+    return cur.fetchone()
+
+def delete_history_item(item_id):
+    # False if the file is still on disk (locked, no permission); the row goes either
+    # way and the sweeper reports the file as unreferenced
+    row = get_history_item(item_id)
+    if not row:
+        return True
+    file_path = row[7]
+    removed = True
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        pass
+    except OSError:
+        removed = False
+    con = get_db()
+    with con:
+        con.execute("DELETE FROM tts_history WHERE id=?", (item_id,))
+    return removed
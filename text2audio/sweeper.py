@@ -0,0 +1,129 @@
+# Keeps tts_history and the output folders in step: one os.scandir pass per folder
+# finds rows whose file is gone (marked file_missing, so dedup can trust the
+# database) and audio files no row points to, and applies the retention limits
+# from Settings. All row changes go in one transaction.
+import os
+import threading
+from datetime import datetime, timedelta
+
+from .storage import get_db, load_settings
+from .text import FILE_TYPES
+
+SWEEP_INTERVAL = 6 * 3600
+ORPHAN_GRACE_SECONDS = 3600     # a file this new may be waiting for its history row
+
+def scan_folder(folder):
+    # {normcased name: (name, size, mtime)} of the audio files in folder, None if it
+    # can't be listed (gone, unmounted, no permission)
+    files = {}
+    try:
+        with os.scandir(folder) as it:
+            for entry in it:
+                if entry.name.startswith(".") or os.path.splitext(entry.name)[1].lower() not in FILE_TYPES:
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    st = entry.stat()
+                except OSError:
+                    continue
+                files[os.path.normcase(entry.name)] = (entry.name, st.st_size, st.st_mtime)
+    except OSError:
+        return None
+    return files
+
+def sweep(retention_days=None, retention_max_mb=None, remove_orphans=False, dry_run=False, now=None):
+    # retention_* default to Settings (0 = keep everything). Expired rows are deleted
+    # with their file, oldest first; a file shared by several rows goes with the last
+    # of them. Unreferenced files are only listed unless remove_orphans is set: the
+    # save folder may hold audio that never came from this app.
+    settings = load_settings()
+    if retention_days is None:
+        retention_days = settings["retention_days"]
+    if retention_max_mb is None:
+        retention_max_mb = settings["retention_max_mb"]
+    now = now or datetime.now()
+
+    con = get_db()
+    rows = con.execute("SELECT id, created_at, file_path, file_missing FROM tts_history").fetchall()
+    by_folder = {os.path.normcase(os.path.abspath(settings["default_folder"])): []}
+    for row in rows:
+        by_folder.setdefault(os.path.normcase(os.path.dirname(os.path.abspath(row[2]))), []).append(row)
+
+    missing, found, orphans = [], [], []
+    skipped = []    # (folder, rows) of folders that couldn't be listed: the rows are left as they are
+    live = {}       # (folder, name) -> [size, newest created_at, [row ids], path]
+    for folder, folder_rows in by_folder.items():
+        files = scan_folder(folder)
+        if files is None:
+            skipped.append((folder, folder_rows))
+            continue
+        referenced = set()
+        for item_id, created_at, file_path, was_missing in folder_rows:
+            key = os.path.normcase(os.path.basename(file_path))
+            if key not in files:
+                if not was_missing:
+                    missing.append(item_id)
+                continue
+            if was_missing:
+                found.append(item_id)   # put back by hand
+            referenced.add(key)
+            entry = live.setdefault((folder, key), [files[key][1], created_at, [], os.path.join(folder, files[key][0])])
+            entry[1] = max(entry[1], created_at)
+            entry[2].append(item_id)
+        for key, (name, size, mtime) in files.items():
+            if key not in referenced and now.timestamp() - mtime > ORPHAN_GRACE_SECONDS:
+                orphans.append((os.path.join(folder, name), size))
+
+    # retention: whole files, judged by their newest row, oldest first
+    expired = set()
+    cutoff = (now - timedelta(days=retention_days)).strftime("%Y-%m-%d %H:%M:%S") if retention_days else None
+    budget = retention_max_mb * 1024 * 1024 if retention_max_mb else None
+    total = 0
+    for key, (size, created_at, ids, path) in sorted(live.items(), key=lambda kv: kv[1][1], reverse=True):
+        total += size
+        if (cutoff and created_at < cutoff) or (budget is not None and total > budget):
+            expired.add(key)
+    expired_rows = [item_id for key in expired for item_id in live[key][2]]
+    if retention_days:
+        # rows already marked missing have no file to keep them
+        untouched = {r[0] for _, folder_rows in skipped for r in folder_rows}
+        expired_rows += [r[0] for r in rows if r[3] and r[0] not in found and r[0] not in untouched and r[1] < cutoff]
+
+    stats = {"rows": len(rows), "folders": len(by_folder), "skipped": [folder for folder, _ in skipped],
+             "missing": len(missing), "found": len(found), "orphans": [path for path, _ in orphans],
+             "expired": len(expired_rows), "freed_bytes": 0}
+    if dry_run:
+        return stats
+
+    with con:
+        con.executemany("UPDATE tts_history SET file_missing=1 WHERE id=?", [(i,) for i in missing])
+        con.executemany("UPDATE tts_history SET file_missing=0 WHERE id=?", [(i,) for i in found])
+        con.executemany("DELETE FROM tts_history WHERE id=?", [(i,) for i in expired_rows])
+    # files go after the commit: one that can't be removed is only an orphan next time
+    doomed = [(live[key][3], live[key][0]) for key in expired]
+    if remove_orphans:
+        doomed += orphans
+    for path, size in doomed:
+        try:
+            os.remove(path)
+            stats["freed_bytes"] += size
+        except FileNotFoundError:
+            pass
+        except OSError:
+            continue
+    return stats
+
+def start_sweeper(interval=SWEEP_INTERVAL, log=print):
+    # sweeps now and then every interval on a daemon thread; set the returned event to stop.
+    # A failed sweep is logged and tried again next interval.
+    stop = threading.Event()
+    def loop():
+        while not stop.is_set():
+            try:
+                sweep()
+            except Exception as e:
+                log(f"[sweep failed] {e!r}")
+            stop.wait(interval)
+    threading.Thread(target=loop, name="history-sweeper", daemon=True).start()
+    return stop
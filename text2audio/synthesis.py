@@ -0,0 +1,134 @@
+# Synthesis pipeline: SSML -> engine (HTTP by default) -> file -> cache -> history
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import DEFAULT_CACHE_MAX_MB
+from .storage import add_history
+from .cache import cache_pin, cache_unpin, cache_get, cache_put, cache_blob_path, link_output
+from .text import (VOICES, OUTPUT_FORMAT, SEGMENT_WORKERS, to_ssml, split_for_format, compute_hash, ensure_folder,
+                   format_ext, pick_format)
+from .progress import emit, tag_events
+from .jobs import current_job, job_scope
+from .metrics import METRICS
+from .engines import get_engine
+from .mp3 import strip_id3
+from .wav import pcm_params, wav_header, patch_wav_sizes, pcm_data
+
+def synthesize_ssml(ssml, save_path, settings, timeout=120, on_event=None, output_format=OUTPUT_FORMAT, chars=None):
+    # one request through the configured engine (see engines.py); chars is the
+    # length of the text it speaks, charged against the key's character quota
+    return get_engine(settings).synthesize(ssml, save_path, settings, output_format=output_format,
+                                           timeout=timeout, on_event=on_event, chars=chars)
+
+def concat_mp3(part_paths, save_path):
+    # MP3 is a plain sequence of frames, so parts can be joined without re-encoding
+    with open(save_path, "wb") as out:
+        for part in part_paths:
+            with open(part, "rb") as f:
+                out.write(strip_id3(f.read()))
+    return save_path
+
+def concat_wav(part_paths, save_path, output_format):
+    # one header in front of every part's samples
+    with open(save_path, "wb") as out:
+        out.write(wav_header(*pcm_params(output_format)))
+        size = 0
+        for part in part_paths:
+            with open(part, "rb") as f:
+                size += out.write(pcm_data(f.read()))
+        patch_wav_sizes(out, size)
+    return save_path
+
+def concat_parts(part_paths, save_path, output_format=OUTPUT_FORMAT):
+    if pcm_params(output_format):
+        return concat_wav(part_paths, save_path, output_format)
+    if format_ext(output_format) == ".ogg":
+        raise ValueError("Ogg/Opus parts can't be joined; see split_for_format")
+    return concat_mp3(part_paths, save_path)
+
+def synthesize_segments(segments, voice_key, style, save_path, settings, timeout=120,
+                        workers=SEGMENT_WORKERS, on_event=None, output_format=OUTPUT_FORMAT):
+    # returns the number of segments actually sent to the service
+    lang, gender, voice_name = VOICES[voice_key]
+    if len(segments) == 1:
+        with METRICS.timer("ssml"):
+            ssml = to_ssml(segments[0], lang, gender, voice_name, style)
+        emit(on_event, "ssml", part=0, parts=1)
+        synthesize_ssml(ssml, save_path, settings, timeout=timeout, on_event=tag_events(on_event, part=0, parts=1),
+                        output_format=output_format, chars=len(segments[0]))
+        return 1
+
+    # every segment is cached on its own, so an edited text only re-renders the segments that changed
+    seg_hashes = [compute_hash(seg, voice_key, style, output_format) for seg in segments]
+    ext = format_ext(output_format)
+    cache_pin(seg_hashes)
+    tmp_dir = tempfile.mkdtemp(prefix=".tts_parts_", dir=os.path.dirname(save_path) or ".")
+    try:
+        part_paths = [cache_get(h) for h in seg_hashes]
+        missing = [i for i, part in enumerate(part_paths) if not part]
+
+        job = current_job()
+
+        def render(i):
+            tmp_part = os.path.join(tmp_dir, f"{i:05d}{ext}")
+            part_events = tag_events(on_event, part=missing.index(i), parts=len(missing))
+            with METRICS.timer("ssml", content_hash=seg_hashes[i]):
+                ssml = to_ssml(segments[i], lang, gender, voice_name, style)
+            with job_scope(job):
+                emit(part_events, "ssml")
+                synthesize_ssml(ssml, tmp_part, settings, timeout, part_events, output_format, len(segments[i]))
+            return cache_put(seg_hashes[i], tmp_part, ext=ext)
+
+        if missing:
+            with ThreadPoolExecutor(max_workers=max(1, min(workers, len(missing)))) as pool:
+                for i, blob in zip(missing, pool.map(render, missing)):
+                    part_paths[i] = blob
+        with METRICS.timer("concat") as t:
+            concat_parts(part_paths, save_path, output_format)
+            t.info["response_bytes"] = os.path.getsize(save_path)
+        return len(missing)
+    finally:
+        cache_unpin(seg_hashes)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def synthesize_text(text, voice_key, style, save_path, settings, content_hash=None, timeout=120,
+                    stats=None, on_event=None, history=None, output_format=None):
+    # stats, if given, receives segment counts: {"segments": n, "synthesized": k};
+    # history replaces add_history (e.g. HistoryBatch.add for bulk runs);
+    # output_format defaults to the voice's format from Settings (see pick_format)
+    output_format = pick_format(settings, voice_key, output_format)
+    if content_hash is None:
+        content_hash = compute_hash(text, voice_key, style, output_format)
+    with METRICS.timer("total", content_hash=content_hash, request_bytes=len(text.encode("utf-8"))) as total:
+        segments = split_for_format(text, output_format)
+        synthesized = 0
+        blob = cache_get(content_hash)
+        if not blob:
+            tmp_dir = ensure_folder(os.path.dirname(cache_blob_path(content_hash)))
+            fd, tmp_path = tempfile.mkstemp(suffix=".part", dir=tmp_dir)
+            os.close(fd)
+            try:
+                synthesized = synthesize_segments(segments, voice_key, style, tmp_path, settings,
+                                                  timeout=timeout, on_event=on_event, output_format=output_format)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            with METRICS.timer("write", content_hash=content_hash):
+                max_mb = settings.get("cache_max_mb", DEFAULT_CACHE_MAX_MB)
+                blob = cache_put(content_hash, tmp_path, max_mb * 1024 * 1024, format_ext(output_format))
+                link_output(blob, save_path)
+        else:
+            emit(on_event, "cached")
+            link_output(blob, save_path)
+        total.info["response_bytes"] = os.path.getsize(save_path)
+        emit(on_event, "written", path=save_path)
+        with METRICS.timer("history", content_hash=content_hash):
+            (history or add_history)(text, voice_key, style, output_format, content_hash, save_path)
+        emit(on_event, "history")
+    if stats is not None:
+        stats["segments"] = len(segments)
+        stats["synthesized"] = synthesized
+    return save_path
@@ -0,0 +1,176 @@
+# Voices, SSML, text segmentation, hashing and output file names.
+import os
+import re
+import json
+import zlib
+import hashlib
+from datetime import datetime
+
+from .storage import find_history_by_hash, mark_history_missing
+
+# Voice options (language + gender)
+VOICES = {
+    "Hindi - Male (Madhur)": ("hi-IN", "Male", "hi-IN-MadhurNeural"),
+    "Hindi - Female (Swara)": ("hi-IN", "Female", "hi-IN-SwaraNeural"),
+    "English - Male (Guy)": ("en-US", "Male", "en-US-GuyNeural"),
+    "English - Female (Aria)": ("en-US", "Female", "en-US-AriaNeural"),
+}
+
+STYLES = ["default", "cheerful", "sad", "angry", "excited", "empathetic"]
+OUTPUT_FORMAT = "audio-48khz-192kbitrate-mono-mp3"   # used when neither the job nor the voice picks one
+FILE_EXT = ".mp3"
+
+# X-Microsoft-OutputFormat values offered -> (label, file extension).
+# raw-*-pcm comes back headerless and is saved as WAV (see wav.py).
+# ogg-*-opus texts always go as one request: parts joined back to back would be
+# a chained Ogg stream, which many players stop after the first link of
+# (see split_for_format).
+OUTPUT_FORMATS = {
+    "audio-48khz-192kbitrate-mono-mp3": ("MP3 48 kHz 192 kbit/s", ".mp3"),
+    "audio-24khz-96kbitrate-mono-mp3": ("MP3 24 kHz 96 kbit/s", ".mp3"),
+    "audio-24khz-48kbitrate-mono-mp3": ("MP3 24 kHz 48 kbit/s", ".mp3"),
+    "audio-16khz-32kbitrate-mono-mp3": ("MP3 16 kHz 32 kbit/s (preview)", ".mp3"),
+    "ogg-48khz-16bit-mono-opus": ("Opus 48 kHz (OGG)", ".ogg"),
+    "ogg-24khz-16bit-mono-opus": ("Opus 24 kHz (OGG)", ".ogg"),
+    "ogg-16khz-16bit-mono-opus": ("Opus 16 kHz (OGG)", ".ogg"),
+    "raw-24khz-16bit-mono-pcm": ("PCM 24 kHz 16-bit (WAV)", ".wav"),
+    "raw-16khz-16bit-mono-pcm": ("PCM 16 kHz 16-bit (WAV)", ".wav"),
+    "raw-8khz-16bit-mono-pcm": ("PCM 8 kHz 16-bit (WAV, telephony)", ".wav"),
+}
+FILE_TYPES = {".mp3": "MP3 Audio", ".ogg": "Ogg Opus Audio", ".wav": "WAV Audio"}
+
+PAUSE_TOKEN_REGEX = re.compile(r"\[p-(\d+)\]")  # e.g. [p-2] => 2s
+
+# Long texts are sent as several requests of at most this many characters
+MAX_SEGMENT_CHARS = 2000
+SEGMENT_WORKERS = 4
+# Past MIN_SEGMENT_CHARS a segment ends on roughly every SEGMENT_ANCHOR_EVERY-th sentence,
+# chosen by the sentence's own content so an edit only moves the boundaries around it
+MIN_SEGMENT_CHARS = 300
+SEGMENT_ANCHOR_EVERY = 4
+# one sentence: up to . ! ? । ॥ (followed by space/end), a pause token, or a newline
+SENTENCE_REGEX = re.compile(r"[^\n]*?(?:[.!?\u0964\u0965]+(?=\s|$)|\[p-\d+\]|\n|$)")
+
+SSML_TEMPLATE = '''
+<speak version='1.0' xmlns:mstts="https://www.w3.org/2001/mstts" xml:lang='{lang}'>
+  <voice xml:lang='{lang}' xml:gender='{gender}' name='{voice_name}'>
+    <mstts:express-as style="{style}">
+      {safe_text}
+    </mstts:express-as>
+  </voice>
+</speak>
+'''
+
+def ssml_body(text):
+    # Replace [p-<n>] with SSML break
+    def repl(m):
+        seconds = m.group(1)
+        return f"<break time='{seconds}s'/>"
+    return PAUSE_TOKEN_REGEX.sub(repl, text)
+
+def to_ssml(text, lang, gender, voice_name, style):
+    ssml = SSML_TEMPLATE.format(
+        lang=lang,
+        gender=gender,
+        voice_name=voice_name,
+        style=style,
+        safe_text=ssml_body(text)
+    )
+    return ssml.strip()
+
+SSML_TAG_REGEX = re.compile(r"<[^>]+>")
+
+def spoken_chars(ssml):
+    # length of the text an SSML document speaks, for callers that no longer hold it
+    return len(SSML_TAG_REGEX.sub("", ssml).strip())
+
+# gap spoken between packed utterances so each one ends on its own
+PACK_GAP = "150ms"
+
+def to_packed_ssml(texts, lang, gender, voice_name, style):
+    # several utterances in one document; utterance i sits between bookmarks u<i> and e<i>
+    body = f"<break time='{PACK_GAP}'/>".join(
+        f"<bookmark mark='u{i}'/>{ssml_body(text)}<bookmark mark='e{i}'/>" for i, text in enumerate(texts))
+    ssml = SSML_TEMPLATE.format(lang=lang, gender=gender, voice_name=voice_name, style=style, safe_text=body)
+    return ssml.strip()
+
+def _is_anchor(sentence):
+    return zlib.crc32(sentence.strip().encode("utf-8")) % SEGMENT_ANCHOR_EVERY == 0
+
+def split_text(text, max_chars=MAX_SEGMENT_CHARS):
+    # pack whole sentences into segments of at most max_chars
+    segments = []
+    cur = ""
+    for m in SENTENCE_REGEX.finditer(text):
+        piece = m.group(0)
+        if not piece:
+            continue
+        if len(cur) + len(piece) > max_chars and cur.strip():
+            segments.append(cur.strip())
+            cur = ""
+        # a single sentence longer than a segment is cut at the last space
+        while len(piece) > max_chars:
+            cut = piece.rfind(" ", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            head, piece = piece[:cut], piece[cut:]
+            if head.strip():
+                segments.append(head.strip())
+        cur += piece
+        if len(cur) >= MIN_SEGMENT_CHARS and piece.strip() and _is_anchor(piece):
+            segments.append(cur.strip())
+            cur = ""
+    if cur.strip():
+        segments.append(cur.strip())
+    return segments
+
+def split_for_format(text, output_format):
+    # segments for one text in output_format; Ogg/Opus can't be joined without
+    # re-muxing, so it stays whole
+    if format_ext(output_format) == ".ogg":
+        return [text.strip()] if text.strip() else []
+    return split_text(text)
+
+def compute_hash(text, voice_key, style, output_format):
+    h = hashlib.sha256()
+    payload = json.dumps({
+        "text": text, "voice_key": voice_key, "style": style, "fmt": output_format
+    }, ensure_ascii=False).encode("utf-8")
+    h.update(payload)
+    return h.hexdigest()
+
+def format_ext(output_format):
+    return OUTPUT_FORMATS.get(output_format, (None, FILE_EXT))[1]
+
+def is_mp3_format(output_format):
+    return output_format.endswith("-mp3")
+
+def pick_format(settings, voice_key, output_format=None):
+    # the job's own choice, else the voice's format from Settings, else the default one
+    return (output_format or (settings.get("voice_formats") or {}).get(voice_key)
+            or settings.get("output_format") or OUTPUT_FORMAT)
+
+def ensure_folder(path):
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def sanitize_filename(name):
+    name = re.sub(r"[^\w\s.-]", "", name, flags=re.UNICODE).strip()
+    name = re.sub(r"\s+", "_", name)
+    return name or "audio"
+
+def default_output_path(base_folder, text_preview, ext=FILE_EXT):
+    ensure_folder(base_folder)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    fname = sanitize_filename(text_preview[:40]) + "_" + stamp + ext
+    return os.path.join(base_folder, fname)
+
+def find_existing_output(content_hash):
+    # newest history row for this hash whose file the sweeper has seen; the one
+    # exists() check catches a file deleted since the last sweep
+    for r in find_history_by_hash(content_hash):
+        path = r[7]
+        if os.path.exists(path):
+            return path
+        mark_history_missing([r[0]])
+    return None
@@ -0,0 +1,160 @@
+# Watch folders: .txt scripts dropped into a folder are synthesized next to
+# themselves (story.txt -> story.mp3). The watch_files index keeps each script's
+# mtime and size, so an unchanged folder costs one os.scandir pass and no reads;
+# new or changed scripts go to the worker pool while the scan is still running.
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .storage import init_db, load_settings, HistoryBatch, load_watch_index, save_watch_index, retire_history_path
+from .text import VOICES, STYLES, compute_hash, find_existing_output, format_ext, pick_format
+from .net import flush_usage
+from .metrics import flush_metrics
+from .cache import link_output
+from .synthesis import synthesize_text
+
+WATCH_EXT = ".txt"
+WATCH_INTERVAL = 5.0        # seconds between passes
+WATCH_SETTLE_SECONDS = 2.0  # a script modified this recently may still be being written
+
+def scan_watch_folder(folder, index, seen, recursive=False):
+    # yields (path, mtime_ns, size) for scripts that are new or differ from index;
+    # every script found, changed or not, is added to seen
+    now_ns = time.time_ns()
+    stack = [folder]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                if entry.name.startswith("."):
+                    continue
+                try:
+                    if entry.is_dir():
+                        if recursive:
+                            stack.append(entry.path)
+                        continue
+                    if not entry.name.lower().endswith(WATCH_EXT):
+                        continue
+                    st = entry.stat()
+                except OSError:
+                    continue
+                seen.add(entry.path)
+                known = index.get(entry.path)
+                if known and known[0] == st.st_mtime_ns and known[1] == st.st_size:
+                    continue
+                if now_ns - st.st_mtime_ns < WATCH_SETTLE_SECONDS * 1e9:
+                    continue    # picked up on a later pass
+                yield entry.path, st.st_mtime_ns, st.st_size
+
+class Claims:
+    # scripts with the same content in one pass: the first renders, the rest wait for it and reuse
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events = {}
+
+    def claim(self, content_hash):
+        # True for the first caller; later callers block until release
+        with self.lock:
+            event = self.events.get(content_hash)
+            if event is None:
+                self.events[content_hash] = threading.Event()
+                return True
+        event.wait()
+        return False
+
+    def release(self, content_hash):
+        self.events[content_hash].set()
+
+def ingest_script(path, known, voice_key, style, output_format, settings, history, claims):
+    # -> (status, content_hash, output path); known is the script's index row or None
+    with open(path, encoding="utf-8-sig") as f:
+        text = f.read().strip()
+    if not text:
+        return "empty", None, None
+    content_hash = compute_hash(text, voice_key, style, output_format)
+    save_path = os.path.splitext(path)[0] + format_ext(output_format)
+    if known and known[2] == content_hash and os.path.exists(save_path):
+        return "unchanged", content_hash, save_path     # touched, not edited
+    first = claims.claim(content_hash)
+    try:
+        # an edited script overwrites its old output
+        retire_history_path(save_path, content_hash)
+        existing = find_existing_output(content_hash)
+        if existing:
+            if os.path.normcase(os.path.abspath(existing)) != os.path.normcase(os.path.abspath(save_path)):
+                link_output(existing, save_path)
+                history(text, voice_key, style, output_format, content_hash, save_path)
+            return "reused", content_hash, save_path
+        # a duplicate whose twin's history row is still pending gets the audio from the cache
+        rendered = {}
+        synthesize_text(text, voice_key, style, save_path, settings, content_hash=content_hash,
+                        stats=rendered, history=history, output_format=output_format)
+        return "done" if rendered["synthesized"] else "reused", content_hash, save_path
+    finally:
+        if first:
+            claims.release(content_hash)
+
+def watch_pass(folders, voice_key=None, style=None, output_format=None, workers=4, recursive=False,
+               log=print, settings=None):
+    # one scan of every folder; scripts that fail stay out of the index and are
+    # retried next pass. Returns counts per status.
+    settings = settings or load_settings()
+    voice_key = voice_key or list(VOICES.keys())[0]
+    style = style or STYLES[0]
+    output_format = pick_format(settings, voice_key, output_format)
+    stats = {"done": 0, "reused": 0, "unchanged": 0, "empty": 0, "failed": 0, "removed": 0}
+    claims = Claims()
+    with HistoryBatch() as history, ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for folder in folders:
+            folder = os.path.abspath(folder)
+            index = load_watch_index(folder)
+            seen = set()
+            futures = {pool.submit(ingest_script, path, index.get(path), voice_key, style, output_format,
+                                   settings, history.add, claims): (path, mtime_ns, size)
+                       for path, mtime_ns, size in scan_watch_folder(folder, index, seen, recursive)}
+            rows = []
+            for fut in as_completed(futures):
+                path, mtime_ns, size = futures[fut]
+                try:
+                    status, content_hash, save_path = fut.result()
+                except Exception as e:
+                    stats["failed"] += 1
+                    log(f"[failed] {path}: {e}")
+                    continue
+                stats[status] += 1
+                rows.append((path, mtime_ns, size, content_hash, save_path))
+                if status in ("done", "reused"):
+                    log(f"[{status}] {save_path}")
+            gone = [path for path in index if path not in seen]
+            stats["removed"] += len(gone)
+            if rows or gone:
+                save_watch_index(folder, rows, gone)
+    if stats["done"]:
+        flush_usage()
+        flush_metrics()
+    return stats
+
+def watch(folders, interval=WATCH_INTERVAL, once=False, log=print, engine=None, **kwargs):
+    # polls until interrupted (Ctrl+C); engine overrides the configured one (see
+    # engines.py), other kwargs go to watch_pass
+    init_db()
+    for folder in folders:
+        if not os.path.isdir(folder):
+            raise ValueError(f"{folder}: not a folder")
+    log(f"Watching {', '.join(folders)} for *{WATCH_EXT} scripts" + ("" if once else f" every {interval:g}s"))
+    while True:
+        started = time.perf_counter()
+        settings = load_settings()
+        if engine:
+            settings["engine"] = engine
+        stats = watch_pass(folders, log=log, settings=settings, **kwargs)
+        if stats["done"] or stats["reused"] or stats["failed"]:
+            log(f"{stats['done']} synthesized, {stats['reused']} reused, {stats['failed']} failed "
+                f"in {time.perf_counter() - started:.2f}s")
+        if once:
+            return stats
+        time.sleep(interval)
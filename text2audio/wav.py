@@ -0,0 +1,34 @@
+# WAV container for the raw PCM output formats, stdlib only. The header goes in
+# first with zero sizes and is patched once the last sample is in, so PCM can be
+# streamed straight to disk without knowing its length up front.
+import re
+import struct
+
+PCM_FORMAT_REGEX = re.compile(r"raw-(\d+)(khz|hz)-(\d+)bit-mono-pcm$")
+WAV_HEADER_SIZE = 44
+
+def pcm_params(output_format):
+    # (sample rate, bits per sample) for raw-*-pcm formats, else None
+    m = PCM_FORMAT_REGEX.match(output_format or "")
+    if not m:
+        return None
+    rate = int(m.group(1)) * (1000 if m.group(2) == "khz" else 1)
+    return rate, int(m.group(3))
+
+def wav_header(sample_rate, bits=16, data_size=0, channels=1):
+    block = channels * bits // 8
+    return struct.pack("<4sI4s4sIHHIIHH4sI", b"RIFF", 36 + data_size, b"WAVE",
+                       b"fmt ", 16, 1, channels, sample_rate, sample_rate * block, block, bits,
+                       b"data", data_size)
+
+def patch_wav_sizes(f, data_size):
+    # f: seekable binary file that starts with wav_header()
+    f.seek(4)
+    f.write(struct.pack("<I", 36 + data_size))
+    f.seek(40)
+    f.write(struct.pack("<I", data_size))
+    f.seek(0, 2)
+
+def pcm_data(data):
+    # samples of a WAV file written by this module (fixed 44-byte header)
+    return memoryview(data)[WAV_HEADER_SIZE:] if data[:4] == b"RIFF" else memoryview(data)